@@ -1,20 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import importlib
 import json
+import math
 import random
 import re
 import base64
-from PIL import Image
 import io
 from datetime import datetime, timedelta
 import logging
-import requests
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import cv2
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from association_index import (ACCEPTED_CATEGORIES, PRIORITY_LABELS, AssociationIndex, document_error, document_id,
+                               read_export)
 from config import config
+from diy_catalog import DiyCatalog
+from feature_index import VectorIndex, feature_vector
+from image_fetcher import ImageFetcher
+from keyword_matcher import KeywordMatcher, KeywordTaxonomy, searchable_text
+from metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, SIZE_BUCKETS, bind_recording, record_attribute,
+                     record_stage, recording_stages, registry as metrics_registry, start_recording, stop_recording, timed_stage)
+from model_backends import MODEL_BACKENDS, ModelRunner
+from palette import PALETTE_ENGINES
+from phash_index import HashIndex, perceptual_hash, source_digest
+from route_optimizer import optimize_route
+from recipe_catalog import RecipeCatalog
+from record_store import ITEM_ID_BYTES
+from result_cache import ResultCache
+from rules import analyze_palettes, classify_properties
+from text_index import CategoryTextIndex
+from tracing import TraceExporter, memory_usage
+from worker_pool import AnalysisPool, PoolSaturatedError
 
 # Créer l'application Flask
 app = Flask(__name__)
@@ -26,6 +45,15 @@ app.config.from_object(config[config_name])
 # Configuration CORS
 CORS(app, origins=[app.config['FRONTEND_URL']])
 
+class TimedJSONProvider(DefaultJSONProvider):
+    """Sérialisation JSON des réponses, mesurée comme étape 'serialization'"""
+    
+    @timed_stage('serialization')
+    def dumps(self, obj, **kwargs):
+        return super().dumps(obj, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
 # Configuration du logging
 logging.basicConfig(
     level=getattr(logging, app.config['LOG_LEVEL']),
@@ -33,6 +61,78 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Version du pipeline d'analyse : à incrémenter dès qu'un changement modifie les résultats
+PIPELINE_VERSION = '2'
+
+# Client HTTP partagé pour les images distantes
+image_fetcher = ImageFetcher(
+    max_bytes=app.config['MAX_IMAGE_BYTES'],
+    timeout=app.config['AI_FETCH_TIMEOUT'],
+    pool_size=app.config['AI_FETCH_POOL_SIZE'],
+    cache_dir=app.config['AI_FETCH_CACHE_DIR'] or None,
+    cache_max_bytes=app.config['AI_FETCH_CACHE_MAX_SIZE'],
+    negative_ttl=app.config['AI_FETCH_NEGATIVE_TTL'],
+    negative_max_entries=app.config['AI_FETCH_NEGATIVE_MAX_ENTRIES']
+)
+
+if app.config['AI_PALETTE_ENGINE'] not in PALETTE_ENGINES:
+    raise ValueError(f"AI_PALETTE_ENGINE inconnu: {app.config['AI_PALETTE_ENGINE']} "
+                     f"(valeurs possibles: {', '.join(PALETTE_ENGINES)})")
+
+if app.config['AI_MODEL_BACKEND'] not in MODEL_BACKENDS:
+    raise ValueError(f"AI_MODEL_BACKEND inconnu: {app.config['AI_MODEL_BACKEND']} "
+                     f"(valeurs possibles: {', '.join(MODEL_BACKENDS)})")
+
+# Backend de classification : le modèle éventuel est chargé au premier usage, une fois par processus
+model_runner = ModelRunner(
+    app.config['AI_MODEL_BACKEND'],
+    app.config['AI_MODEL_PATH'],
+    max_batch=app.config['AI_MODEL_BATCH_SIZE'],
+    max_wait=app.config['AI_MODEL_BATCH_WAIT_MS'] / 1000
+)
+
+# Cache des résultats de classification
+result_cache = ResultCache(
+    max_size=app.config['AI_CACHE_SIZE'],
+    ttl=app.config['AI_CACHE_TTL'],
+    disk_dir=app.config['AI_CACHE_DIR'] or None,
+    disk_max_bytes=app.config['AI_CACHE_DIR_MAX_SIZE'],
+    version=f"{PIPELINE_VERSION}-{app.config['ANALYSIS_MAX_EDGE']}-{app.config['AI_PALETTE_ENGINE']}"
+            f"-{model_runner.version}"
+)
+
+# Métriques exposées par /metrics (durées des étapes : ai_stage_duration_seconds, voir metrics.py)
+REQUESTS = metrics_registry.counter(
+    'ai_requests_total', 'Requêtes traitées par route', ['route', 'method', 'status']
+)
+REQUEST_SECONDS = metrics_registry.histogram(
+    'ai_request_duration_seconds', 'Durée des requêtes par route', ['route']
+)
+PAYLOAD_BYTES = metrics_registry.histogram(
+    'ai_request_payload_bytes', 'Taille des corps de requête par route', ['route'], SIZE_BUCKETS
+)
+FALLBACKS = metrics_registry.counter(
+    'ai_fallback_classifications_total', "Classifications de secours (image illisible ou inaccessible)"
+)
+NEAR_DUPLICATES = metrics_registry.counter(
+    'ai_near_duplicate_reuses_total', "Classifications reprises d'une photo quasi identique déjà analysée"
+)
+
+# Export des traces de requêtes pour l'analyse hors ligne (désactivé si AI_TRACE_FILE est vide)
+trace_exporter = (
+    TraceExporter(app.config['AI_TRACE_FILE'], app.config['AI_TRACE_MIN_MS'] / 1000)
+    if app.config['AI_TRACE_FILE'] else None
+)
+
+# Index des empreintes perceptuelles des photos analysées (recherche des quasi-doublons)
+dedup_index = HashIndex(app.config['AI_DEDUP_INDEX_FILE'] or None, app.config['AI_DEDUP_MAX_DISTANCE'])
+
+# Vecteurs de caractéristiques visuelles des annonces (recherche des objets similaires)
+similar_index = VectorIndex(app.config['AI_SIMILAR_INDEX_FILE'] or None, nprobe=app.config['AI_SIMILAR_NPROBE'])
+
+# Associations partenaires indexées par position et catégorie acceptée (/recommend-associations)
+association_index = AssociationIndex(app.config['AI_ASSOCIATIONS_FILE'] or None)
+
 # Catégories d'objets ECOSHARE
 OBJECT_CATEGORIES = {
     'electronics': ['laptop', 'computer', 'keyboard', 'mouse', 'monitor', 'phone', 'tablet', 'camera'],
@@ -57,32 +157,285 @@ FOOD_CATEGORIES = {
     'snacks': ['chips', 'nuts', 'crackers', 'candy', 'chocolate']
 }
 
-def enhanced_classify_object(image_data):
-    """Classification d'objet améliorée avec analyse d'image"""
+# Descriptions d'objets pour la comparaison (plus détaillées)
+OBJECT_DESCRIPTIONS = {
+    'electronics': 'appareil électronique téléphone ordinateur tablette écran clavier souris laptop computer phone tablet screen keyboard mouse camera electronic device tech gadget',
+    'clothing': 'vêtement chemise pantalon robe chaussures chapeau gants écharpe shirt pants dress shoes hat gloves scarf jacket coat clothing fashion wear',
+    'furniture': 'meuble chaise table canapé lit bureau armoire étagère lampe chair table sofa bed desk cabinet shelf lamp furniture wood furniture home decor',
+    'books': 'livre magazine cahier dictionnaire roman manuel scolaire book magazine notebook dictionary novel textbook reading paper pages text',
+    'toys': 'jouet poupée ballon puzzle jeu ours en peluche figurine toy doll ball puzzle game teddy bear action figure children kids play',
+    'sports': 'sport ballon raquette vélo casque chaussures équipement gym sport ball racket bike helmet sneakers gym equipment fitness exercise',
+    'beauty': 'cosmétique parfum maquillage soin cheveux beauté cosmetic perfume makeup skincare hair care beauty product beauty care',
+    'home': 'maison cuisine salle de bain décoration ustensile électroménager house kitchen bathroom decoration utensil appliance home decor'
+}
+
+# Mots-clés génériques ajoutés quand l'un des mots déclencheurs apparaît dans l'URL
+GENERIC_KEYWORD_PATTERNS = [
+    (('phone', 'mobile'), ['phone', 'mobile', 'smartphone']),
+    (('laptop', 'computer'), ['laptop', 'computer', 'notebook']),
+    (('book', 'magazine'), ['book', 'magazine', 'reading']),
+    (('chair', 'table'), ['chair', 'table', 'furniture']),
+    (('shirt', 'dress'), ['shirt', 'dress', 'clothing']),
+    (('toy', 'doll'), ['toy', 'doll', 'play']),
+    (('ball', 'sport'), ['ball', 'sport', 'exercise']),
+    (('cosmetic', 'beauty'), ['cosmetic', 'beauty', 'makeup']),
+    (('kitchen', 'home'), ['kitchen', 'home', 'house'])
+]
+
+COMMON_ALLERGENS = ['nuts', 'dairy', 'eggs', 'gluten', 'soy', 'shellfish']
+
+# Automate unique de tous les mots-clés, compilé au démarrage
+OBJECT_TAXONOMY = KeywordTaxonomy(OBJECT_CATEGORIES)
+FOOD_TAXONOMY = KeywordTaxonomy(FOOD_CATEGORIES)
+keyword_matcher = KeywordMatcher(
+    OBJECT_TAXONOMY.keywords + FOOD_TAXONOMY.keywords + COMMON_ALLERGENS
+    + [trigger for triggers, _ in GENERIC_KEYWORD_PATTERNS for trigger in triggers]
+)
+
+# Catalogue des projets DIY (data/diy_projects.json)
+diy_catalog = DiyCatalog()
+recipe_catalog = RecipeCatalog()
+
+# Index TF-IDF des descriptions, ajusté une seule fois au démarrage
+category_text_index = CategoryTextIndex(OBJECT_DESCRIPTIONS)
+
+def cache_lookup_counts():
+    """Consultations des caches (résultats, images téléchargées, projets DIY) par issue"""
+    results = result_cache.stats()
+    fetches = image_fetcher.stats()
+    diy = diy_catalog.projects.cache_info()
+    return {
+        ('results', 'hit'): results['hits'],
+        ('results', 'disk_hit'): results['disk_hits'],
+        ('results', 'miss'): results['misses'],
+        ('image_fetch', 'hit'): fetches['cache_hits'],
+        ('image_fetch', 'revalidated'): fetches['revalidated'],
+        ('image_fetch', 'miss'): fetches['downloads'],
+        ('diy', 'hit'): diy.hits,
+        ('diy', 'miss'): diy.misses
+    }
+
+def cache_hit_ratios():
+    """Part des consultations de chaque cache qui n'ont pas donné lieu à un calcul ou un téléchargement"""
+    totals = {}
+    misses = {}
+    for (cache, outcome), count in cache_lookup_counts().items():
+        totals[cache] = totals.get(cache, 0) + count
+        if outcome == 'miss':
+            misses[cache] = count
+    return {(cache,): 1 - misses[cache] / total if total else 0.0 for cache, total in totals.items()}
+
+metrics_registry.gauge(
+    'ai_cache_lookups_total', 'Consultations des caches par issue', ['cache', 'outcome'],
+    cache_lookup_counts, kind='counter'
+)
+metrics_registry.gauge('ai_cache_hit_ratio', 'Part des consultations servies par le cache', ['cache'],
+                       cache_hit_ratios)
+metrics_registry.gauge(
+    'ai_model_inferences_total', "Lots et images traités par le modèle de classification", ['unit'],
+    lambda: {(unit,): model_runner.stats()[unit] for unit in ('batches', 'images')}, kind='counter'
+)
+metrics_registry.gauge('ai_dedup_index_size', "Empreintes de photos dans l'index des quasi-doublons", [],
+                       lambda: {(): len(dedup_index)})
+
+# Modules importés à la demande par les routes qui s'en servent (SciPy et scikit-learn par l'index de texte)
+HEAVY_MODULES = ('cv2', 'PIL.Image', 'requests')
+
+def warm_up(analyze=True):
+    """Importer les modules lourds, ajuster l'index de texte et, si analyze, analyser une petite image
+
+    analyze=False dans le maître gunicorn : aucun thread OpenCV ne doit exister avant le fork.
+    """
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    category_text_index.fit()
+    association_index.snapshot()
+    model_runner.load(before_fork=not analyze)
+    if analyze:
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (128, 96, 64)).save(buffer, format='PNG')
+        enhanced_classify_object('', buffer.getvalue())
+    logger.info(f"Service préchauffé en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def initialize_analysis_worker():
+    """Préchauffer un processus du pool d'analyse (modules, index et pipeline chargés)"""
+    import cv2
+    # Un seul thread OpenCV par processus : le parallélisme vient du pool
+    cv2.setNumThreads(1)
+    warm_up()
+
+# Pool de processus pour les étapes d'analyse d'image (désactivé si AI_WORKER_POOL_SIZE = 0)
+analysis_pool = AnalysisPool(
+    size=app.config['AI_WORKER_POOL_SIZE'],
+    queue_depth=app.config['AI_WORKER_QUEUE_DEPTH'],
+    initializer=initialize_analysis_worker,
+    retry_after=app.config['AI_WORKER_RETRY_AFTER'],
+    timeout=app.config['AI_WORKER_TIMEOUT'],
+    start_method=app.config['AI_WORKER_START_METHOD']
+)
+if (analysis_pool.enabled and app.config['AI_DEDUP_REUSE_DISTANCE'] >= 0
+        and not (app.config['AI_DEDUP_INDEX_FILE'] and app.config['AI_CACHE_DIR'])):
+    logger.warning("AI_DEDUP_REUSE_DISTANCE avec le pool d'analyse sans AI_DEDUP_INDEX_FILE et AI_CACHE_DIR : "
+                   "chaque processus du pool ne réutilise que les photos qu'il a lui-même analysées")
+
+# Exécuteur partagé par les lots (OpenCV et NumPy relâchent le GIL pendant les calculs)
+batch_executor = ThreadPoolExecutor(max_workers=app.config['BATCH_WORKERS'], thread_name_prefix='batch')
+
+def classify_object_cached(image_data, image_bytes=None):
+    """Classification d'objet derrière le cache adressé par le contenu de l'image"""
+    if not isinstance(image_data, str):
+        return fallback_classification(image_data)
+    
+    if image_bytes is None:
+        try:
+            image_bytes = read_image_bytes(image_data)
+        except ImageTooLargeError:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement de l'image: {e}")
+            return fallback_classification(image_data)
+    
+    # Détail de la requête (X-Timing, traces) : taille de l'image et issue du cache
+    record_attribute('image_bytes', check_image_size(image_bytes))
+    key = result_cache.make_key('object', image_bytes, cache_source_label(image_data))
+    result = result_cache.get(key)
+    record_attribute('cache', 'miss' if result is None else 'hit')
+    if result is None:
+        result, image_hash = run_object_analysis(image_data, image_bytes, key)
+        # Les classifications de secours (image illisible) ne sont pas mises en cache
+        if result.get('image_analysis'):
+            result_cache.set(key, result)
+            if image_hash is not None:
+                dedup_index.add(image_hash, key, source=source_digest(cache_source_label(image_data)))
+    return result
+
+@timed_stage('dedup_lookup')
+def near_duplicate_result(image_hash, key, source_label):
+    """Résultat en cache d'une autre photo de même libellé à distance <= AI_DEDUP_REUSE_DISTANCE, ou None"""
+    max_distance = app.config['AI_DEDUP_REUSE_DISTANCE']
+    if max_distance < 0:
+        return None
+    # Le libellé (nom de fichier, URL) oriente la catégorie : seules les photos de même libellé sont reprises
+    matches = dedup_index.lookup(image_hash, max_distance, limit=5, source=source_digest(source_label))
+    for match_key, _, distance in matches:
+        result = result_cache.get(match_key) if match_key != key else None
+        if result is not None:
+            NEAR_DUPLICATES.inc()
+            record_attribute('cache', 'near_duplicate')
+            record_attribute('duplicate_distance', distance)
+            return result
+    return None
+
+def run_object_analysis(image_data, image_bytes, key):
+    """(résultat, empreinte perceptuelle) de l'analyse, dans le pool de processus s'il est activé"""
+    if not analysis_pool.enabled:
+        return analyze_object(image_data, image_bytes, key)
+    
+    # Les fichiers reçus ne traversent pas les processus : seuls leurs octets sont envoyés
+    if hasattr(image_bytes, 'read'):
+        image_bytes = as_image_stream(image_bytes).read()
+    result, image_hash, stages, attributes = analysis_pool.run(analyze_with_stage_timings, image_data,
+                                                               image_bytes, key)
+    
+    # Les métriques du processus du pool ne sont pas exportées : rapatrier ses mesures
+    for stage, start, seconds in stages:
+        record_stage(stage, seconds, start)
+    for name, value in attributes.items():
+        record_attribute(name, value)
+    if attributes.get('cache') == 'near_duplicate':
+        NEAR_DUPLICATES.inc()
+    elif not result.get('image_analysis'):
+        FALLBACKS.inc()
+    return result, image_hash
+
+def analyze_with_stage_timings(image_data, image_bytes, key=''):
+    """Analyse (dans un processus du pool), étapes mesurées et attributs notés"""
+    with recording_stages() as recording:
+        memory_start = memory_usage()
+        result, image_hash = analyze_object(image_data, image_bytes, key)
+        record_attribute('worker_memory_delta_bytes', memory_usage() - memory_start)
+    return result, image_hash, recording.stages, recording.attributes
+
+def analyze_object(image_data, image_bytes, key=''):
+    """Analyse d'une image, ou résultat d'une photo quasi identique, avec son empreinte perceptuelle"""
+    image = load_image_from_data(image_data, image_bytes)
+    if image is None:
+        return fallback_classification(image_data), None
+    # Empreinte calculée là où l'image est décodée (processus du pool s'il est activé) : une photo
+    # réencodée ou redimensionnée reprend le résultat en cache au lieu de repasser par le pipeline
+    image_hash = perceptual_hash(image)
+    result = None
+    if image_hash is not None:
+        result = near_duplicate_result(image_hash, key, cache_source_label(image_data))
+    if result is None:
+        result = enhanced_classify_object(image_data, image_bytes, image)
+    return result, image_hash
+
+def classify_food_cached(image_data, image_bytes=None):
+    """Classification d'aliment derrière le cache adressé par le contenu de l'image"""
+    if not isinstance(image_data, str):
+        return mock_classify_food(image_data)
+    
+    source_label = cache_source_label(image_data)
+    if image_bytes is None and image_data.startswith('data:image'):
+        try:
+            image_bytes = base64.b64decode(image_data.split(',', 1)[1])
+        except (IndexError, ValueError) as e:
+            # Data URL illisible : le résultat ne dépend que du texte, qui sert alors de clé
+            logger.error(f"Erreur lors du chargement de l'image: {e}")
+            source_label = image_data
+    if image_bytes is not None:
+        check_image_size(image_bytes)
+    
+    key = result_cache.make_key('food', image_bytes or b'', source_label)
+    result = result_cache.get(key)
+    if result is None:
+        result = mock_classify_food(image_data)
+        if result is not None:
+            result_cache.set(key, result)
+    return result
+
+def cache_source_label(image_data):
+    """Partie textuelle de la source prise en compte par le pipeline (URL ou chemin)"""
+    # Le contenu d'une data URL est déjà couvert par l'empreinte des octets décodés
+    return '' if image_data.startswith('data:') else image_data
+
+def enhanced_classify_object(image_data, image_bytes=None, image=None):
+    """Classification d'objet améliorée avec analyse d'image (image : déjà décodée par l'appelant)"""
     try:
         # Charger et analyser l'image
-        image = load_image_from_data(image_data)
+        if image is None:
+            image = load_image_from_data(image_data, image_bytes)
         if image is None:
             return fallback_classification(image_data)
         
+        # Représentations partagées (RGB, gris, HSV, contours, Laplacien) calculées une seule fois
+        context = create_analysis_context(image)
+        
         # Analyse de base de l'image
-        image_analysis = analyze_image_properties(image)
+        image_analysis = analyze_image_properties(image, context)
         
         # Classification basée sur les caractéristiques visuelles
-        visual_features = extract_visual_features(image)
-        
-        # Classification par similarité avec des descriptions
-        text_classification = classify_by_text_similarity(image_data)
+        visual_features = extract_visual_features(image, context)
         
-        # Combiner les résultats
-        final_classification = combine_classifications(
-            image_analysis, 
-            visual_features, 
-            text_classification
-        )
+        if model_runner.enabled:
+            # Modèle chargé depuis AI_MODEL_PATH
+            final_classification = classify_with_model(context)
+        else:
+            # Classification par similarité avec des descriptions
+            text_classification = classify_by_text_similarity(image_data)
+            
+            # Combiner les résultats
+            final_classification = combine_classifications(
+                image_analysis, 
+                visual_features, 
+                text_classification
+            )
         
         # Améliorer la détection de l'état
-        condition = detect_object_condition(image, final_classification['category'])
+        condition = detect_object_condition(image, final_classification['category'], context)
         
         # Estimation de valeur plus précise
         estimated_value = estimate_object_value_enhanced(
@@ -100,173 +453,171 @@ def enhanced_classify_object(image_data):
             'estimated_value': estimated_value,
             'is_recyclable': check_recyclability(final_classification['category']),
             'recycling_instructions': get_recycling_instructions(final_classification['category']),
-            'image_analysis': image_analysis,
-            'quality_score': calculate_quality_score(image, condition)
+            'image_analysis': dict(image_analysis, shape_features=visual_features.get('shape_features', {})),
+            'quality_score': calculate_quality_score(image, condition, context)
         }
         
     except Exception as e:
         logger.error(f"Erreur lors de la classification d'objet: {e}")
         return fallback_classification(image_data)
 
-def load_image_from_data(image_data):
+class ImageTooLargeError(ValueError):
+    """Image reçue plus grande que MAX_IMAGE_SIZE une fois décodée"""
+
+def check_image_size(image_bytes):
+    """Taille de l'image (octets ou fichier reçu), ImageTooLargeError au-delà de MAX_IMAGE_SIZE"""
+    size = image_bytes.seek(0, io.SEEK_END) if hasattr(image_bytes, 'read') else len(image_bytes)
+    if size > app.config['MAX_IMAGE_BYTES']:
+        raise ImageTooLargeError(f"Image trop volumineuse ({size} octets)")
+    return size
+
+def read_image_bytes(image_data):
+    """Lire les octets bruts d'une image (data URL ou URL HTTP(S))"""
+    if image_data.startswith('data:image'):
+        # Image en base64, bornée comme les autres sources une fois décodée
+        header, encoded = image_data.split(',', 1)
+        image_bytes = base64.b64decode(encoded)
+        check_image_size(image_bytes)
+        return image_bytes
+    elif image_data.startswith(('http://', 'https://')):
+        # URL d'image (connexions réutilisées, taille bornée, cache disque)
+        return image_fetcher.fetch(image_data)
+    else:
+        # Les chemins de fichiers du serveur ne sont pas lus : taille non bornée, fichiers arbitraires
+        raise ValueError("Source d'image non prise en charge (data URL ou URL http(s) attendue)")
+
+@timed_stage('decode')
+def load_image_from_data(image_data, image_bytes=None):
     """Charger une image à partir de différentes sources"""
+    from PIL import Image
     try:
-        if isinstance(image_data, str):
-            if image_data.startswith('data:image'):
-                # Image en base64
-                header, encoded = image_data.split(',', 1)
-                image_bytes = base64.b64decode(encoded)
-                return Image.open(io.BytesIO(image_bytes))
-            elif image_data.startswith('http'):
-                # URL d'image
-                response = requests.get(image_data, timeout=10)
-                return Image.open(io.BytesIO(response.content))
-            else:
-                # Chemin de fichier
-                return Image.open(image_data)
-        return None
+        if image_bytes is None:
+            if not isinstance(image_data, str):
+                return None
+            image_bytes = read_image_bytes(image_data)
+        image = reduce_image_for_analysis(Image.open(as_image_stream(image_bytes)))
+        # Pillow décode à la première lecture des pixels : forcer le décodage ici, dans l'étape decode
+        image.load()
+        return image
     except Exception as e:
         logger.error(f"Erreur lors du chargement de l'image: {e}")
         return None
 
-def analyze_image_properties(image):
+def as_image_stream(image_bytes):
+    """Fichier binaire lisible par Pillow, sans copier les octets ni le fichier reçu"""
+    if hasattr(image_bytes, 'read'):
+        image_bytes.seek(0)
+        return image_bytes
+    return io.BytesIO(image_bytes)
+
+def read_raw_image_body():
+    """Lire le corps brut d'une requête image/*, ou None s'il dépasse MAX_IMAGE_SIZE"""
+    max_bytes = app.config['MAX_IMAGE_BYTES']
+    if request.content_length is not None and request.content_length > max_bytes:
+        return None
+    body = request.get_data(cache=False)
+    return body if len(body) <= max_bytes else None
+
+def reduce_image_for_analysis(image, max_edge=None):
+    """Décoder l'image à résolution bornée en conservant ses dimensions d'origine"""
+    if max_edge is None:
+        max_edge = app.config['ANALYSIS_MAX_EDGE']
+    
+    original_size = image.size
+    if max_edge and max(original_size) > max_edge:
+        # JPEG : décodage réduit (1/2, 1/4, 1/8) sans matérialiser le bitmap complet
+        image.draft('RGB', (max_edge, max_edge))
+        image.thumbnail((max_edge, max_edge))
+    
+    image.info['original_size'] = original_size
+    return image
+
+@timed_stage('create_analysis_context')
+def create_analysis_context(image):
+    """Préparer les représentations de l'image partagées par toutes les étapes d'analyse"""
+    import cv2
+    # Convertir en RGB si nécessaire
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    img_array = np.array(image)
+    height, width = img_array.shape[:2]
+    original_width, original_height = image.info.get('original_size', (width, height))
+    record_attribute('image_resolution', {'width': original_width, 'height': original_height})
+    record_attribute('analysis_resolution', {'width': width, 'height': height})
+    gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+    
+    return {
+        'rgb': img_array,
+        'gray': gray,
+        'hsv': cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV),
+        'edges': cv2.Canny(gray, 50, 150),
+        'laplacian_var': float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        'brightness': float(np.mean(img_array)),
+        'contrast': float(np.std(img_array)),
+        'width': width,
+        'height': height,
+        'original_width': original_width,
+        'original_height': original_height
+    }
+
+@timed_stage('analyze_image_properties')
+def analyze_image_properties(image, context=None):
     """Analyser les propriétés de base de l'image"""
     try:
-        # Convertir en RGB si nécessaire
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Convertir en numpy array
-        img_array = np.array(image)
+        if context is None:
+            context = create_analysis_context(image)
         
-        # Propriétés de base
-        height, width = img_array.shape[:2]
+        # Propriétés de base (dimensions d'origine, avant réduction pour l'analyse)
+        height, width = context['height'], context['width']
+        original_width, original_height = context['original_width'], context['original_height']
         
         # Analyse des couleurs dominantes
-        dominant_colors = get_dominant_colors(img_array)
-        
-        # Analyse de la luminosité
-        brightness = np.mean(img_array)
-        
-        # Analyse du contraste
-        contrast = np.std(img_array)
+        dominant_colors = get_dominant_colors(context['rgb'])
         
         # Détection de bords (pour évaluer la netteté)
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        sharpness = np.sum(edges) / (height * width)
+        sharpness = np.sum(context['edges']) / (height * width)
         
         return {
-            'dimensions': {'width': width, 'height': height},
+            'dimensions': {'width': original_width, 'height': original_height},
+            'analysis_dimensions': {'width': width, 'height': height},
             'dominant_colors': dominant_colors,
-            'brightness': float(brightness),
-            'contrast': float(contrast),
+            'brightness': context['brightness'],
+            'contrast': context['contrast'],
             'sharpness': float(sharpness),
-            'aspect_ratio': width / height
+            'aspect_ratio': original_width / original_height
         }
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse de l'image: {e}")
         return {}
 
+@timed_stage('get_dominant_colors')
 def get_dominant_colors(img_array, k=5):
-    """Obtenir les couleurs dominantes de l'image"""
+    """Obtenir les couleurs dominantes de l'image (moteur choisi par AI_PALETTE_ENGINE)"""
     try:
-        # Redimensionner l'image pour accélérer le traitement
-        small_img = cv2.resize(img_array, (150, 150))
-        data = small_img.reshape((-1, 3))
-        data = np.float32(data)
-        
-        # K-means clustering pour trouver les couleurs dominantes
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
-        _, labels, centers = cv2.kmeans(data, k, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-        
-        # Compter les occurrences
-        unique, counts = np.unique(labels, return_counts=True)
-        
-        # Trier par fréquence
-        color_counts = list(zip(centers[unique], counts))
-        color_counts.sort(key=lambda x: x[1], reverse=True)
-        
-        return [{'rgb': color.tolist(), 'frequency': int(count)} for color, count in color_counts]
+        return PALETTE_ENGINES[app.config['AI_PALETTE_ENGINE']](img_array, k)
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction des couleurs: {e}")
         return []
 
 def analyze_dominant_colors(dominant_colors):
-    """Analyser les couleurs dominantes pour la classification"""
+    """Analyser les couleurs dominantes pour la classification (règles de rules.py)"""
     try:
-        if not dominant_colors:
-            return {}
-        
-        analysis = {
-            'has_metallic_colors': False,
-            'has_neutral_colors': False,
-            'has_vibrant_colors': False,
-            'has_wood_colors': False,
-            'has_bright_colors': False,
-            'has_sport_colors': False,
-            'has_beauty_colors': False,
-            'has_home_colors': False
-        }
-        
-        for color_data in dominant_colors:
-            rgb = color_data.get('rgb', [0, 0, 0])
-            r, g, b = rgb
-            
-            # Couleurs métalliques (gris, argent, or)
-            if 100 <= r <= 200 and 100 <= g <= 200 and 100 <= b <= 200:
-                analysis['has_metallic_colors'] = True
-            
-            # Couleurs neutres (beiges, bruns, gris)
-            if (80 <= r <= 180 and 80 <= g <= 180 and 80 <= b <= 180) or \
-               (r > g + 20 and r > b + 20):  # Tons bruns
-                analysis['has_neutral_colors'] = True
-            
-            # Couleurs vives (saturation élevée)
-            max_val = max(r, g, b)
-            min_val = min(r, g, b)
-            if max_val > 150 and (max_val - min_val) > 50:
-                analysis['has_vibrant_colors'] = True
-            
-            # Couleurs bois (bruns, beiges)
-            if r > g + 10 and r > b + 10 and r > 100:
-                analysis['has_wood_colors'] = True
-            
-            # Couleurs vives et saturées
-            if max(r, g, b) > 180 and min(r, g, b) < 100:
-                analysis['has_bright_colors'] = True
-            
-            # Couleurs sport (rouge, bleu, vert vifs)
-            if (r > 150 and g < 100 and b < 100) or \
-               (b > 150 and r < 100 and g < 100) or \
-               (g > 150 and r < 100 and b < 100):
-                analysis['has_sport_colors'] = True
-            
-            # Couleurs beauté (pastels, roses, violets)
-            if (r > 150 and g > 100 and b > 150) or \
-               (r > 150 and g < 100 and b > 150):
-                analysis['has_beauty_colors'] = True
-            
-            # Couleurs maison (neutres, terre)
-            if 50 <= r <= 150 and 50 <= g <= 150 and 50 <= b <= 150:
-                analysis['has_home_colors'] = True
-        
-        return analysis
+        return analyze_palettes([dominant_colors])[0]
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse des couleurs: {e}")
         return {}
 
-def extract_visual_features(image):
+@timed_stage('extract_visual_features')
+def extract_visual_features(image, context=None):
     """Extraire des caractéristiques visuelles pour la classification"""
+    import cv2
     try:
-        img_array = np.array(image.convert('RGB'))
+        if context is None:
+            context = create_analysis_context(image)
         
-        # Détection de formes basiques
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
-        # Détection de contours
-        edges = cv2.Canny(gray, 50, 150)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Détection de contours (carte de bords partagée)
+        contours, _ = cv2.findContours(context['edges'], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         # Caractéristiques géométriques
         if contours:
@@ -307,46 +658,18 @@ def classify_by_text_similarity(image_data):
         # Extraire du texte de l'image (simulation)
         image_text = extract_text_from_image(image_data)
         
-        # Descriptions d'objets pour la comparaison (plus détaillées)
-        object_descriptions = {
-            'electronics': 'appareil électronique téléphone ordinateur tablette écran clavier souris laptop computer phone tablet screen keyboard mouse camera electronic device tech gadget',
-            'clothing': 'vêtement chemise pantalon robe chaussures chapeau gants écharpe shirt pants dress shoes hat gloves scarf jacket coat clothing fashion wear',
-            'furniture': 'meuble chaise table canapé lit bureau armoire étagère lampe chair table sofa bed desk cabinet shelf lamp furniture wood furniture home decor',
-            'books': 'livre magazine cahier dictionnaire roman manuel scolaire book magazine notebook dictionary novel textbook reading paper pages text',
-            'toys': 'jouet poupée ballon puzzle jeu ours en peluche figurine toy doll ball puzzle game teddy bear action figure children kids play',
-            'sports': 'sport ballon raquette vélo casque chaussures équipement gym sport ball racket bike helmet sneakers gym equipment fitness exercise',
-            'beauty': 'cosmétique parfum maquillage soin cheveux beauté cosmetic perfume makeup skincare hair care beauty product beauty care',
-            'home': 'maison cuisine salle de bain décoration ustensile électroménager house kitchen bathroom decoration utensil appliance home decor'
-        }
-        
-        # Calculer la similarité
-        vectorizer = TfidfVectorizer()
-        
-        # Créer un corpus avec le texte de l'image et les descriptions
-        corpus = [image_text] + list(object_descriptions.values())
-        tfidf_matrix = vectorizer.fit_transform(corpus)
-        
-        # Calculer la similarité avec chaque catégorie
-        similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:])
+        # Similarité avec les descriptions de catégories (index ajusté au démarrage)
+        similarities = category_text_index.score([image_text])
         
         # Trouver la catégorie la plus similaire
         best_match_idx = np.argmax(similarities[0])
-        categories = list(object_descriptions.keys())
-        best_category = categories[best_match_idx]
+        best_category = category_text_index.categories[best_match_idx]
         confidence = float(similarities[0][best_match_idx])
         
         # Si la confiance est trop faible, essayer une approche plus simple
         if confidence < 0.3:
-            # Recherche de mots-clés simples
-            image_text_lower = image_text.lower()
-            keyword_scores = {}
-            
-            for category, keywords in OBJECT_CATEGORIES.items():
-                score = 0
-                for keyword in keywords:
-                    if keyword in image_text_lower:
-                        score += 1
-                keyword_scores[category] = score
+            # Recherche de mots-clés simples (une passe de l'automate)
+            keyword_scores = OBJECT_TAXONOMY.category_counts(keyword_matcher.find(image_text.lower()))
             
             if keyword_scores and max(keyword_scores.values()) > 0:
                 best_category = max(keyword_scores, key=keyword_scores.get)
@@ -365,43 +688,26 @@ def extract_text_from_image(image_data):
     """Extraire du texte de l'image (simulation)"""
     # Dans une vraie implémentation, on utiliserait OCR (Tesseract, etc.)
     # Pour l'instant, on simule basé sur l'URL ou le nom de fichier
-    image_str = str(image_data).lower()
+    matched = find_keywords(image_data)
     
     # Mots-clés communs
-    keywords = []
-    for category, words in OBJECT_CATEGORIES.items():
-        for word in words:
-            if word in image_str:
-                keywords.append(word)
+    keywords = OBJECT_TAXONOMY.ordered_keywords(matched)
     
-    # Ajouter des mots-clés génériques basés sur des patterns communs
+    # Ajouter des mots-clés génériques basés sur des patterns communs d'URLs d'images
     generic_keywords = []
-    
-    # Patterns d'URLs d'images
-    if 'phone' in image_str or 'mobile' in image_str:
-        generic_keywords.extend(['phone', 'mobile', 'smartphone'])
-    if 'laptop' in image_str or 'computer' in image_str:
-        generic_keywords.extend(['laptop', 'computer', 'notebook'])
-    if 'book' in image_str or 'magazine' in image_str:
-        generic_keywords.extend(['book', 'magazine', 'reading'])
-    if 'chair' in image_str or 'table' in image_str:
-        generic_keywords.extend(['chair', 'table', 'furniture'])
-    if 'shirt' in image_str or 'dress' in image_str:
-        generic_keywords.extend(['shirt', 'dress', 'clothing'])
-    if 'toy' in image_str or 'doll' in image_str:
-        generic_keywords.extend(['toy', 'doll', 'play'])
-    if 'ball' in image_str or 'sport' in image_str:
-        generic_keywords.extend(['ball', 'sport', 'exercise'])
-    if 'cosmetic' in image_str or 'beauty' in image_str:
-        generic_keywords.extend(['cosmetic', 'beauty', 'makeup'])
-    if 'kitchen' in image_str or 'home' in image_str:
-        generic_keywords.extend(['kitchen', 'home', 'house'])
+    for triggers, extra_keywords in GENERIC_KEYWORD_PATTERNS:
+        if not matched.isdisjoint(triggers):
+            generic_keywords.extend(extra_keywords)
     
     # Combiner tous les mots-clés
     all_keywords = keywords + generic_keywords
     
     return ' '.join(all_keywords) if all_keywords else 'objet inconnu'
 
+def find_keywords(image_data):
+    """Mots-clés présents dans la source d'une image (URL, nom de fichier, en-tête de data URL)"""
+    return keyword_matcher.find(searchable_text(image_data))
+
 def combine_classifications(image_analysis, visual_features, text_classification):
     """Combiner les différentes classifications"""
     try:
@@ -433,112 +739,58 @@ def combine_classifications(image_analysis, visual_features, text_classification
         
         # Trouver la meilleure catégorie
         best_category = max(category_scores, key=category_scores.get)
-        confidence = category_scores[best_category]
-        
-        return {
-            'category': best_category,
-            'subcategory': random.choice(OBJECT_CATEGORIES.get(best_category, ['objet'])),
-            'confidence': confidence,
-            'tags': random.sample(OBJECT_CATEGORIES.get(best_category, ['objet']), 
-                                min(3, len(OBJECT_CATEGORIES.get(best_category, ['objet']))))
-        }
+        return describe_category(best_category, category_scores[best_category])
     except Exception as e:
         logger.error(f"Erreur lors de la combinaison des classifications: {e}")
         return {'category': 'other', 'subcategory': 'objet', 'confidence': 0.5, 'tags': ['objet']}
 
+def describe_category(category, confidence):
+    """Classification finale : catégorie, sous-catégorie et mots-clés associés"""
+    keywords = OBJECT_CATEGORIES.get(category, ['objet'])
+    return {
+        'category': category,
+        'subcategory': random.choice(keywords),
+        'confidence': confidence,
+        'tags': random.sample(keywords, min(3, len(keywords)))
+    }
+
+@timed_stage('model_inference')
+def classify_with_model(context):
+    """Classification par le modèle de AI_MODEL_BACKEND (inférence regroupée avec les requêtes concurrentes)"""
+    category, confidence = model_runner.predict(context['rgb'])
+    return describe_category(category, confidence)
+
 def classify_by_image_properties(image_analysis):
-    """Classification basée sur les propriétés de l'image"""
+    """Classification basée sur les propriétés de l'image (règles de rules.py)"""
     try:
-        if not image_analysis:
-            return {'category': 'other', 'confidence': 0.5}
-        
-        # Règles basées sur les propriétés
-        brightness = image_analysis.get('brightness', 128)
-        contrast = image_analysis.get('contrast', 50)
-        aspect_ratio = image_analysis.get('aspect_ratio', 1.0)
-        sharpness = image_analysis.get('sharpness', 0)
-        dominant_colors = image_analysis.get('dominant_colors', [])
-        
-        # Analyser les couleurs dominantes
-        color_analysis = analyze_dominant_colors(dominant_colors)
-        
-        # Classification améliorée basée sur plusieurs critères
-        category_scores = {}
-        
-        # Électronique - objets sombres, couleurs métalliques
-        if brightness < 100 or color_analysis.get('has_metallic_colors', False):
-            category_scores['electronics'] = 0.7
-        
-        # Livres - forme rectangulaire, couleurs neutres
-        if 0.6 <= aspect_ratio <= 1.4 and color_analysis.get('has_neutral_colors', False):
-            category_scores['books'] = 0.8
-        
-        # Vêtements - fort contraste, couleurs vives
-        if contrast > 60 and color_analysis.get('has_vibrant_colors', False):
-            category_scores['clothing'] = 0.7
-        
-        # Meubles - forme carrée/rectangulaire, couleurs bois
-        if 0.7 <= aspect_ratio <= 1.3 and color_analysis.get('has_wood_colors', False):
-            category_scores['furniture'] = 0.8
-        
-        # Jouets - couleurs vives, formes variées
-        if color_analysis.get('has_bright_colors', False) and sharpness > 0.05:
-            category_scores['toys'] = 0.6
-        
-        # Sports - couleurs vives, contraste élevé
-        if contrast > 80 and color_analysis.get('has_sport_colors', False):
-            category_scores['sports'] = 0.7
-        
-        # Beauté - couleurs pastel ou vives, forme compacte
-        if color_analysis.get('has_beauty_colors', False) and aspect_ratio < 2:
-            category_scores['beauty'] = 0.6
-        
-        # Maison - couleurs neutres, forme variée
-        if color_analysis.get('has_home_colors', False):
-            category_scores['home'] = 0.6
-        
-        # Si aucune catégorie n'a un score suffisant, utiliser des règles de fallback
-        if not category_scores or max(category_scores.values()) < 0.5:
-            # Règles de fallback plus généreuses
-            if brightness < 120:
-                category_scores['electronics'] = 0.5
-            elif aspect_ratio > 1.5 or aspect_ratio < 0.7:
-                category_scores['books'] = 0.5
-            elif contrast > 40:
-                category_scores['clothing'] = 0.5
-            else:
-                category_scores['home'] = 0.5
-        
-        # Retourner la catégorie avec le meilleur score
-        best_category = max(category_scores, key=category_scores.get)
-        confidence = category_scores[best_category]
-        
-        return {'category': best_category, 'confidence': confidence}
+        return classify_properties([image_analysis])[0]
     except Exception as e:
         logger.error(f"Erreur lors de la classification par propriétés: {e}")
         return {'category': 'other', 'confidence': 0.5}
 
-def detect_object_condition(image, category):
+@timed_stage('detect_object_condition')
+def detect_object_condition(image, category, context=None):
     """Détecter l'état de l'objet à partir de l'image"""
+    import cv2
     try:
-        img_array = np.array(image.convert('RGB'))
+        if context is None:
+            context = create_analysis_context(image)
         
         # Analyser la netteté
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        laplacian_var = context['laplacian_var']
         
         # Analyser les couleurs (détection de rouille, décoloration, etc.)
-        hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
+        hsv = context['hsv']
+        pixel_count = context['height'] * context['width']
         
         # Détecter les couleurs de détérioration
         brown_lower = np.array([10, 50, 20])
         brown_upper = np.array([20, 255, 200])
         brown_mask = cv2.inRange(hsv, brown_lower, brown_upper)
-        brown_percentage = np.sum(brown_mask > 0) / (img_array.shape[0] * img_array.shape[1])
+        brown_percentage = np.sum(brown_mask > 0) / pixel_count
         
         # Détecter les rayures ou dommages
-        edges = cv2.Canny(gray, 50, 150)
-        edge_density = np.sum(edges > 0) / (img_array.shape[0] * img_array.shape[1])
+        edge_density = np.sum(context['edges'] > 0) / pixel_count
         
         # Déterminer l'état
         if laplacian_var > 1000 and brown_percentage < 0.1 and edge_density < 0.1:
@@ -591,14 +843,15 @@ def estimate_object_value_enhanced(category, condition, image_analysis):
         logger.error(f"Erreur lors de l'estimation de valeur: {e}")
         return 20
 
-def calculate_quality_score(image, condition):
+@timed_stage('calculate_quality_score')
+def calculate_quality_score(image, condition, context=None):
     """Calculer un score de qualité global"""
     try:
-        img_array = np.array(image.convert('RGB'))
+        if context is None:
+            context = create_analysis_context(image)
         
         # Score basé sur la netteté
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+        sharpness = context['laplacian_var']
         sharpness_score = min(sharpness / 1000, 1.0)
         
         # Score basé sur l'état
@@ -611,8 +864,8 @@ def calculate_quality_score(image, condition):
         condition_score = condition_scores.get(condition, 0.5)
         
         # Score basé sur la luminosité et le contraste
-        brightness = np.mean(img_array)
-        contrast = np.std(img_array)
+        brightness = context['brightness']
+        contrast = context['contrast']
         lighting_score = 1.0 - abs(brightness - 128) / 128
         contrast_score = min(contrast / 100, 1.0)
         
@@ -631,15 +884,9 @@ def calculate_quality_score(image, condition):
 
 def fallback_classification(image_data):
     """Classification de secours si l'analyse d'image échoue"""
-    image_str = str(image_data).lower()
-    best_category = 'other'
-    confidence = 0.5
-    
-    for category, keywords in OBJECT_CATEGORIES.items():
-        if any(keyword in image_str for keyword in keywords):
-            best_category = category
-            confidence = 0.7
-            break
+    FALLBACKS.inc()
+    best_category = OBJECT_TAXONOMY.first_category(find_keywords(image_data), default='other')
+    confidence = 0.5 if best_category == 'other' else 0.7
     
     return {
         'category': best_category,
@@ -659,17 +906,10 @@ def mock_classify_food(image_data):
     """Mock classification d'aliment - version simplifiée sans TensorFlow"""
     try:
         # Simulation d'une classification basée sur des mots-clés
-        image_str = str(image_data).lower()
-        
         # Déterminer le type d'aliment
-        best_food_type = 'other'
+        best_food_type = FOOD_TAXONOMY.first_category(find_keywords(image_data), default='other')
         confidence = random.uniform(0.6, 0.9)
         
-        for food_type, keywords in FOOD_CATEGORIES.items():
-            if any(keyword in image_str for keyword in keywords):
-                best_food_type = food_type
-                break
-        
         # Déterminer la condition
         condition = 'fresh' if confidence > 0.8 else 'good'
         
@@ -749,15 +989,11 @@ def estimate_expiration_date(food_type, condition):
 
 def check_allergens(ingredients):
     """Vérifie les allergènes potentiels"""
-    common_allergens = ['nuts', 'dairy', 'eggs', 'gluten', 'soy', 'shellfish']
-    detected_allergens = []
-    
+    detected_allergens = set()
     for ingredient in ingredients:
-        for allergen in common_allergens:
-            if allergen in ingredient.lower():
-                detected_allergens.append(allergen)
+        detected_allergens |= keyword_matcher.find(ingredient.lower())
     
-    return list(set(detected_allergens))
+    return list(detected_allergens.intersection(COMMON_ALLERGENS))
 
 def analyze_nutritional_info(food_type, ingredients):
     """Analyse les informations nutritionnelles"""
@@ -789,269 +1025,34 @@ def get_recycling_instructions(category):
     }
     return instructions.get(category, 'Consultez les consignes de tri locales')
 
-def generate_diy_instructions(object_category, object_name, object_description="", object_condition="good"):
+def generate_diy_instructions(object_category, object_name, object_description="", object_condition="good",
+                              difficulty=None):
     """Génère des instructions DIY intelligentes pour un objet"""
+    # Projets de la catégorie adaptés à l'état de l'objet (catalogue chargé au démarrage, mémoïsé)
+    projects = diy_catalog.projects(object_category, object_condition, difficulty)
     
-    # Base de données étendue de projets DIY
-    diy_database = {
-        'electronics': [
-            {
-                'title': 'Station de charge multi-appareils',
-                'description': 'Transformez votre ancien appareil en station de charge élégante et fonctionnelle',
-                'materials': ['Appareil électronique', 'Câbles USB (3-4)', 'Support en bois ou acrylique', 'Colle forte', 'Peinture (optionnel)', 'Ruban isolant'],
-                'steps': [
-                    'Nettoyez soigneusement l\'appareil et retirez les composants non nécessaires',
-                    'Mesurez et découpez le support selon les dimensions de l\'appareil',
-                    'Percez des trous pour les câbles USB dans le support',
-                    'Installez et fixez les câbles USB avec de la colle',
-                    'Assemblez le tout et testez la fonctionnalité',
-                    'Peignez et décorez selon vos goûts (optionnel)'
-                ],
-                'difficulty': 'medium',
-                'estimated_time': '2-3 heures',
-                'skill_level': 'Intermédiaire',
-                'eco_impact': 'Réduit les déchets électroniques et évite l\'achat de nouvelles stations',
-                'tips': [
-                    'Utilisez des câbles de qualité pour éviter les problèmes de charge',
-                    'Testez chaque câble avant l\'assemblage final',
-                    'Ventilez bien la pièce si vous utilisez de la colle forte'
-                ],
-                'tools_needed': ['Perceuse', 'Ciseaux', 'Pinceau', 'Règle'],
-                'safety_notes': ['Débranchez l\'appareil avant de le modifier', 'Portez des gants lors de la manipulation']
-            },
-            {
-                'title': 'Lampe de bureau LED',
-                'description': 'Créez une lampe de bureau unique à partir d\'un ancien appareil électronique',
-                'materials': ['Appareil électronique', 'LED strip ou ampoule LED', 'Interrupteur', 'Câble électrique', 'Support en métal', 'Vis et écrous'],
-                'steps': [
-                    'Démontez l\'appareil et retirez les composants internes',
-                    'Installez la LED dans l\'espace disponible',
-                    'Connectez l\'interrupteur et le câble électrique',
-                    'Assemblez le support et fixez l\'appareil',
-                    'Testez l\'éclairage et ajustez si nécessaire'
-                ],
-                'difficulty': 'hard',
-                'estimated_time': '3-4 heures',
-                'skill_level': 'Avancé',
-                'eco_impact': 'Réutilise un appareil électronique et utilise des LED économes',
-                'tips': ['Assurez-vous de bien isoler les connexions électriques', 'Choisissez une LED de couleur chaude pour un éclairage agréable']
-            }
-        ],
-        'clothing': [
-            {
-                'title': 'Sac réutilisable personnalisé',
-                'description': 'Transformez vos vêtements usagés en sacs réutilisables uniques',
-                'materials': ['Vêtement en bon état', 'Fil solide', 'Aiguille', 'Ciseaux', 'Ruban ou corde', 'Boutons (optionnel)'],
-                'steps': [
-                    'Lavez et repassez le vêtement',
-                    'Découpez selon le patron choisi (sac à main, tote bag, etc.)',
-                    'Cousez les bords avec un point solide',
-                    'Ajoutez des poignées en ruban ou corde',
-                    'Décorez avec des boutons, broderies ou appliques',
-                    'Testez la solidité en y mettant des objets lourds'
-                ],
-                'difficulty': 'easy',
-                'estimated_time': '1-2 heures',
-                'skill_level': 'Débutant',
-                'eco_impact': 'Évite l\'achat de nouveaux sacs et réduit les déchets textiles',
-                'tips': [
-                    'Choisissez un tissu solide comme le denim ou la toile',
-                    'Renforcez les points de tension avec des points doubles',
-                    'Laissez des marges de couture suffisantes'
-                ],
-                'variations': ['Sac à provisions', 'Sac à dos', 'Trousses', 'Coussins décoratifs']
-            },
-            {
-                'title': 'Patchwork créatif',
-                'description': 'Créez un patchwork coloré à partir de vêtements usagés',
-                'materials': ['Vêtements de différentes couleurs', 'Tissu de doublure', 'Fil assorti', 'Aiguille', 'Ciseaux', 'Règle'],
-                'steps': [
-                    'Découpez des carrés ou rectangles de taille égale',
-                    'Arrangez les pièces selon le motif désiré',
-                    'Cousez les pièces ensemble en commençant par les rangées',
-                    'Assemblez les rangées pour former le patchwork',
-                    'Ajoutez une doublure si nécessaire',
-                    'Finissez les bords avec un ourlet'
-                ],
-                'difficulty': 'medium',
-                'estimated_time': '2-3 heures',
-                'skill_level': 'Intermédiaire',
-                'eco_impact': 'Réutilise plusieurs vêtements et crée un objet unique'
-            }
-        ],
-        'furniture': [
-            {
-                'title': 'Relooking complet de meuble',
-                'description': 'Donnez une nouvelle vie à vos meubles anciens avec une transformation complète',
-                'materials': ['Meuble à relooker', 'Peinture (primaire + couleur)', 'Pinceaux et rouleaux', 'Papier de verre (grain 120, 220)', 'Vernis ou cire', 'Pinceau à vernis'],
-                'steps': [
-                    'Démontez le meuble si possible (poignées, tiroirs)',
-                    'Poncez toute la surface avec du papier de verre grain 120',
-                    'Nettoyez et dépoussiérez soigneusement',
-                    'Appliquez une sous-couche si nécessaire',
-                    'Peignez avec la couleur choisie (2-3 couches fines)',
-                    'Laissez sécher entre chaque couche',
-                    'Appliquez une couche de vernis ou cire pour protéger',
-                    'Remontez le meuble et ajoutez de nouveaux accessoires'
-                ],
-                'difficulty': 'medium',
-                'estimated_time': '1-2 jours',
-                'skill_level': 'Intermédiaire',
-                'eco_impact': 'Évite l\'achat de nouveaux meubles et réduit les déchets',
-                'tips': [
-                    'Ventilez bien la pièce pendant la peinture',
-                    'Appliquez plusieurs couches fines plutôt qu\'une couche épaisse',
-                    'Testez la couleur sur une petite surface avant de peindre tout le meuble'
-                ],
-                'style_variations': ['Vintage', 'Moderne', 'Scandinave', 'Industriel', 'Bohème']
-            },
-            {
-                'title': 'Étagère murale récup',
-                'description': 'Transformez des planches ou des caisses en étagère murale design',
-                'materials': ['Planches de récupération', 'Vis et chevilles', 'Perceuse', 'Niveau', 'Peinture (optionnel)', 'Cire ou vernis'],
-                'steps': [
-                    'Mesurez l\'espace disponible et planifiez la disposition',
-                    'Découpez les planches aux bonnes dimensions',
-                    'Poncez et traitez le bois (cire ou vernis)',
-                    'Marquez les emplacements de fixation au mur',
-                    'Percez les trous et installez les chevilles',
-                    'Fixez les planches au mur avec des vis',
-                    'Vérifiez le niveau et ajustez si nécessaire'
-                ],
-                'difficulty': 'medium',
-                'estimated_time': '2-3 heures',
-                'skill_level': 'Intermédiaire',
-                'eco_impact': 'Réutilise du bois et évite l\'achat de nouvelles étagères'
-            }
-        ],
-        'books': [
-            {
-                'title': 'Bibliothèque créative',
-                'description': 'Transformez vos livres en éléments décoratifs et fonctionnels',
-                'materials': ['Livres anciens', 'Colle forte', 'Ciseaux', 'Peinture (optionnel)', 'Ruban décoratif'],
-                'steps': [
-                    'Sélectionnez des livres de même taille',
-                    'Collez les pages ensemble pour créer des blocs solides',
-                    'Découpez selon la forme désirée (coffret, support, etc.)',
-                    'Peignez ou décorez selon vos goûts',
-                    'Ajoutez des éléments décoratifs (ruban, boutons)'
-                ],
-                'difficulty': 'easy',
-                'estimated_time': '1-2 heures',
-                'skill_level': 'Débutant',
-                'eco_impact': 'Réutilise des livres non lus et crée des objets décoratifs'
-            }
-        ],
-        'toys': [
-            {
-                'title': 'Jardin de jouets',
-                'description': 'Créez un jardin miniature avec des jouets usagés',
-                'materials': ['Jouets en plastique', 'Terreau', 'Petites plantes', 'Conteneur', 'Gravier décoratif', 'Petits accessoires'],
-                'steps': [
-                    'Nettoyez soigneusement les jouets',
-                    'Préparez le conteneur avec des trous de drainage',
-                    'Ajoutez une couche de gravier puis de terreau',
-                    'Plantez les petites plantes',
-                    'Disposez les jouets comme éléments décoratifs',
-                    'Ajoutez du gravier décoratif pour finir'
-                ],
-                'difficulty': 'easy',
-                'estimated_time': '1 heure',
-                'skill_level': 'Débutant',
-                'eco_impact': 'Réutilise des jouets et crée un jardin miniature'
-            }
+    # Adapter selon le nom/description
+    if (object_name and object_category != 'furniture'
+            and any(word in object_name.lower() for word in diy_catalog.renamed_object_words)):
+        return [
+            dict(project, title=f"Transformation de {object_name}",
+                 description=f"Donnez une nouvelle vie à votre {object_name}")
+            for project in projects
         ]
-    }
     
-    # Sélectionner les projets selon la catégorie
-    available_projects = diy_database.get(object_category, [
-        {
-            'title': 'Projet créatif général',
-            'description': 'Laissez libre cours à votre créativité avec cet objet',
-            'materials': ['Matériaux de base', 'Outils appropriés', 'Colle ou fixations'],
-            'steps': [
-                'Analysez l\'objet et ses possibilités',
-                'Imaginez une nouvelle fonction ou utilisation',
-                'Planifiez la transformation étape par étape',
-                'Rassemblez les matériaux nécessaires',
-                'Réalisez votre projet avec patience',
-                'Testez et ajustez si nécessaire'
-            ],
-            'difficulty': 'medium',
-            'estimated_time': 'Variable',
-            'skill_level': 'Débutant',
-            'eco_impact': 'Réduit les déchets et encourage la créativité',
-            'tips': ['Soyez créatif et n\'ayez pas peur d\'expérimenter', 'Testez vos idées sur une petite échelle d\'abord']
-        }
-    ])
-    
-    # Adapter les projets selon l'état de l'objet
-    adapted_projects = []
-    for project in available_projects:
-        adapted_project = project.copy()
-        
-        # Adapter selon l'état
-        if object_condition == 'poor':
-            adapted_project['difficulty'] = 'easy'  # Projets plus simples pour objets en mauvais état
-            adapted_project['tips'] = adapted_project.get('tips', []) + [
-                'L\'objet étant en mauvais état, privilégiez les transformations simples',
-                'Nettoyez soigneusement avant de commencer'
-            ]
-        elif object_condition == 'excellent':
-            adapted_project['tips'] = adapted_project.get('tips', []) + [
-                'L\'objet étant en excellent état, vous pouvez vous permettre des transformations plus complexes'
-            ]
-        
-        # Adapter selon le nom/description
-        if object_name and any(word in object_name.lower() for word in ['table', 'chaise', 'bureau']):
-            if object_category != 'furniture':
-                adapted_project['title'] = f"Transformation de {object_name}"
-                adapted_project['description'] = f"Donnez une nouvelle vie à votre {object_name}"
-        
-        adapted_projects.append(adapted_project)
-    
-    return adapted_projects
+    return list(projects)
 
-def generate_recipe_instructions(food_type, ingredients):
+def generate_recipe_instructions(food_type, ingredients, dietary_restrictions=(), servings=None):
     """Génère des recettes basées sur les ingrédients"""
-    recipes = {
-        'fruits': [
-            {
-                'title': 'Smoothie aux fruits',
-                'description': 'Un smoothie rafraîchissant et nutritif',
-                'ingredients': ingredients + ['Yaourt', 'Miel'],
-                'instructions': [
-                    'Lavez et coupez les fruits',
-                    'Mettez dans un mixeur',
-                    'Ajoutez le yaourt et le miel',
-                    'Mixez jusqu\'à obtenir une texture lisse'
-                ],
-                'prep_time': '10 min',
-                'cook_time': '0 min',
-                'servings': 2,
-                'difficulty': 'easy'
-            }
-        ],
-        'vegetables': [
-            {
-                'title': 'Soupe de légumes',
-                'description': 'Une soupe réconfortante et saine',
-                'ingredients': ingredients + ['Bouillon', 'Herbes'],
-                'instructions': [
-                    'Lavez et coupez les légumes',
-                    'Faites revenir dans une casserole',
-                    'Ajoutez le bouillon',
-                    'Laissez mijoter 20 minutes'
-                ],
-                'prep_time': '15 min',
-                'cook_time': '25 min',
-                'servings': 4,
-                'difficulty': 'easy'
-            }
-        ]
-    }
+    # Recettes du catalogue classées par couverture des ingrédients disponibles
+    # (à défaut d'ingrédients, ceux de la catégorie d'aliment)
+    recipes = recipe_catalog.suggest(
+        ingredients or FOOD_CATEGORIES.get(food_type, []), dietary_restrictions, servings
+    )
+    if recipes:
+        return recipes
     
-    return recipes.get(food_type, [
+    return [
         {
             'title': 'Recette créative',
             'description': 'Une recette utilisant vos ingrédients',
@@ -1064,10 +1065,90 @@ def generate_recipe_instructions(food_type, ingredients):
             ],
             'prep_time': '15 min',
             'cook_time': '30 min',
-            'servings': 4,
+            'servings': servings or 4,
             'difficulty': 'medium'
         }
-    ])
+    ]
+
+def timing_requested():
+    """Détail des durées demandé par l'en-tête X-Timing: 1 ou le paramètre ?timing=1"""
+    return request.headers.get('X-Timing') == '1' or request.args.get('timing') == '1'
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # Étapes notées seulement si le détail est demandé ou les traces exportées
+    if trace_exporter is not None or timing_requested():
+        g.recording = start_recording()
+        g.memory_start = memory_usage()
+
+@app.after_request
+def attach_timing_breakdown(response):
+    """Ajouter le détail des durées à la réponse (X-Timing) et exporter la trace"""
+    recording = g.pop('recording', None)
+    if recording is None:
+        return response
+    stop_recording(recording)
+    
+    duration = time.perf_counter() - g.request_start
+    breakdown = dict(
+        recording.attributes,
+        total_ms=round(duration * 1e3, 3),
+        memory_delta_bytes=memory_usage() - g.memory_start
+    )
+    
+    if trace_exporter is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        trace_exporter.export(f'{request.method} {route}', g.request_start, duration, recording.stages,
+                              dict(breakdown, status=response.status_code))
+    
+    if timing_requested():
+        # Étapes dans l'ordre où elles ont commencé (une étape englobante précède ses sous-étapes)
+        stages = sorted(recording.stages, key=lambda item: item[1])
+        breakdown['stages'] = [
+            {'stage': stage, 'start_ms': round((start - g.request_start) * 1e3, 3),
+             'duration_ms': round(seconds * 1e3, 3)}
+            for stage, start, seconds in stages
+        ]
+        response.headers['Server-Timing'] = ', '.join(
+            [f"{stage};dur={seconds * 1e3:.3f}" for stage, _, seconds in stages]
+            + [f"total;dur={duration * 1e3:.3f}"]
+        )
+        data = response.get_json(silent=True) if response.is_json else None
+        if isinstance(data, dict):
+            data['timing'] = breakdown
+            response.set_data(app.json.dumps(data))
+    return response
+
+@app.teardown_request
+def discard_request_recording(error=None):
+    """Ne pas laisser d'enregistrement actif sur le thread si la requête a échoué"""
+    recording = g.pop('recording', None)
+    if recording is not None:
+        stop_recording(recording)
+
+@app.after_request
+def record_request_metrics(response):
+    """Compter la requête et mesurer sa durée et la taille de son corps, par route"""
+    # Règle de routage plutôt que chemin : nombre de séries borné
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS.inc(route, request.method, str(response.status_code))
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route)
+    if request.content_length:
+        PAYLOAD_BYTES.observe(request.content_length, route)
+    return response
+
+# Routes dont le corps peut contenir un lot complet d'images (BATCH_MAX_CONTENT_LENGTH)
+BATCH_ENDPOINTS = {'classify_object_batch_endpoint', 'classify_food_batch_endpoint'}
+
+@app.before_request
+def limit_request_body():
+    """Borner le corps selon la route, et le refuser (413) avant d'entrer dans la route"""
+    if request.endpoint in BATCH_ENDPOINTS:
+        request.max_content_length = app.config['BATCH_MAX_CONTENT_LENGTH']
+    # Werkzeug compare Content-Length à max_content_length à l'ouverture du flux
+    request.stream
 
 # Routes API
 @app.route('/health', methods=['GET'])
@@ -1075,10 +1156,24 @@ def health_check():
     """Vérification de l'état du service"""
     return jsonify({
         'status': 'healthy',
+        'message': 'ECOSHARE AI Service opérationnel',
         'timestamp': datetime.now().isoformat(),
-        'models_loaded': True  # Version mock
+        'models_loaded': True,  # Version mock
+        'cache': result_cache.stats(),
+        'worker_pool': analysis_pool.stats(),
+        'image_fetcher': image_fetcher.stats(),
+        'model': model_runner.stats(),
+        'dedupe': dedup_index.stats(),
+        'similar_objects': similar_index.stats(),
+        'associations': association_index.stats(),
+        'process': {'pid': os.getpid(), 'rss_bytes': memory_usage()}
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métriques au format texte Prometheus"""
+    return app.response_class(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/predict_object', methods=['POST'])
 def predict_object():
     """Endpoint pour classifier un objet"""
@@ -1089,13 +1184,17 @@ def predict_object():
         if not image_url:
             return jsonify({'error': 'URL d\'image requise'}), 400
         
-        result = enhanced_classify_object(image_url)
+        result = classify_object_cached(image_url)
         
         if result is None:
             return jsonify({'error': 'Erreur lors de la classification'}), 500
         
         return jsonify(result)
         
+    except ImageTooLargeError:
+        return jsonify({'error': 'Image trop volumineuse'}), 413
+    except PoolSaturatedError as e:
+        return service_saturated_response(e)
     except Exception as e:
         logger.error(f"Erreur dans predict_object: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
@@ -1104,25 +1203,30 @@ def predict_object():
 def classify_object_endpoint():
     """Endpoint pour classifier un objet (alias pour predict_object)"""
     try:
+        # Corps brut image/* : aucune inflation base64, une seule copie des octets
+        if request.mimetype.startswith('image/'):
+            image_bytes = read_raw_image_body()
+            if image_bytes is None:
+                return jsonify({'error': 'Image trop volumineuse'}), 413
+            
+            result = classify_object_cached(request.args.get('filename', ''), image_bytes)
+            return jsonify(result)
+        
         # Vérifier si une image est fournie dans les fichiers
         if 'image' in request.files:
             file = request.files['image']
             if file.filename == '':
                 return jsonify({'error': 'Aucun fichier sélectionné'}), 400
             
-            # Lire l'image
-            image_data = file.read()
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Classifier l'objet
-            result = classify_object(image)
+            # Pillow lit directement le fichier reçu, sans le recopier en mémoire
+            result = classify_object_cached(file.filename, file.stream)
             return jsonify(result)
         
         # Vérifier si une URL d'image est fournie
-        data = request.get_json()
+        data = request.get_json(silent=True)
         if data and 'image_url' in data:
             image_url = data.get('image_url')
-            result = enhanced_classify_object(image_url)
+            result = classify_object_cached(image_url)
             
             if result is None:
                 return jsonify({'error': 'Erreur lors de la classification'}), 500
@@ -1131,10 +1235,234 @@ def classify_object_endpoint():
         
         return jsonify({'error': 'Aucune image fournie'}), 400
         
+    except ImageTooLargeError:
+        return jsonify({'error': 'Image trop volumineuse'}), 413
+    except PoolSaturatedError as e:
+        return service_saturated_response(e)
     except Exception as e:
         logger.error(f"Erreur dans classify_object_endpoint: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
 
+@app.route('/dedupe', methods=['POST'])
+def dedupe_endpoint():
+    """Photos déjà analysées quasi identiques à l'image fournie (distance de Hamming des pHash)"""
+    try:
+        # Corps brut image/* (options dans l'URL) ou JSON {image_url, ...}
+        if request.mimetype.startswith('image/'):
+            options = request.args
+            image_data = options.get('filename', '')
+            image_bytes = read_raw_image_body()
+            if image_bytes is None:
+                return jsonify({'error': 'Image trop volumineuse'}), 413
+        else:
+            options = request.get_json(silent=True) or {}
+            image_data = options.get('image_url')
+            if not image_data:
+                return jsonify({'error': 'Aucune image fournie'}), 400
+            try:
+                image_bytes = read_image_bytes(image_data)
+            except ImageTooLargeError:
+                return jsonify({'error': 'Image trop volumineuse'}), 413
+            except Exception as e:
+                logger.error(f"Erreur lors du chargement de l'image: {e}")
+                return jsonify({'error': 'Image inaccessible'}), 400
+        
+        image = load_image_from_data(image_data, image_bytes)
+        if image is None:
+            return jsonify({'error': 'Image illisible'}), 400
+        
+        try:
+            max_distance = int(options.get('max_distance', app.config['AI_DEDUP_MAX_DISTANCE']))
+            limit = int(options.get('limit', 10))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_distance et limit doivent être des entiers'}), 400
+        item_id = str(options.get('item_id', ''))
+        if len(item_id.encode('utf-8')) > ITEM_ID_BYTES:
+            return jsonify({'error': f'item_id limité à {ITEM_ID_BYTES} octets'}), 400
+        
+        image_hash = perceptual_hash(image)
+        if image_hash is None:
+            return jsonify({'error': 'Image unie : aucune empreinte exploitable'}), 400
+        source_label = cache_source_label(image_data)
+        key = result_cache.make_key('object', image_bytes, source_label)
+        start = time.perf_counter()
+        matches = dedup_index.lookup(image_hash, max_distance, limit)
+        lookup_ms = (time.perf_counter() - start) * 1000
+        
+        # Enregistrer la photo (annonce publiée) pour les recherches suivantes
+        if str(options.get('add', '')).lower() in ('1', 'true', 'yes'):
+            dedup_index.add(image_hash, key, item_id, source_digest(source_label))
+        
+        return jsonify({
+            'success': True,
+            'hash': f'{image_hash:016x}',
+            'duplicates': [
+                {
+                    'item_id': item_id or None,
+                    'distance': distance,
+                    'same_image': match_key == key,
+                    'classification': result_cache.get(match_key)
+                }
+                for match_key, item_id, distance in matches
+            ],
+            'lookup_ms': round(lookup_ms, 3)
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur dans dedupe_endpoint: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
+
+@app.route('/similar-objects', methods=['POST'])
+def similar_objects_endpoint():
+    """Annonces visuellement proches d'une image ou d'une annonce déjà enregistrée"""
+    try:
+        # Corps brut image/* (options dans l'URL) ou JSON {image_url | item_id, ...}
+        if request.mimetype.startswith('image/'):
+            options = request.args
+            image_data = options.get('filename', '')
+            image_bytes = read_raw_image_body()
+            if image_bytes is None:
+                return jsonify({'error': 'Image trop volumineuse'}), 413
+        else:
+            options = request.get_json(silent=True) or {}
+            image_data = options.get('image_url')
+            image_bytes = None
+        
+        item_id = str(options.get('item_id', ''))
+        if len(item_id.encode('utf-8')) > ITEM_ID_BYTES:
+            return jsonify({'error': f'item_id limité à {ITEM_ID_BYTES} octets'}), 400
+        try:
+            # Paramètre d'URL ou valeur JSON : 2.5, true ou une liste sont refusés
+            k = int(str(options.get('k', 10)))
+        except ValueError:
+            k = 0
+        if k < 1:
+            return jsonify({'error': 'k doit être un entier positif'}), 400
+        k = min(k, app.config['AI_SIMILAR_MAX_RESULTS'])
+        add = str(options.get('add', '')).lower() in ('1', 'true', 'yes')
+        
+        response = {'success': True}
+        if image_bytes is not None or image_data:
+            # Caractéristiques de la classification (en cache si l'image vient d'être classifiée)
+            result = classify_object_cached(image_data, image_bytes)
+            if not result.get('image_analysis'):
+                return jsonify({'error': 'Image illisible ou inaccessible'}), 400
+            vector = feature_vector(result['image_analysis'])
+            response['category'] = result['category']
+        elif item_id:
+            vector = similar_index.vector_for(item_id)
+            if vector is None:
+                return jsonify({'error': 'Annonce inconnue'}), 404
+            add = False
+        else:
+            return jsonify({'error': 'Image ou item_id requis'}), 400
+        
+        if add and not item_id:
+            return jsonify({'error': 'item_id requis pour enregistrer l\'annonce'}), 400
+        
+        start = time.perf_counter()
+        # Une annonce enregistrée plusieurs fois (photo modifiée) n'apparaît qu'une fois
+        similar = {}
+        for match_id, distance in similar_index.lookup(vector, 2 * k + 1):
+            if match_id != item_id and match_id not in similar and len(similar) < k:
+                similar[match_id] = distance
+        response['lookup_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        response['similar'] = [
+            {'item_id': match_id, 'distance': round(distance, 4)} for match_id, distance in similar.items()
+        ]
+        
+        if add:
+            similar_index.add(vector, item_id)
+        return jsonify(response)
+        
+    except ImageTooLargeError:
+        return jsonify({'error': 'Image trop volumineuse'}), 413
+    except PoolSaturatedError as e:
+        return service_saturated_response(e)
+    except Exception as e:
+        logger.error(f"Erreur dans similar_objects_endpoint: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
+
+def service_saturated_response(error):
+    """Réponse 503 (file d'analyse pleine) ou 504 (analyse trop longue) avec Retry-After"""
+    response = jsonify({'error': 'Service saturé, réessayez plus tard'})
+    response.status_code = error.status_code
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.route('/classify-object/batch', methods=['POST'])
+def classify_object_batch_endpoint():
+    """Endpoint pour classifier plusieurs images d'objets en une seule requête"""
+    return classify_batch(classify_object_cached, 'classify_object_batch_endpoint')
+
+@app.route('/classify-food/batch', methods=['POST'])
+def classify_food_batch_endpoint():
+    """Endpoint pour classifier plusieurs images d'aliments en une seule requête"""
+    return classify_batch(classify_food_cached, 'classify_food_batch_endpoint')
+
+def classify_batch(classifier, endpoint_name):
+    """Classifier un lot d'images en parallèle, avec un résultat ou une erreur par image"""
+    try:
+        items = collect_batch_items()
+        
+        if not items:
+            return jsonify({'error': 'Aucune image fournie'}), 400
+        
+        max_items = app.config['BATCH_MAX_ITEMS']
+        if len(items) > max_items:
+            return jsonify({'error': f'Maximum {max_items} images par lot'}), 400
+        
+        # Étapes des images, exécutées dans les threads du lot, incluses au détail de la requête
+        classify_item = bind_recording(classify_batch_item)
+        futures = [
+            batch_executor.submit(classify_item, classifier, index, item)
+            for index, item in enumerate(items)
+        ]
+        results = [future.result() for future in futures]
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'results': results
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur dans {endpoint_name}: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
+
+def collect_batch_items():
+    """Extraire les images d'un lot : fichiers multipart 'images' ou liste JSON 'images'"""
+    files = request.files.getlist('images')
+    if files:
+        return [(file.filename, file.stream) for file in files]
+    
+    data = request.get_json(silent=True) or {}
+    images = data.get('images') or []
+    if not isinstance(images, list):
+        return []
+    return [(image, None) for image in images]
+
+def classify_batch_item(classifier, index, item):
+    """Classifier une image du lot sans laisser une erreur interrompre les autres"""
+    image_data, image_bytes = item
+    try:
+        if not isinstance(image_data, str) or not (image_data or image_bytes):
+            return {'index': index, 'success': False, 'error': 'Image invalide'}
+        
+        result = classifier(image_data, image_bytes)
+        if result is None:
+            return {'index': index, 'success': False, 'error': 'Erreur lors de la classification'}
+        
+        return {'index': index, 'success': True, 'result': result}
+        
+    except ImageTooLargeError:
+        return {'index': index, 'success': False, 'error': 'Image trop volumineuse'}
+    except PoolSaturatedError:
+        return {'index': index, 'success': False, 'error': 'Service saturé, réessayez plus tard'}
+    except Exception as e:
+        logger.error(f"Erreur lors de la classification de l'image {index} du lot: {e}")
+        return {'index': index, 'success': False, 'error': 'Erreur lors de la classification'}
+
 @app.route('/predict_food', methods=['POST'])
 def predict_food():
     """Endpoint pour classifier un aliment"""
@@ -1145,13 +1473,15 @@ def predict_food():
         if not image_url:
             return jsonify({'error': 'URL d\'image requise'}), 400
         
-        result = mock_classify_food(image_url)
+        result = classify_food_cached(image_url)
         
         if result is None:
             return jsonify({'error': 'Erreur lors de la classification'}), 500
         
         return jsonify(result)
         
+    except ImageTooLargeError:
+        return jsonify({'error': 'Image trop volumineuse'}), 413
     except Exception as e:
         logger.error(f"Erreur dans predict_food: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
@@ -1160,25 +1490,36 @@ def predict_food():
 def classify_food_endpoint():
     """Endpoint pour classifier un aliment (alias pour predict_food)"""
     try:
+        # Corps brut image/* : aucune inflation base64, une seule copie des octets
+        if request.mimetype.startswith('image/'):
+            image_bytes = read_raw_image_body()
+            if image_bytes is None:
+                return jsonify({'error': 'Image trop volumineuse'}), 413
+            
+            result = classify_food_cached(request.args.get('filename', ''), image_bytes)
+            if result is None:
+                return jsonify({'error': 'Erreur lors de la classification'}), 500
+            
+            return jsonify(result)
+        
         # Vérifier si une image est fournie dans les fichiers
         if 'image' in request.files:
             file = request.files['image']
             if file.filename == '':
                 return jsonify({'error': 'Aucun fichier sélectionné'}), 400
             
-            # Lire l'image
-            image_data = file.read()
-            image = Image.open(io.BytesIO(image_data))
+            # Classifier l'aliment à partir du fichier reçu, sans le recopier en mémoire
+            result = classify_food_cached(file.filename, file.stream)
+            if result is None:
+                return jsonify({'error': 'Erreur lors de la classification'}), 500
             
-            # Classifier l'aliment
-            result = classify_food(image)
             return jsonify(result)
         
         # Vérifier si une URL d'image est fournie
-        data = request.get_json()
+        data = request.get_json(silent=True)
         if data and 'image_url' in data:
             image_url = data.get('image_url')
-            result = mock_classify_food(image_url)
+            result = classify_food_cached(image_url)
             
             if result is None:
                 return jsonify({'error': 'Erreur lors de la classification'}), 500
@@ -1187,11 +1528,14 @@ def classify_food_endpoint():
         
         return jsonify({'error': 'Aucune image fournie'}), 400
         
+    except ImageTooLargeError:
+        return jsonify({'error': 'Image trop volumineuse'}), 413
     except Exception as e:
         logger.error(f"Erreur dans classify_food_endpoint: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
 
 @app.route('/generate_diy', methods=['POST'])
+@app.route('/generate-diy', methods=['POST'])
 def generate_diy():
     """Endpoint pour générer des instructions DIY"""
     try:
@@ -1200,11 +1544,19 @@ def generate_diy():
         object_name = data.get('object_name', 'objet')
         object_description = data.get('description', '')
         object_condition = data.get('condition', 'good')
+        difficulty = data.get('difficulty')
         
         if not category:
             return jsonify({'error': 'Catégorie requise'}), 400
-        
-        diy_instructions = generate_diy_instructions(category, object_name, object_description, object_condition)
+        # Valeurs utilisées comme clés du catalogue mémoïsé : des chaînes uniquement
+        if not all(isinstance(value, str) for value in (category, object_name, object_description, object_condition)):
+            return jsonify({'error': 'category, object_name, description et condition doivent être des chaînes'}), 400
+        if difficulty is not None and not isinstance(difficulty, str):
+            return jsonify({'error': 'difficulty doit être une chaîne'}), 400
+        
+        diy_instructions = generate_diy_instructions(
+            category, object_name, object_description, object_condition, difficulty
+        )
         
         return jsonify({
             'success': True,
@@ -1236,6 +1588,36 @@ def generate_recipe():
         logger.error(f"Erreur dans generate_recipe: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
 
+@app.route('/generate-recipes', methods=['POST'])
+def generate_recipes():
+    """Endpoint pour générer des recettes à partir d'ingrédients"""
+    try:
+        data = request.get_json()
+        ingredients = data.get('ingredients') or []
+        restrictions = data.get('dietary_restrictions') or []
+        allergens = data.get('allergens') or []
+        servings = data.get('servings')
+        
+        if not all(isinstance(value, list) for value in (ingredients, restrictions, allergens)):
+            return jsonify({'error': 'ingredients, dietary_restrictions et allergens doivent être des listes'}), 400
+        if not ingredients:
+            return jsonify({'error': 'Au moins un ingrédient est requis'}), 400
+        # Quantités mises à l'échelle : "4", True, 0 ou une valeur négative sont refusés
+        if servings is not None and (not isinstance(servings, int) or isinstance(servings, bool) or servings < 1):
+            return jsonify({'error': 'servings doit être un entier positif'}), 400
+        dietary_restrictions = restrictions + allergens
+        
+        recipes = generate_recipe_instructions(None, ingredients, dietary_restrictions, servings)
+        
+        return jsonify({
+            'success': True,
+            'recipes': recipes
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur dans generate_recipes: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
+
 @app.route('/estimate_value', methods=['POST'])
 def estimate_value():
     """Endpoint pour estimer la valeur d'un objet"""
@@ -1258,6 +1640,199 @@ def estimate_value():
         logger.error(f"Erreur dans estimate_value: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
 
+@app.route('/recommend-associations', methods=['POST'])
+def recommend_associations_endpoint():
+    """Associations proches acceptant la catégorie d'un objet ou d'un aliment, classées par priorité et distance"""
+    try:
+        data = request.get_json(silent=True) or {}
+        location = parse_coordinates(data.get('location') or {})
+        if location is None:
+            return jsonify({'error': 'location.lat et location.lng valides requis'}), 400
+        if not data.get('category') or not isinstance(data['category'], str):
+            return jsonify({'error': 'Catégorie requise'}), 400
+        if not isinstance(data.get('description') or '', str):
+            return jsonify({'error': 'description doit être une chaîne'}), 400
+        try:
+            limit = int(data.get('limit', app.config['AI_ASSOCIATION_RESULTS']))
+            max_km = float(data.get('max_km', app.config['AI_ASSOCIATION_MAX_KM']))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'limit et max_km doivent être des nombres'}), 400
+        if not 1 <= limit <= 50:
+            return jsonify({'error': 'limit doit être compris entre 1 et 50'}), 400
+        
+        snapshot = association_index.snapshot()
+        if snapshot is None:
+            return jsonify({'error': 'Aucune association chargée'}), 503
+        
+        category = association_category(data['category'], data.get('description') or '')
+        start = time.perf_counter()
+        recommendations = snapshot.recommend(category, *location, limit, max_km)
+        lookup_ms = (time.perf_counter() - start) * 1000
+        
+        return jsonify({
+            'success': True,
+            'category': category,
+            'associations': [
+                {
+                    'association_id': association['id'],
+                    'name': association['name'],
+                    'distance_km': round(distance, 2),
+                    'priority': priority,
+                    'is_food_bank': association['is_food_bank'],
+                    'reason': recommendation_reason(association, category, distance, priority)
+                }
+                for association, distance, priority in recommendations
+            ],
+            'lookup_ms': round(lookup_ms, 3)
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur dans recommend_associations_endpoint: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
+
+@app.route('/associations/refresh', methods=['POST'])
+def refresh_associations_endpoint():
+    """Remplacer les associations par un export JSON complet de la collection Association"""
+    try:
+        try:
+            documents = read_export(request.get_data(as_text=True))
+        except ValueError:
+            return jsonify({'error': 'Export JSON invalide'}), 400
+        if not isinstance(documents, list):
+            return jsonify({'error': 'Liste d\'associations attendue'}), 400
+        for position, document in enumerate(documents):
+            error = document_error(document)
+            if error:
+                return jsonify({'error': f'Association {position} invalide : {error}'}), 400
+        
+        start = time.perf_counter()
+        snapshot = association_index.refresh(documents)
+        return jsonify({
+            'success': True,
+            'received': len(documents),
+            'loaded': len(snapshot),
+            'categories': snapshot.stats()['categories'],
+            'build_ms': round((time.perf_counter() - start) * 1000, 1)
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur dans refresh_associations_endpoint: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
+
+def association_category(category, description=''):
+    """Valeur de acceptedCategories correspondant à une catégorie d'objet ou d'aliment"""
+    category = category.strip().lower()
+    if category in ACCEPTED_CATEGORIES:
+        return category
+    if category in FOOD_CATEGORIES:
+        return 'food'
+    if category in OBJECT_CATEGORIES:
+        return 'other'
+    
+    # Catégorie libre : mots-clés de la catégorie et de la description
+    matched = keyword_matcher.find(searchable_text(f'{category} {description}'))
+    if any(FOOD_TAXONOMY.category_counts(matched).values()):
+        return 'food'
+    counts = OBJECT_TAXONOMY.category_counts(matched)
+    best = max(counts, key=counts.get)
+    return best if counts[best] and best in ACCEPTED_CATEGORIES else 'other'
+
+def recommendation_reason(association, category, distance, priority):
+    """Explication courte d'une recommandation"""
+    if association['is_food_bank'] and category == 'food':
+        reason = 'Banque alimentaire'
+    elif category in association['accepted']:
+        reason = f'Accepte la catégorie {category}'
+    else:
+        reason = 'Accepte tous les dons'
+    reason += f', à {distance:.1f} km'
+    if priority >= 4:
+        reason += f', priorité {PRIORITY_LABELS[priority]}'
+    return reason
+
+@app.route('/optimize-route', methods=['POST'])
+def optimize_route_endpoint():
+    """Ordre des collectes et dépôts d'un lot de livraisons (plus proche voisin puis 2-opt)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        deliveries = data.get('deliveries')
+        if not deliveries or not isinstance(deliveries, list):
+            return jsonify({'error': 'Liste de livraisons requise'}), 400
+        if len(deliveries) > app.config['AI_ROUTE_MAX_DELIVERIES']:
+            return jsonify({'error': f"Maximum {app.config['AI_ROUTE_MAX_DELIVERIES']} livraisons par tournée"}), 400
+        
+        pickups, dropoffs = [], []
+        for position, delivery in enumerate(deliveries):
+            pickup, dropoff = delivery_coordinates(delivery)
+            if pickup is None or dropoff is None:
+                return jsonify({'error': f'Collecte ou dépôt invalide (livraison {position})'}), 400
+            pickups.append(pickup)
+            dropoffs.append(dropoff)
+        start = None
+        if data.get('start') is not None:
+            start = parse_coordinates(data['start'])
+            if start is None:
+                return jsonify({'error': 'Point de départ invalide'}), 400
+        try:
+            time_budget = float(data.get('time_budget_ms', app.config['AI_ROUTE_TIME_BUDGET_MS']))
+        except (TypeError, ValueError):
+            time_budget = math.nan
+        # NaN désactiverait l'échéance du 2-opt
+        if not math.isfinite(time_budget):
+            return jsonify({'error': 'time_budget_ms doit être un nombre fini'}), 400
+        time_budget = min(time_budget, 10 * app.config['AI_ROUTE_TIME_BUDGET_MS'])
+        
+        start_time = time.perf_counter()
+        route = optimize_route(pickups, dropoffs, start, max(time_budget, 0.0) / 1000)
+        optimization_ms = (time.perf_counter() - start_time) * 1000
+        
+        stops = []
+        cumulative = 0.0
+        for stop, leg in zip(route['order'], route['legs_km']):
+            delivery = deliveries[stop // 2]
+            lat, lng = (pickups if stop % 2 == 0 else dropoffs)[stop // 2]
+            cumulative += leg
+            stops.append({
+                'delivery_id': document_id(delivery.get('id') or delivery.get('_id')) or str(stop // 2),
+                'type': 'pickup' if stop % 2 == 0 else 'dropoff',
+                'location': {'lat': lat, 'lng': lng},
+                'distance_km': round(leg, 3),
+                'cumulative_km': round(cumulative, 3)
+            })
+        
+        return jsonify({
+            'success': True,
+            'stops': stops,
+            'total_distance_km': round(route['total_km'], 3),
+            'initial_distance_km': round(route['initial_km'], 3),
+            'improvements': route['moves'],
+            'converged': route['converged'],
+            'optimization_ms': round(optimization_ms, 1)
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur dans optimize_route_endpoint: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
+
+def parse_coordinates(point):
+    """(lat, lng) d'un point {lat, lng}, None s'il est invalide"""
+    try:
+        lat, lng = float(point['lat']), float(point['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (lat, lng) if -90 <= lat <= 90 and -180 <= lng <= 180 else None
+
+def delivery_coordinates(delivery):
+    """Points de collecte et de dépôt : {pickup, dropoff} ou champs du modèle Delivery"""
+    if not isinstance(delivery, dict):
+        return None, None
+    addresses = delivery.get('addresses') or {}
+    pickup = (delivery.get('pickup') or (delivery.get('pickupAddress') or {}).get('coordinates')
+              or (addresses.get('pickup') or {}).get('coordinates'))
+    dropoff = (delivery.get('dropoff') or (delivery.get('deliveryAddress') or {}).get('coordinates')
+               or (addresses.get('delivery') or {}).get('coordinates'))
+    return parse_coordinates(pickup or {}), parse_coordinates(dropoff or {})
+
 @app.route('/check_recyclability', methods=['POST'])
 def check_recyclability_endpoint():
     """Endpoint pour vérifier la recyclabilité"""
@@ -1280,21 +1855,37 @@ def check_recyclability_endpoint():
         logger.error(f"Erreur dans check_recyclability: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({'error': 'Requête trop volumineuse'}), 413
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Route non trouvée', 'available_routes': [
         '/health',
+        '/metrics',
         '/predict_object',
         '/classify-object',
+        '/classify-object/batch',
+        '/dedupe',
+        '/similar-objects',
         '/predict_food',
-        '/classify-food', 
+        '/classify-food',
+        '/classify-food/batch',
         '/generate_diy',
+        '/generate-diy',
         '/generate_recipe',
+        '/generate-recipes',
         '/estimate_value',
-        '/check_recyclability'
+        '/check_recyclability',
+        '/recommend-associations',
+        '/associations/refresh',
+        '/optimize-route'
     ]}), 404
 
 if __name__ == '__main__':
-    import os
-    port = app.config['PORT']
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    import sys
+    from server import run_server
+    # gunicorn.conf.py et async_app.py importent 'app' : le module lancé, pas une seconde copie
+    sys.modules['app'] = sys.modules[__name__]
+    run_server(app)
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""
+Associations partenaires (export JSON de la collection Association) indexées par catégorie acceptée et position
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Valeurs de acceptedCategories (Backend/models/Association.js) ; 'other' : tous les dons
+ACCEPTED_CATEGORIES = ('electronics', 'clothing', 'furniture', 'books', 'toys', 'food', 'other')
+
+# Priorité d'une recommandation : 1 (faible) à 5 (besoin urgent signalé par l'association)
+NEED_PRIORITIES = {'low': 2, 'medium': 3, 'high': 4, 'urgent': 5}
+PRIORITY_LABELS = {1: 'très faible', 2: 'faible', 3: 'moyenne', 4: 'élevée', 5: 'urgente'}
+# Classement par distance effective (distance x facteur) : un besoin urgent passe devant une association plus proche
+PRIORITY_FACTORS = np.array([1.6, 1.6, 1.3, 1.0, 0.7, 0.5])
+
+
+def read_export(text):
+    """Documents d'un export (tableau JSON, {"associations": [...]}, ou un document JSON par ligne)"""
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        # mongoexport sans --jsonArray : un document par ligne
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        return data.get('associations', [data])
+    return data
+
+
+def document_id(value):
+    """Identifiant d'un document exporté (chaîne ou {"$oid": ...})"""
+    if isinstance(value, dict):
+        value = value.get('$oid', '')
+    return str(value or '')
+
+
+def document_error(document):
+    """Raison pour laquelle un document exporté est inutilisable, ou None"""
+    if not isinstance(document, dict):
+        return 'objet JSON attendu'
+    for field in ('address', 'capacity'):
+        if not isinstance(document.get(field) or {}, dict):
+            return f'{field} doit être un objet'
+    accepted = document.get('acceptedCategories') or []
+    if not isinstance(accepted, list) or not all(isinstance(category, str) for category in accepted):
+        return 'acceptedCategories doit être une liste de chaînes'
+    needs = document.get('needs') or []
+    if not isinstance(needs, list) or not all(
+            isinstance(need, dict) and all(isinstance(need.get(field) or '', str) for field in ('category', 'priority'))
+            for need in needs):
+        return 'needs doit être une liste de {category, priority}'
+    capacity = document.get('capacity') or {}
+    if not all(isinstance(capacity.get(field) or 0, (int, float)) for field in ('maxItemsPerDay', 'currentItems')):
+        return 'capacity.maxItemsPerDay et capacity.currentItems doivent être des nombres'
+    return None
+
+
+def association_priority(document, category):
+    """Priorité d'une association pour une catégorie (besoins signalés, banque alimentaire, capacité)"""
+    priorities = [
+        NEED_PRIORITIES.get(need.get('priority'), 3)
+        for need in document.get('needs') or [] if need.get('category') == category
+    ]
+    if priorities:
+        priority = max(priorities)
+    elif category == 'food' and document.get('type') == 'food_bank':
+        priority = 4
+    elif category in (document.get('acceptedCategories') or []):
+        priority = 3
+    else:
+        # Acceptée seulement au titre de 'other'
+        priority = 2
+    capacity = document.get('capacity') or {}
+    if capacity.get('maxItemsPerDay') and capacity.get('currentItems', 0) >= capacity['maxItemsPerDay']:
+        priority -= 1
+    return max(priority, 1)
+
+
+class AssociationSnapshot:
+    """Associations actives géolocalisées : un BallTree (distance haversine) par catégorie acceptée
+
+    Une association qui accepte 'other' figure dans l'arbre de chaque catégorie. Les
+    priorités de chaque (association, catégorie) sont calculées à la construction.
+    """
+
+    def __init__(self, documents):
+        from sklearn.neighbors import BallTree
+
+        self.associations = []
+        coordinates = []
+        for document in documents:
+            point = (document.get('address') or {}).get('coordinates') or {}
+            try:
+                lat, lng = float(point['lat']), float(point['lng'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if document.get('status') != 'active' or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                continue
+            accepted = set(document.get('acceptedCategories') or [])
+            self.associations.append({
+                'id': document_id(document.get('_id')),
+                'name': document.get('name', ''),
+                'is_food_bank': document.get('type') == 'food_bank',
+                'accepted': accepted,
+                'priorities': {
+                    category: association_priority(document, category) for category in ACCEPTED_CATEGORIES
+                }
+            })
+            coordinates.append((math.radians(lat), math.radians(lng)))
+        coordinates = np.array(coordinates, dtype=np.float64).reshape(-1, 2)
+
+        # Index des catégories acceptées : (lignes, arbre, priorités) par catégorie
+        self.trees = {}
+        for category in ACCEPTED_CATEGORIES:
+            rows = np.array([
+                row for row, association in enumerate(self.associations)
+                if category in association['accepted'] or 'other' in association['accepted']
+            ], dtype=np.intp)
+            if len(rows):
+                priorities = np.array([self.associations[row]['priorities'][category] for row in rows])
+                self.trees[category] = (rows, BallTree(coordinates[rows], metric='haversine'), priorities)
+
+    def __len__(self):
+        return len(self.associations)
+
+    def recommend(self, category, lat, lng, limit=5, max_km=50.0):
+        """[(association, distance en km, priorité)] classées par distance effective"""
+        entry = self.trees.get(category)
+        if entry is None:
+            return []
+        rows, tree, priorities = entry
+        # Les plus proches d'abord ; la priorité ne fait passer devant que dans un rapport de distance borné
+        k = min(len(rows), max(8 * limit, 32))
+        distances, indexes = tree.query([[math.radians(lat), math.radians(lng)]], k=k)
+        distances, indexes = distances[0] * EARTH_RADIUS_KM, indexes[0]
+        within = distances <= max_km
+        distances, indexes = distances[within], indexes[within]
+        ranked = np.lexsort((distances, distances * PRIORITY_FACTORS[priorities[indexes]]))[:limit]
+        return [
+            (self.associations[rows[indexes[i]]], float(distances[i]), int(priorities[indexes[i]]))
+            for i in ranked
+        ]
+
+    def stats(self):
+        return {
+            'size': len(self.associations),
+            'categories': {category: len(rows) for category, (rows, _, _) in self.trees.items()}
+        }
+
+
+class AssociationIndex:
+    """Dernière photographie des associations, rechargée quand le fichier partagé change
+
+    Avec un chemin, refresh() remplace le fichier (écriture atomique) et chaque worker
+    relit la nouvelle version à sa requête suivante ; sans chemin, la photographie reste
+    propre au processus qui a reçu la mise à jour.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._mtime = None
+        self._loaded_at = None
+
+    def snapshot(self):
+        """Photographie courante (None si aucune n'a été chargée)"""
+        if self.path:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != self._mtime:
+                with self._lock:
+                    if mtime != self._mtime:
+                        self._load(mtime)
+        return self._snapshot
+
+    def refresh(self, documents):
+        """Remplacer la photographie par celle d'un export complet de la collection"""
+        snapshot = AssociationSnapshot(documents)
+        with self._lock:
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                temporary = f'{self.path}.{os.getpid()}.tmp'
+                with open(temporary, 'w', encoding='utf-8') as f:
+                    json.dump(documents, f, ensure_ascii=False)
+                os.replace(temporary, self.path)
+                self._mtime = os.stat(self.path).st_mtime_ns
+            self._install(snapshot)
+        return snapshot
+
+    def stats(self):
+        snapshot = self._snapshot
+        stats = snapshot.stats() if snapshot is not None else {'size': 0, 'categories': {}}
+        return dict(stats, loaded_at=self._loaded_at, persistent=bool(self.path))
+
+    def _load(self, mtime):
+        start = time.perf_counter()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = AssociationSnapshot(read_export(f.read()))
+        except (OSError, ValueError) as e:
+            logger.error(f"Erreur lors du chargement des associations: {e}")
+            return
+        finally:
+            self._mtime = mtime
+        self._install(snapshot)
+        logger.info(f"{len(snapshot)} associations chargées en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def _install(self, snapshot):
+        self._snapshot = snapshot
+        self._loaded_at = datetime.now().isoformat(timespec='seconds')
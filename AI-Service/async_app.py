@@ -0,0 +1,210 @@
+"""
+Variante asyncio (aiohttp) des routes de classification
+
+Les images distantes sont téléchargées sans bloquer de worker : un seul processus
+attend des centaines de téléchargements à la fois, tandis que les étapes d'analyse
+(décodage, OpenCV, scoring) s'exécutent dans un pool de threads dédié ou dans le
+pool de processus d'analyse s'il est activé.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from aiohttp import web
+
+import app as service
+from image_fetcher import AsyncImageFetcher, ImageFetchError
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry, timed_stage
+from tracing import memory_usage
+from worker_pool import PoolSaturatedError
+
+logger = logging.getLogger(__name__)
+
+settings = service.app.config
+
+fetcher_key = web.AppKey('fetcher', AsyncImageFetcher)
+cpu_executor_key = web.AppKey('cpu_executor', ThreadPoolExecutor)
+
+# Sérialisation des résultats mesurée comme en mode synchrone
+serialize_json = timed_stage('serialization')(json.dumps)
+
+
+def create_app():
+    """Construire l'application aiohttp (fetcher et exécuteur créés au démarrage)"""
+    application = web.Application(
+        client_max_size=settings['MAX_IMAGE_BYTES'] * 4 // 3 + 1024 * 1024,
+        middlewares=[request_metrics]
+    )
+    application.add_routes([
+        web.get('/health', health_check),
+        web.get('/metrics', metrics_endpoint),
+        web.post('/predict_object', predict_object),
+        web.post('/classify-object', predict_object),
+        web.post('/predict_food', predict_food),
+        web.post('/classify-food', predict_food)
+    ])
+    application.cleanup_ctx.append(analysis_resources)
+    return application
+
+
+async def analysis_resources(application):
+    """Client HTTP asynchrone et exécuteur des étapes CPU, fermés à l'arrêt"""
+    application[fetcher_key] = AsyncImageFetcher(
+        max_bytes=settings['MAX_IMAGE_BYTES'],
+        max_connections=settings['AI_ASYNC_FETCH_CONNECTIONS'],
+        timeout=settings['AI_FETCH_TIMEOUT'],
+        cache_dir=settings['AI_FETCH_CACHE_DIR'] or None,
+        cache_max_bytes=settings['AI_FETCH_CACHE_MAX_SIZE'],
+        negative_ttl=settings['AI_FETCH_NEGATIVE_TTL'],
+        negative_max_entries=settings['AI_FETCH_NEGATIVE_MAX_ENTRIES']
+    )
+    application[cpu_executor_key] = ThreadPoolExecutor(
+        max_workers=settings['AI_ASYNC_CPU_WORKERS'], thread_name_prefix='analysis'
+    )
+    if settings['AI_WARMUP'] != 'off':
+        # Imports lourds hors de la boucle : /health répond pendant le préchauffage
+        application[cpu_executor_key].submit(service.warm_up)
+    yield
+    await application[fetcher_key].close()
+    application[cpu_executor_key].shutdown(wait=False)
+
+
+@web.middleware
+async def request_metrics(request, handler):
+    """Compter la requête et mesurer sa durée et la taille de son corps, par route"""
+    start = time.perf_counter()
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource is not None else 'unmatched'
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        service.REQUESTS.inc(route, request.method, str(status))
+        service.REQUEST_SECONDS.observe(time.perf_counter() - start, route)
+        if request.content_length:
+            service.PAYLOAD_BYTES.observe(request.content_length, route)
+
+
+async def run_cpu_stage(request, function, *args):
+    """Exécuter une étape CPU hors de la boucle d'événements"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app[cpu_executor_key], function, *args)
+
+
+async def read_image_source(request):
+    """(source, octets) de la requête : corps brut image/* ou JSON {image_url} (octets None)"""
+    if request.content_type.startswith('image/'):
+        body = await request.read()
+        if len(body) > settings['MAX_IMAGE_BYTES']:
+            raise web.HTTPRequestEntityTooLarge(max_size=settings['MAX_IMAGE_BYTES'], actual_size=len(body))
+        return request.query.get('filename', ''), body
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    image_url = data.get('image_url') if isinstance(data, dict) else None
+    return image_url or None, None
+
+
+async def health_check(request):
+    """Vérification de l'état du service"""
+    return web.json_response({
+        'status': 'healthy',
+        'message': 'ECOSHARE AI Service opérationnel',
+        'timestamp': datetime.now().isoformat(),
+        'models_loaded': True,
+        'mode': 'async',
+        'cache': service.result_cache.stats(),
+        'worker_pool': service.analysis_pool.stats(),
+        'image_fetcher': request.app[fetcher_key].stats(),
+        'model': service.model_runner.stats(),
+        'dedupe': service.dedup_index.stats(),
+        'similar_objects': service.similar_index.stats(),
+        'associations': service.association_index.stats(),
+        'process': {'pid': os.getpid(), 'rss_bytes': memory_usage()}
+    })
+
+
+async def metrics_endpoint(request):
+    """Métriques au format texte Prometheus"""
+    return web.Response(body=metrics_registry.render().encode('utf-8'),
+                        headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+
+async def predict_object(request):
+    """Classifier un objet ; le téléchargement de l'image est attendu sans bloquer"""
+    try:
+        image_data, image_bytes = await read_image_source(request)
+        if image_data is None:
+            return web.json_response({'error': 'URL d\'image requise'}, status=400)
+
+        if image_bytes is None and isinstance(image_data, str) and image_data.startswith(('http://', 'https://')):
+            try:
+                image_bytes = await request.app[fetcher_key].fetch_async(image_data)
+            except ImageFetchError as e:
+                # Même repli que le mode synchrone quand l'image est inaccessible
+                logger.error(f"Erreur lors du chargement de l'image: {e}")
+                return web.json_response(service.fallback_classification(image_data), dumps=serialize_json)
+
+        result = await run_cpu_stage(request, service.classify_object_cached, image_data, image_bytes)
+        return web.json_response(result, dumps=serialize_json)
+
+    except service.ImageTooLargeError:
+        return web.json_response({'error': 'Image trop volumineuse'}, status=413)
+    except PoolSaturatedError as e:
+        return service_saturated_response(e)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur dans predict_object (async): {e}")
+        return web.json_response({'error': 'Erreur interne du serveur'}, status=500)
+
+
+async def predict_food(request):
+    """Classifier un aliment"""
+    try:
+        # La classification d'aliment n'exploite que l'URL : rien à télécharger
+        image_data, image_bytes = await read_image_source(request)
+        if image_data is None and image_bytes is None:
+            return web.json_response({'error': 'URL d\'image requise'}, status=400)
+
+        result = await run_cpu_stage(request, service.classify_food_cached, image_data, image_bytes)
+        if result is None:
+            return web.json_response({'error': 'Erreur lors de la classification'}, status=500)
+        return web.json_response(result, dumps=serialize_json)
+
+    except service.ImageTooLargeError:
+        return web.json_response({'error': 'Image trop volumineuse'}, status=413)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur dans predict_food (async): {e}")
+        return web.json_response({'error': 'Erreur interne du serveur'}, status=500)
+
+
+def service_saturated_response(error):
+    """Réponse 503 (file d'analyse pleine) ou 504 (analyse trop longue) avec Retry-After"""
+    return web.json_response(
+        {'error': 'Service saturé, réessayez plus tard'},
+        status=error.status_code,
+        headers={'Retry-After': str(error.retry_after)}
+    )
+
+
+def run(port=None):
+    web.run_app(create_app(), port=port or settings['PORT'])
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark : classifications d'URL simultanées, mode asynchrone vs workers synchrones
+
+Un CDN local répond avec une latence fixe ; on mesure le temps total pour N
+classifications lancées en même temps contre :
+- le mode aiohttp (un seul processus, une seule boucle d'événements) ;
+- un pool de threads de la taille des workers gunicorn (AI_WEB_THREADS par défaut).
+
+Usage : python benchmarks/bench_async_fetch.py [--requests 100] [--latency 1.0] [--threads 8]
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire parent au path pour importer l'app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.test_utils import TestServer
+
+import app as service
+from async_app import create_app
+
+
+def build_image():
+    rng = np.random.default_rng(0)
+    # Petite image : le coût mesuré est celui de l'attente réseau, pas de l'analyse
+    pixels = rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def start_cdn(latency, body):
+    class SlowHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def run_threaded(urls, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(service.classify_object_cached, urls))
+        elapsed = time.perf_counter() - start
+    assert all(result['image_analysis'] for result in results)
+    return elapsed
+
+
+async def run_async(urls):
+    async with TestServer(create_app()) as server:
+        async with ClientSession(connector=TCPConnector(limit=0)) as session:
+            async def classify(url):
+                async with session.post(server.make_url('/predict_object'), json={'image_url': url}) as response:
+                    return await response.json()
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*[classify(url) for url in urls])
+            elapsed = time.perf_counter() - start
+    assert all(result['image_analysis'] for result in results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=1.0)
+    parser.add_argument('--threads', type=int, default=service.app.config['WEB_THREADS'])
+    args = parser.parse_args()
+    logging.getLogger('aiohttp.access').setLevel(logging.WARNING)
+
+    server, base_url = start_cdn(args.latency, build_image())
+    # URLs distinctes : ni le cache de résultats ni le cache d'images ne servent
+    threaded_urls = [f'{base_url}/sync-{i}.jpg' for i in range(args.requests)]
+    async_urls = [f'{base_url}/async-{i}.jpg' for i in range(args.requests)]
+
+    threaded_time = run_threaded(threaded_urls, args.threads)
+    async_time = asyncio.run(run_async(async_urls))
+    server.shutdown()
+
+    print(f"{args.requests} classifications d'URL, latence CDN {args.latency * 1e3:.0f} ms")
+    print(f"Workers synchrones ({args.threads} threads) : {threaded_time:6.2f} s "
+          f"({args.requests / threaded_time:6.1f} req/s)")
+    print(f"Mode asynchrone (1 processus)      : {async_time:6.2f} s "
+          f"({args.requests / async_time:6.1f} req/s, x{threaded_time / async_time:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Mesure mémoire : data URL base64 en JSON vs corps brut image/* vs multipart
+
+Pic d'allocations Python (tracemalloc) pendant le traitement d'une requête
+/classify-object, requête déjà construite et cache de résultats vidé.
+
+Usage : python benchmarks/bench_ingestion_memory.py [--width 4000 --height 3000]
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire parent au path pour importer l'app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from app import app, result_cache
+
+
+def make_jpeg(width, height):
+    """Photo synthétique (dégradés + grain) d'un poids comparable à une photo de téléphone"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                       np.broadcast_to((x + y) / 2, (height, width))], axis=-1)
+    pixels = np.clip(pixels + rng.normal(0, 12, pixels.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def measure(**request_kwargs):
+    """Pic mémoire (Mio) du traitement d'une requête dont l'environnement est déjà prêt"""
+    result_cache.clear()
+    with app.test_request_context('/classify-object', method='POST', **request_kwargs):
+        tracemalloc.start()
+        response = app.full_dispatch_request()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    args = parser.parse_args()
+
+    jpeg = make_jpeg(args.width, args.height)
+    data_url = 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()
+
+    results = {
+        'JSON + data URL base64': measure(data=json.dumps({'image_url': data_url}),
+                                          content_type='application/json'),
+        'Corps brut image/jpeg': measure(data=jpeg, content_type='image/jpeg'),
+        'Multipart image': measure(data={'image': (io.BytesIO(jpeg), 'photo.jpg')},
+                                   content_type='multipart/form-data'),
+    }
+
+    print(f"Image JPEG {args.width}x{args.height} : {len(jpeg) / (1024 * 1024):.1f} Mio")
+    for name, peak in results.items():
+        print(f"{name:<24} pic {peak:7.1f} Mio")
+
+
+if __name__ == '__main__':
+    main()
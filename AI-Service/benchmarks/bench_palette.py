@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark : palette par histogramme vs k-means OpenCV (10 essais)
+
+Mesure le temps par image et l'écart entre palettes : distance moyenne pondérée
+de chaque pixel échantillonné à la couleur de palette la plus proche.
+
+Usage : python benchmarks/bench_palette.py [--images 50]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire parent au path pour importer les modules du service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from palette import histogram_palette, kmeans_palette, sample_pixels
+
+
+def build_images(count):
+    """Photos synthétiques : dégradés, aplats et bruit, 512 px de côté maximum"""
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        height, width = rng.integers(256, 513, size=2)
+        base = rng.integers(0, 256, size=3)
+        x = np.linspace(0, 1, width)[None, :, None]
+        y = np.linspace(0, 1, height)[:, None, None]
+        pixels = base + 120 * x * rng.uniform(-1, 1, 3) + 120 * y * rng.uniform(-1, 1, 3)
+        top, left = rng.integers(0, height // 2), rng.integers(0, width // 2)
+        pixels[top:top + height // 3, left:left + width // 3] = rng.integers(0, 256, size=3)
+        pixels += rng.normal(0, 12, pixels.shape)
+        images.append(np.clip(pixels, 0, 255).astype(np.uint8))
+    return images
+
+
+def quantization_error(img_array, palette):
+    pixels = sample_pixels(img_array).astype(np.float64)
+    centers = np.array([color['rgb'] for color in palette])
+    distances = np.sqrt(((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2))
+    return distances.min(axis=1).mean()
+
+
+def time_engine(engine, images):
+    start = time.perf_counter()
+    palettes = [engine(image) for image in images]
+    return (time.perf_counter() - start) / len(images), palettes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=50)
+    args = parser.parse_args()
+
+    images = build_images(args.images)
+    kmeans_time, kmeans_palettes = time_engine(kmeans_palette, images)
+    histogram_time, histogram_palettes = time_engine(histogram_palette, images)
+
+    assert histogram_palettes == [histogram_palette(image) for image in images]
+    kmeans_error = np.mean([quantization_error(i, p) for i, p in zip(images, kmeans_palettes)])
+    histogram_error = np.mean([quantization_error(i, p) for i, p in zip(images, histogram_palettes)])
+
+    print(f"{args.images} images")
+    print(f"k-means OpenCV : {kmeans_time * 1e3:7.2f} ms/image, erreur moyenne {kmeans_error:5.1f}")
+    print(f"Histogramme    : {histogram_time * 1e3:7.2f} ms/image, erreur moyenne {histogram_error:5.1f} "
+          f"(x{kmeans_time / histogram_time:.1f}, déterministe)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'index des quasi-doublons (phash_index.py) sur des empreintes aléatoires
+
+Remplit un index de --size empreintes (dont une part de variantes proches), puis mesure
+la latence des recherches par distance maximale, comparée à un parcours exhaustif
+(XOR + comptage de bits sur tout le tableau), et vérifie que les résultats sont identiques.
+
+Usage : python benchmarks/bench_phash_index.py [--size 1000000] [--queries 500] [--file /tmp/phash.idx]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ajouter le répertoire parent au path pour importer le module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phash_index import RECORD, HashIndex, popcount64
+
+
+def build_hashes(size, seed):
+    """Empreintes aléatoires, dont 10 % de variantes d'une autre (1 à 12 bits inversés)"""
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2 ** 63, size, dtype=np.uint64) ^ rng.integers(0, 2, size, dtype=np.uint64) << 63
+    variants = rng.choice(size, size // 10, replace=False)
+    sources = rng.integers(0, size, len(variants))
+    for count in range(1, 13):
+        selected = variants[count - 1::12]
+        flips = np.zeros(len(selected), dtype=np.uint64)
+        for _ in range(count):
+            flips |= np.uint64(1) << rng.integers(0, 64, len(selected)).astype(np.uint64)
+        hashes[selected] = hashes[sources[count - 1::12]] ^ flips
+    return hashes
+
+
+def fill_index(hashes, path):
+    """Index contenant hashes ; avec un fichier, les enregistrements sont écrits en un bloc"""
+    records = np.zeros(len(hashes), dtype=RECORD)
+    records['hash'] = hashes
+    records['key'][:, :8] = np.arange(len(hashes), dtype='>u8').view(np.uint8).reshape(-1, 8)
+    if path:
+        records.tofile(path)
+        return HashIndex(path, max_distance=10)
+    index = HashIndex(max_distance=10)
+    index._records = records
+    index._count = len(records)
+    return index
+
+
+def percentiles(samples):
+    values = np.sort(np.asarray(samples)) * 1e3
+    return {name: values[min(len(values) - 1, int(q * len(values)))] for name, q in
+            (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--file', default='', help="fichier d'index (défaut : index en mémoire)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    hashes = build_hashes(args.size, args.seed)
+    index = fill_index(hashes, args.file)
+    start = time.perf_counter()
+    index.lookup(0)
+    print(f"{args.size} empreintes, tables construites en {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = [int(value) ^ (1 << int(bit)) for value, bit in
+               zip(hashes[rng.integers(0, args.size, args.queries)], rng.integers(0, 64, args.queries))]
+
+    start = time.perf_counter()
+    for query in queries[:50]:
+        popcount64(hashes ^ np.uint64(query))
+    brute_ms = (time.perf_counter() - start) / 50 * 1e3
+
+    print(f"{'distance':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'résultats':>10s}   exhaustif {brute_ms:.2f} ms")
+    for max_distance in (0, 4, 7, 10):
+        samples = []
+        matches = 0
+        for query in queries:
+            start = time.perf_counter()
+            found = index.lookup(query, max_distance, limit=args.size)
+            samples.append(time.perf_counter() - start)
+            matches += len(found)
+        for query in queries[:20]:
+            expected = np.flatnonzero(popcount64(hashes ^ np.uint64(query)) <= max_distance)
+            found = index.lookup(query, max_distance, limit=args.size)
+            assert sorted(int(key[:16], 16) for key, _, _ in found) == sorted(expected.tolist())
+        stats = percentiles(samples)
+        print(f"{max_distance:8d} {stats['p50']:6.3f} ms {stats['p95']:6.3f} ms {stats['p99']:6.3f} ms "
+              f"{matches / len(queries):10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark : recherche de recettes par index inversé + bitsets vs parcours complet du catalogue
+
+Le catalogue synthétique reprend le vocabulaire d'ingrédients et les restrictions
+de data/recipes.json, avec N recettes de 3 à 8 ingrédients tirés au hasard.
+
+Usage : python benchmarks/bench_recipe_catalog.py [--recipes 5000] [--queries 2000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Ajouter le répertoire parent au path pour importer l'app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_catalog import DEFAULT_CATALOG_PATH, RecipeCatalog
+
+
+def build_catalog(count, rng):
+    with open(DEFAULT_CATALOG_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    vocabulary = list(data['ingredients'])
+    template = data['recipes'][0]
+    data['recipes'] = [
+        dict(template, title=f'Recette {i}', ingredients=[
+            {'id': ingredient, 'quantity': 1, 'unit': ''}
+            for ingredient in rng.choice(vocabulary, size=rng.integers(3, 9), replace=False)
+        ])
+        for i in range(count)
+    ]
+    return data
+
+
+def linear_search(data, ingredients, restrictions, limit=5):
+    """Référence naïve : chaque recette est examinée à chaque requête"""
+    wanted = set(ingredients)
+    forbidden = {tag for restriction in restrictions for tag in data['restrictions'][restriction]}
+    scored = []
+    for index, recipe in enumerate(data['recipes']):
+        ids = {item['id'] for item in recipe['ingredients']}
+        if any(forbidden.intersection(data['ingredients'][i].get('tags', ())) for i in ids):
+            continue
+        count = len(ids & wanted)
+        if count:
+            scored.append((count / len(ids), count, -index))
+    return [-neg_index for _, _, neg_index in sorted(scored, reverse=True)[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = build_catalog(args.recipes, rng)
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    try:
+        catalog = RecipeCatalog(f.name)
+    finally:
+        os.unlink(f.name)
+
+    vocabulary = list(data['ingredients'])
+    restrictions = list(data['restrictions'])
+    queries = [
+        (list(rng.choice(vocabulary, size=rng.integers(2, 6), replace=False)),
+         list(rng.choice(restrictions, size=rng.integers(0, 3), replace=False)))
+        for _ in range(args.queries)
+    ]
+
+    start = time.perf_counter()
+    indexed = [[index for index, _ in catalog.search(ingredients, diet)] for ingredients, diet in queries]
+    indexed_time = (time.perf_counter() - start) / len(queries)
+
+    start = time.perf_counter()
+    scanned = [linear_search(data, ingredients, diet) for ingredients, diet in queries]
+    scan_time = (time.perf_counter() - start) / len(queries)
+
+    assert indexed == scanned
+    print(f"{args.recipes} recettes, {len(queries)} requêtes (résultats identiques)")
+    print(f"Parcours complet        : {scan_time * 1e3:7.3f} ms/requête")
+    print(f"Index inversé + bitsets : {indexed_time * 1e3:7.3f} ms/requête (x{scan_time / indexed_time:.0f})")
+
+
+if __name__ == '__main__':
+    main()
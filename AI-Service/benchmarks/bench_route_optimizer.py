@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'optimisation des tournées (route_optimizer.py) sur des livraisons synthétiques
+
+Pour plusieurs tailles de lot, compare la boucle gloutonne de optimizeDeliveryRoutes
+(Backend/services/deliveryService.js, distances calculées paire par paire, sans la
+limite de 5 livraisons par tournée) à la matrice haversine vectorisée suivie du plus
+proche voisin et du 2-opt : durée et distance totale de la tournée.
+
+Usage : python benchmarks/bench_route_optimizer.py [--sizes 10,50,200,500] [--budget-ms 200]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ajouter le répertoire parent au path pour importer le module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from route_optimizer import optimize_route
+
+
+def haversine(point1, point2):
+    phi1, phi2 = math.radians(point1[0]), math.radians(point2[0])
+    a = (math.sin(math.radians(point2[0] - point1[0]) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(point2[1] - point1[1]) / 2) ** 2)
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def greedy_route(pickups, dropoffs):
+    """Boucle de optimizeDeliveryRoutes : collecte la plus proche du dernier dépôt"""
+    remaining = list(range(1, len(pickups)))
+    route = [0]
+    current = dropoffs[0]
+    while remaining:
+        closest = min(remaining, key=lambda delivery: haversine(current, pickups[delivery]))
+        remaining.remove(closest)
+        route.append(closest)
+        current = dropoffs[closest]
+    stops = [point for delivery in route for point in (pickups[delivery], dropoffs[delivery])]
+    return sum(haversine(a, b) for a, b in zip(stops, stops[1:]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,50,200,500')
+    parser.add_argument('--budget-ms', type=float, default=200.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'livraisons':>10s} {'glouton':>10s} {'km':>9s} {'optimisé':>10s} {'km':>9s} {'gain':>6s} {'2-opt':>6s}")
+    for size in (int(value) for value in args.sizes.split(',')):
+        # Collectes et dépôts autour de Tunis, dans un rayon d'une dizaine de km
+        pickups = rng.normal((36.8065, 10.1815), 0.08, (size, 2))
+        dropoffs = rng.normal((36.8065, 10.1815), 0.08, (size, 2))
+
+        start = time.perf_counter()
+        greedy_km = greedy_route(pickups.tolist(), dropoffs.tolist())
+        greedy_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        route = optimize_route(pickups, dropoffs, time_budget=args.budget_ms / 1000)
+        optimized_ms = (time.perf_counter() - start) * 1e3
+        print(f"{size:10d} {greedy_ms:7.1f} ms {greedy_km:9.1f} {optimized_ms:7.1f} ms {route['total_km']:9.1f} "
+              f"{1 - route['total_km'] / greedy_km:6.1%} {'fini' if route['converged'] else 'budget':>6s}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'index des objets similaires (feature_index.py) sur des vecteurs synthétiques
+
+Remplit un index de --size vecteurs groupés autour de centres aléatoires (annonces d'un
+même type d'objet), construit les listes IVF, puis mesure pour plusieurs nprobe la
+latence des recherches top-10 et le rappel face à un parcours exhaustif.
+
+Usage : python benchmarks/bench_similar_index.py [--size 1000000] [--queries 300] [--file /tmp/vectors.bin]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ajouter le répertoire parent au path pour importer le module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feature_index import FEATURE_DIM, RECORD, VectorIndex
+
+
+def build_records(size, seed, clusters=2000):
+    rng = np.random.default_rng(seed)
+    centers = rng.random((clusters, FEATURE_DIM), dtype=np.float32) * 0.3
+    records = np.zeros(size, dtype=RECORD)
+    for start in range(0, size, 100_000):
+        count = min(100_000, size - start)
+        records['vector'][start:start + count] = (
+            centers[rng.integers(0, clusters, count)] + rng.normal(0, 0.03, (count, FEATURE_DIM))
+        )
+    records['item_id'] = np.char.add(b'item-', np.arange(size).astype('S18'))
+    return records
+
+
+def fill_index(records, path):
+    """Index contenant records ; avec un fichier, les enregistrements sont écrits en un bloc"""
+    if path:
+        records.tofile(path)
+        return VectorIndex(path, background=False)
+    index = VectorIndex(background=False)
+    index._records = records
+    index._count = len(records)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--file', default='', help='fichier de vecteurs (défaut : index en mémoire)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    records = build_records(args.size, args.seed)
+    vectors = records['vector']
+    index = fill_index(records, args.file)
+    start = time.perf_counter()
+    index.rebuild()
+    stats = index.stats()
+    print(f"{args.size} vecteurs de {FEATURE_DIM} float32, {stats['lists']} listes construites "
+          f"en {time.perf_counter() - start:.1f} s")
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.integers(0, args.size, args.queries)] + rng.normal(0, 0.01, (args.queries, FEATURE_DIM))
+    queries = queries.astype(np.float32)
+
+    start = time.perf_counter()
+    exact = []
+    for query in queries[:30]:
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        exact.append({f'item-{i}' for i in np.argpartition(distances, args.k)[:args.k]})
+    brute_ms = (time.perf_counter() - start) / len(exact) * 1e3
+
+    print(f"{'nprobe':>6s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'rappel@' + str(args.k):>10s}"
+          f"   exhaustif {brute_ms:.1f} ms")
+    for nprobe in (2, 4, 8, 16):
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            index.lookup(query, args.k, nprobe)
+            samples.append(time.perf_counter() - start)
+        recall = np.mean([
+            len(expected & {item for item, _ in index.lookup(query, args.k, nprobe)}) / args.k
+            for query, expected in zip(queries, exact)
+        ])
+        p50, p95, p99 = np.percentile(np.array(samples) * 1e3, [50, 95, 99])
+        print(f"{nprobe:6d} {p50:6.2f} ms {p95:6.2f} ms {p99:6.2f} ms {recall:10.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks hors ligne : étapes du pipeline et routes Flask sur un corpus synthétique
+
+Chaque benchmark traite tout le corpus (benchmarks/corpus.py) une fois par tour ;
+le résultat est le meilleur tour (le moins perturbé par le reste de la machine),
+en millisecondes par appel. Le cache de résultats est désactivé pour que chaque
+appel refasse l'analyse. Aucun accès réseau.
+
+La référence est propre à une machine : l'enregistrer (--save-baseline) sur la
+machine où la comparaison sera faite. Le script échoue (code 1) si un benchmark
+est plus lent que la référence de plus de --threshold %.
+
+Usage :
+  python benchmarks/bench_suite.py --save-baseline
+  python benchmarks/bench_suite.py [--threshold 20] [--filter stage:] [--quick]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+# Ajouter le répertoire parent au path pour importer l'app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+import app as service
+from benchmarks.corpus import build_corpus
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'baseline.json')
+
+
+def pipeline_benchmarks(corpus):
+    """{nom: [appels sans argument]} pour chaque étape du pipeline, entrées préparées à l'avance"""
+    prepared = []
+    for item in corpus:
+        image = service.load_image_from_data(item.name, item.data)
+        context = service.create_analysis_context(image)
+        result = service.enhanced_classify_object(item.name, item.data)
+        prepared.append((item, image, context, result))
+
+    return {
+        'stage:decode': [
+            lambda item=item: service.load_image_from_data(item.name, item.data) for item, *_ in prepared
+        ],
+        'stage:create_analysis_context': [
+            lambda image=image: service.create_analysis_context(image) for _, image, _, _ in prepared
+        ],
+        'stage:analyze_image_properties': [
+            lambda image=image, context=context: service.analyze_image_properties(image, context)
+            for _, image, context, _ in prepared
+        ],
+        'stage:get_dominant_colors': [
+            lambda context=context: service.get_dominant_colors(context['rgb']) for _, _, context, _ in prepared
+        ],
+        'stage:extract_visual_features': [
+            lambda image=image, context=context: service.extract_visual_features(image, context)
+            for _, image, context, _ in prepared
+        ],
+        'stage:classify_by_text_similarity': [
+            lambda item=item: service.classify_by_text_similarity(item.name) for item, *_ in prepared
+        ],
+        'stage:detect_object_condition': [
+            lambda image=image, context=context: service.detect_object_condition(image, 'furniture', context)
+            for _, image, context, _ in prepared
+        ],
+        'stage:calculate_quality_score': [
+            lambda image=image, context=context: service.calculate_quality_score(image, 'good', context)
+            for _, image, context, _ in prepared
+        ],
+        'stage:serialization': [
+            lambda result=result: service.app.json.dumps(result) for *_, result in prepared
+        ],
+        'pipeline:enhanced_classify_object': [
+            lambda item=item: service.enhanced_classify_object(item.name, item.data) for item, *_ in prepared
+        ]
+    }
+
+
+def route_benchmarks(corpus, client):
+    """{nom: [appels sans argument]} pour les routes Flask, via le client de test"""
+    small = [item for item in corpus if max(item.width, item.height) <= 320]
+
+    def post(path, expected=200, **kwargs):
+        def call():
+            response = client.post(path, **kwargs)
+            assert response.status_code == expected, (path, response.status_code)
+        return call
+
+    return {
+        'route:GET /health': [lambda: client.get('/health')],
+        'route:POST /classify-object (raw)': [
+            post(f'/classify-object?filename={item.name}', data=item.data, content_type=item.mimetype)
+            for item in corpus
+        ],
+        'route:POST /predict_object (data URL)': [
+            post('/predict_object', json={'image_url': item.data_url}) for item in corpus
+        ],
+        'route:POST /classify-food (data URL)': [
+            post('/classify-food', json={'image_url': item.data_url}) for item in corpus
+        ],
+        'route:POST /classify-object/batch': [
+            post('/classify-object/batch', json={'images': [item.data_url for item in small]})
+        ],
+        'route:POST /generate-diy': [
+            post('/generate-diy', json={'category': category, 'object_name': 'objet', 'condition': condition})
+            for category in ('furniture', 'clothing', 'electronics') for condition in ('good', 'poor')
+        ],
+        'route:POST /generate-recipes': [
+            post('/generate-recipes', json={'ingredients': ingredients, 'dietary_restrictions': ['végétarien']})
+            for ingredients in (['pommes', 'farine', 'beurre'], ['tomates', 'oignon', 'riz'], ['banane'])
+        ]
+    }
+
+
+def measure(calls, repeat):
+    """Meilleur temps par appel sur repeat tours (après un tour de chauffe), en ms"""
+    for call in calls:
+        call()
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for call in calls:
+            call()
+        rounds.append((time.perf_counter() - start) / len(calls))
+    return min(rounds) * 1e3
+
+
+def run_suite(corpus, repeat=5, name_filter=''):
+    """{nom du benchmark: ms par appel}"""
+    service.result_cache.clear()
+    cache_size = service.result_cache.max_size
+    service.result_cache.max_size = 0
+    try:
+        with service.app.test_client() as client:
+            benchmarks = dict(pipeline_benchmarks(corpus), **route_benchmarks(corpus, client))
+            return {
+                name: measure(calls, repeat)
+                for name, calls in benchmarks.items() if name_filter in name
+            }
+    finally:
+        service.result_cache.max_size = cache_size
+
+
+def compare_results(results, baseline, threshold, min_delta_ms=0.05):
+    """[(nom, référence, mesure)] des benchmarks plus lents que la référence de plus de threshold %
+
+    Les écarts absolus inférieurs à min_delta_ms sont ignorés (bruit de mesure).
+    """
+    return [
+        (name, baseline[name], value)
+        for name, value in results.items()
+        if name in baseline
+        and value > baseline[name] * (1 + threshold / 100)
+        and value - baseline[name] > min_delta_ms
+    ]
+
+
+def corpus_signature(corpus, seed, quick):
+    return {'seed': seed, 'quick': quick, 'images': len(corpus)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=20.0, help='régression tolérée, en %% (défaut: 20)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='ne lancer que les benchmarks dont le nom contient ce texte')
+    parser.add_argument('--quick', action='store_true', help='petites images uniquement')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    corpus = build_corpus(args.seed, args.quick)
+    signature = corpus_signature(corpus, args.seed, args.quick)
+    results = run_suite(corpus, args.repeat, args.filter)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved['corpus'] != signature:
+            print(f"Référence mesurée sur un autre corpus ({saved['corpus']}), comparaison impossible")
+            return 2
+        baseline = saved['results']
+
+    print(f"Corpus : {len(corpus)} images, meilleur de {args.repeat} tours (ms par appel)")
+    for name, value in results.items():
+        line = f"{name:45s} {value:10.3f}"
+        if baseline and name in baseline:
+            line += f"   référence {baseline[name]:10.3f}   {100 * (value / baseline[name] - 1):+6.1f} %"
+        print(line)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'corpus': signature,
+                'results': results
+            }, f, indent=2)
+        print(f"Référence enregistrée : {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("Aucune référence : lancer d'abord avec --save-baseline")
+        return 0
+
+    regressions = compare_results(results, baseline, args.threshold, args.min_delta_ms)
+    for name, reference, value in regressions:
+        print(f"RÉGRESSION {name} : {reference:.3f} -> {value:.3f} ms (seuil {args.threshold:g} %)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
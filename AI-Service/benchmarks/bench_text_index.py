@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark : index TF-IDF pré-calculé vs TfidfVectorizer réajusté à chaque requête
+
+Usage : python benchmarks/bench_text_index.py [--queries 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Ajouter le répertoire parent au path pour importer l'app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from app import OBJECT_DESCRIPTIONS, OBJECT_CATEGORIES, extract_text_from_image
+from text_index import CategoryTextIndex
+
+
+def build_queries(count):
+    """Textes extraits d'URLs synthétiques couvrant toutes les catégories"""
+    words = [word for keywords in OBJECT_CATEGORIES.values() for word in keywords]
+    rng = np.random.default_rng(0)
+    queries = []
+    for _ in range(count):
+        picked = rng.choice(words, size=rng.integers(0, 4), replace=False)
+        url = 'https://cdn.example.com/' + '-'.join(picked) + '.jpg'
+        queries.append(extract_text_from_image(url))
+    return queries
+
+
+def refit_scores(query):
+    corpus = [query] + list(OBJECT_DESCRIPTIONS.values())
+    matrix = TfidfVectorizer().fit_transform(corpus)
+    return cosine_similarity(matrix[0:1], matrix[1:])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    queries = build_queries(args.queries)
+
+    start = time.perf_counter()
+    index = CategoryTextIndex(OBJECT_DESCRIPTIONS)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = np.array([refit_scores(query) for query in queries])
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = np.array([index.score([query])[0] for query in queries])
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = index.score(queries)
+    batch_time = time.perf_counter() - start
+
+    assert np.allclose(legacy, single, atol=1e-12)
+    assert np.allclose(legacy, batch, atol=1e-12)
+
+    per_query = lambda seconds: seconds / len(queries) * 1e6
+    print(f"Construction de l'index : {build_time * 1e3:.1f} ms")
+    print(f"Réajustement par requête : {per_query(legacy_time):8.1f} µs/requête")
+    print(f"Index, requête unique    : {per_query(single_time):8.1f} µs/requête "
+          f"(x{legacy_time / single_time:.1f})")
+    print(f"Index, lot de {len(queries):<5}     : {per_query(batch_time):8.1f} µs/requête "
+          f"(x{legacy_time / batch_time:.1f})")
+
+
+if __name__ == '__main__':
+    main()
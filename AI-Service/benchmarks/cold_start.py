@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Rapport de démarrage à froid : coût des imports et latence des premières requêtes
+
+1. Import de app.py dans un interpréteur neuf (python -X importtime) : durée totale,
+   modules les plus coûteux, et modules lourds chargés dès l'import (aucun attendu) ;
+2. pour chaque mode AI_WARMUP, démarrage du service (gunicorn par défaut) :
+   délai avant la première réponse de /health, puis latence de la première et de la
+   deuxième classification et de la première recette, mémoire résidente d'un worker.
+
+Le script échoue (code 1) si /health répond après plus de --budget-ms (défaut : 1000),
+sauf en mode preload, qui charge tout avant de démarrer les workers.
+
+Usage : python benchmarks/cold_start.py [--server gunicorn|aiohttp] [--warmup off background preload]
+"""
+
+import argparse
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('cv2', 'PIL', 'scipy', 'sklearn', 'requests', 'tensorflow', 'torch', 'transformers')
+
+
+def import_report(env):
+    """(durée totale en ms, [(ms cumulées, module importé directement par app)], modules lourds chargés)"""
+    code = 'import sys, app; print(",".join(m for m in sys.argv[1:] if m in sys.modules))'
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code] + list(HEAVY_MODULES),
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    total = 0.0
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if name == 'app':
+            total = int(cumulative) / 1e3
+            break
+        if depth == 0:
+            # Module chargé au démarrage de l'interpréteur (site...) : pas un import de app
+            modules = []
+        elif depth == 1:
+            # Les enfants de app sont listés avant lui, au premier niveau d'indentation
+            modules.append((int(cumulative) / 1e3, name))
+    loaded = [name for name in completed.stdout.strip().split(',') if name]
+    return total, sorted(modules, reverse=True), loaded
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port):
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                '--bind', f'127.0.0.1:{port}', 'app:app']
+    return [sys.executable, 'async_app.py']
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 240), (140, 90, 60)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def timed(call):
+    start = time.perf_counter()
+    response = call()
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1e3, response
+
+
+def startup_report(server, warmup, env, timeout=60.0):
+    """Délai avant /health et latences des premières requêtes (ms), mémoire d'un worker (octets)"""
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(env, PORT=str(port), AI_WARMUP=warmup)
+    start = time.perf_counter()
+    process = subprocess.Popen(server_command(server, port), cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        session = requests.Session()
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'Le service ({server}) s\'est arrêté avec le code {process.returncode}')
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f'/health sans réponse après {timeout:.0f} s')
+            try:
+                health = session.get(f'{base_url}/health', timeout=1)
+                if health.status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            time.sleep(0.005)
+        report = {
+            'ready_ms': (time.perf_counter() - start) * 1e3,
+            'rss_ready_bytes': health.json().get('process', {}).get('rss_bytes')
+        }
+        image = png_bytes()
+
+        def classify():
+            return session.post(f'{base_url}/classify-object', params={'filename': 'chaise.png'},
+                                data=image, headers={'Content-Type': 'image/png'}, timeout=timeout)
+
+        report['first_classify_ms'], _ = timed(classify)
+        report['second_classify_ms'], _ = timed(classify)
+        if server == 'gunicorn':
+            report['first_recipes_ms'], _ = timed(lambda: session.post(
+                f'{base_url}/generate-recipes', json={'ingredients': ['pommes', 'farine']}, timeout=timeout
+            ))
+        report['rss_bytes'] = session.get(f'{base_url}/health', timeout=timeout).json()['process']['rss_bytes']
+        return report
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['gunicorn', 'aiohttp'], default='gunicorn')
+    parser.add_argument('--warmup', nargs='+', default=['off', 'background', 'preload'],
+                        choices=['off', 'background', 'preload'])
+    parser.add_argument('--workers', type=int, default=1, help='workers gunicorn (défaut: 1)')
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help='délai maximal avant /health')
+    parser.add_argument('--top', type=int, default=8, help='modules les plus coûteux affichés')
+    args = parser.parse_args()
+
+    env = dict(os.environ, FLASK_ENV='production', AI_WEB_WORKERS=str(args.workers), AI_WORKER_POOL_SIZE='0')
+
+    total, modules, loaded = import_report(env)
+    print(f"Import de app.py : {total:.0f} ms")
+    for cumulative, name in modules[:args.top]:
+        print(f"  {cumulative:8.1f} ms  {name}")
+    print(f"Modules lourds chargés à l'import : {', '.join(loaded) or 'aucun'}")
+
+    over_budget = False
+    print(f"\n{'AI_WARMUP':12s} {'/health':>9s} {'1re class.':>11s} {'2e class.':>10s} {'1re recette':>12s} {'RSS':>9s}")
+    for warmup in args.warmup:
+        if warmup == 'preload' and args.server != 'gunicorn':
+            continue
+        report = startup_report(args.server, warmup, env)
+        recipes = report.get('first_recipes_ms')
+        print(f"{warmup:12s} {report['ready_ms']:6.0f} ms {report['first_classify_ms']:8.0f} ms "
+              f"{report['second_classify_ms']:7.0f} ms "
+              f"{'-' if recipes is None else f'{recipes:.0f} ms':>12s} {report['rss_bytes'] / 2 ** 20:6.1f} Mo")
+        over_budget = over_budget or (warmup != 'preload' and report['ready_ms'] > args.budget_ms)
+
+    if over_budget:
+        print(f"\n/health prêt après plus de {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Corpus d'images synthétiques déterministe pour les benchmarks (aucun accès réseau)
+
+Chaque image combine une taille, un format et un type de contenu ; les noms de fichier
+contiennent un mot-clé de catégorie, comme les URLs reçues en production.
+"""
+
+import base64
+import io
+from collections import namedtuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+SIZES = [(64, 48), (320, 240), (1024, 768), (3000, 2000)]
+QUICK_SIZES = SIZES[:2]
+FORMATS = ['JPEG', 'PNG', 'WEBP']
+CONTENTS = ['gradient', 'flat', 'noise', 'shapes', 'stripes']
+KEYWORDS = ['chair', 'laptop', 'book', 'shirt', 'toy', 'lamp', 'phone', 'table']
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+class CorpusImage(namedtuple('CorpusImage', 'name format width height content data')):
+    """Image encodée du corpus"""
+
+    @property
+    def mimetype(self):
+        return f'image/{self.format.lower()}'
+
+    @property
+    def data_url(self):
+        return f"data:{self.mimetype};base64,{base64.b64encode(self.data).decode()}"
+
+
+def build_corpus(seed=0, quick=False):
+    """Toutes les combinaisons taille x contenu, le format alternant de l'une à l'autre"""
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for size_index, (width, height) in enumerate(QUICK_SIZES if quick else SIZES):
+        for content_index, content in enumerate(CONTENTS):
+            fmt = FORMATS[(size_index + content_index) % len(FORMATS)]
+            keyword = KEYWORDS[len(corpus) % len(KEYWORDS)]
+            pixels = render(content, width, height, rng)
+            buffer = io.BytesIO()
+            Image.fromarray(pixels, 'RGB').save(buffer, format=fmt, quality=85)
+            name = f'{keyword}-{content}-{width}x{height}.{EXTENSIONS[fmt]}'
+            corpus.append(CorpusImage(name, fmt, width, height, content, buffer.getvalue()))
+    return corpus
+
+
+def render(content, width, height, rng):
+    """Pixels RGB uint8 du type de contenu demandé"""
+    if content == 'gradient':
+        x = np.linspace(0, 1, width)[None, :, None]
+        y = np.linspace(0, 1, height)[:, None, None]
+        pixels = rng.uniform(0, 255, 3) * (1 - x) + rng.uniform(0, 255, 3) * y
+    elif content == 'flat':
+        # Quelques aplats : peu de couleurs distinctes
+        pixels = np.empty((height, width, 3))
+        pixels[:] = rng.uniform(0, 255, 3)
+        for _ in range(3):
+            top, left = rng.integers(0, height), rng.integers(0, width)
+            pixels[top:top + height // 3, left:left + width // 3] = rng.uniform(0, 255, 3)
+    elif content == 'noise':
+        pixels = rng.uniform(0, 255, (height, width, 3))
+    elif content == 'shapes':
+        # Formes nettes : beaucoup de contours
+        pixels = np.full((height, width, 3), 235, dtype=np.uint8)
+        for _ in range(12):
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            radius = int(rng.integers(2, max(3, min(width, height) // 4)))
+            if rng.random() < 0.5:
+                cv2.circle(pixels, center, radius, color, -1)
+            else:
+                cv2.rectangle(pixels, center, (center[0] + radius, center[1] + radius), color, 2)
+    elif content == 'stripes':
+        x = np.arange(width)[None, :, None]
+        y = np.arange(height)[:, None, None]
+        frequencies = rng.uniform(0.02, 0.2, 3)
+        pixels = 127.5 + 127.5 * np.sin(x * frequencies + y * frequencies[::-1])
+    else:
+        raise ValueError(f'Contenu inconnu: {content}')
+    return np.clip(pixels, 0, 255).astype(np.uint8)
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Génération de charge : rejoue contre une instance locale le trafic envoyé par le backend
+
+Le mélange de requêtes reprend Backend/routes/ai.js (photos en corps brut pour
+/classify-object et /classify-food, /generate-diy, /generate-recipes,
+/recommend-associations, /health),
+plus les anciens appels en data URL base64 et des image_url distantes, servies par
+un serveur HTTP local (aucun accès réseau).
+
+Deux modes :
+- --rate R : arrivées de Poisson à R requêtes/s (boucle ouverte). La latence est
+  mesurée depuis l'instant d'arrivée prévu : l'attente derrière les --concurrency
+  connexions occupées est comptée, comme pour le backend ;
+- --rate 0 : --concurrency clients enchaînent les requêtes (boucle fermée).
+
+Avec --associations N, N associations synthétiques (autour de Tunis, Sfax et Sousse)
+remplacent avant la mesure celles du service (/associations/refresh) : à réserver à une
+instance de test. Par défaut, les associations déjà chargées sont conservées.
+
+Toutes les --interval secondes : débit, p50/p95/p99, taux d'erreur et mémoire
+résidente du service (processus --pid et ses enfants, sinon champ process de /health).
+
+Usage :
+  gunicorn --config gunicorn.conf.py app:app &
+  python benchmarks/load_replay.py [--url http://localhost:5001] [--rate 20] [--concurrency 8]
+                                   [--duration 60] [--mix classify-object=50,health=1] [--json rapport.json]
+                                   [--associations 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# Ajouter le répertoire parent au path pour importer le corpus
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import build_corpus
+
+# Poids relatifs des types de requêtes (modifiables avec --mix)
+DEFAULT_MIX = {
+    'classify-object': 30,
+    'classify-food': 15,
+    'classify-object:data-url': 8,
+    'classify-food:data-url': 4,
+    'classify-object:image-url': 12,
+    'generate-diy': 15,
+    'generate-recipes': 12,
+    'recommend-associations': 6,
+    'health': 4
+}
+
+FOODS = ['apple', 'banana', 'bread', 'tomato', 'cheese', 'carrot', 'rice', 'milk']
+CATEGORIES = ['furniture', 'clothing', 'electronics', 'books', 'toys', 'sports', 'kitchen', 'decoration']
+CONDITIONS = ['excellent', 'good', 'fair', 'poor']
+INGREDIENTS = ['pommes', 'farine', 'beurre', 'oeufs', 'lait', 'tomates', 'oignon', 'riz', 'pâtes',
+               'fromage', 'carottes', 'pommes de terre', 'banane', 'courgette', 'poulet', 'sucre']
+RESTRICTIONS = ['végétarien', 'vegan', 'sans gluten', 'lactose']
+# Villes des données de démonstration (Backend/scripts/seedAssociations.js)
+CITIES = [(36.8065, 10.1815), (34.7406, 10.7603), (35.8256, 10.6411)]
+ASSOCIATION_CATEGORIES = ['electronics', 'clothing', 'furniture', 'books', 'toys', 'food', 'other']
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(text):
+    """'nom=poids,...' -> {nom: poids}, les types absents gardant leur poids par défaut"""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f'Type de requête inconnu: {name} (connus: {", ".join(DEFAULT_MIX)})')
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+class RequestMix:
+    """Tire des requêtes (type, méthode, chemin, arguments de requests) selon les poids du mélange"""
+
+    def __init__(self, corpus, image_base_url, mix=None, seed=0):
+        self.corpus = corpus
+        self.image_base_url = image_base_url
+        self.mix = dict(mix or DEFAULT_MIX)
+        self._names = list(self.mix)
+        self._weights = [self.mix[name] for name in self._names]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # Encodage base64 fait une seule fois : c'est le service qu'on mesure
+        self._data_urls = [item.data_url for item in corpus]
+
+    def next(self):
+        with self._lock:
+            name = self._random.choices(self._names, self._weights)[0]
+            return (name,) + self.build(name, self._random)
+
+    def build(self, name, rng):
+        index = rng.randrange(len(self.corpus))
+        item = self.corpus[index]
+        route, _, variant = name.partition(':')
+        if route in ('classify-object', 'classify-food'):
+            filename = item.name if route == 'classify-object' else self.food_name(item, rng)
+            if variant == 'data-url':
+                return 'POST', f'/{route}', {'json': {'image_url': self._data_urls[index], 'filename': filename}}
+            if variant == 'image-url':
+                return 'POST', f'/{route}', {'json': {'image_url': f'{self.image_base_url}/{index}/{filename}'}}
+            # Comme multer + axios : corps brut, nom d'origine en paramètre
+            return 'POST', f'/{route}', {
+                'params': {'filename': filename},
+                'data': item.data,
+                'headers': {'Content-Type': item.mimetype}
+            }
+        if route == 'generate-diy':
+            category = rng.choice(CATEGORIES)
+            return 'POST', '/generate-diy', {'json': {
+                'category': category,
+                'object_name': item.name.split('-')[0],
+                'description': f'Objet {category} à donner',
+                'condition': rng.choice(CONDITIONS)
+            }}
+        if route == 'generate-recipes':
+            return 'POST', '/generate-recipes', {'json': {
+                'ingredients': rng.sample(INGREDIENTS, rng.randint(1, 5)),
+                'dietary_restrictions': rng.sample(RESTRICTIONS, rng.choice((0, 0, 1))),
+                'servings': rng.choice((2, 4, 6))
+            }}
+        if route == 'recommend-associations':
+            lat, lng = rng.choice(CITIES)
+            return 'POST', '/recommend-associations', {'json': {
+                'category': rng.choice(CATEGORIES + ['food']),
+                'location': {'lat': lat + rng.uniform(-0.1, 0.1), 'lng': lng + rng.uniform(-0.1, 0.1)},
+                'description': f'Don de {rng.choice(FOODS)}'
+            }}
+        return 'GET', '/health', {}
+
+    @staticmethod
+    def food_name(item, rng):
+        return f"{rng.choice(FOODS)}-{item.content}.{item.name.rsplit('.', 1)[1]}"
+
+
+def synthetic_associations(count, seed=0):
+    """Documents au format de la collection Association répartis autour des villes de démonstration"""
+    rng = random.Random(seed)
+    documents = []
+    for position in range(count):
+        lat, lng = rng.choice(CITIES)
+        food_bank = rng.random() < 0.2
+        accepted = ['food'] if food_bank else rng.sample(ASSOCIATION_CATEGORIES, rng.randint(1, 3))
+        documents.append({
+            '_id': f'{position:024x}',
+            'name': f'Association {position}',
+            'type': 'food_bank' if food_bank else 'charity',
+            'status': 'active',
+            'address': {'coordinates': {'lat': lat + rng.gauss(0, 0.15), 'lng': lng + rng.gauss(0, 0.15)}},
+            'acceptedCategories': accepted,
+            'needs': [{'category': rng.choice(accepted), 'priority': rng.choice(('low', 'medium', 'high', 'urgent'))}]
+        })
+    return documents
+
+
+def start_image_server(corpus):
+    """Serveur HTTP local des images du corpus : GET /<index>/<nom quelconque>"""
+    class ImageHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            try:
+                item = corpus[int(self.path.split('/')[1])]
+            except (ValueError, IndexError):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', item.mimetype)
+            self.send_header('Content-Length', str(len(item.data)))
+            self.end_headers()
+            self.wfile.write(item.data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def percentile(sorted_values, q):
+    """Percentile au rang le plus proche d'une liste triée (None si vide)"""
+    if not sorted_values:
+        return None
+    rank = max(int(len(sorted_values) * q / 100 + 0.999999) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples, elapsed):
+    """Débit, percentiles de latence (ms) et taux d'erreur d'une liste de (type, fin, latence, statut)"""
+    latencies = sorted(latency for _, _, latency, _ in samples)
+    errors = sum(1 for *_, status in samples if not 200 <= status < 400)
+    summary = {
+        'requests': len(samples),
+        'throughput': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'error_rate': errors / len(samples) if samples else 0.0
+    }
+    for q in PERCENTILES:
+        value = percentile(latencies, q)
+        summary[f'p{q}_ms'] = None if value is None else value * 1e3
+    return summary
+
+
+def process_rss(pid):
+    """Mémoire résidente (octets) du processus pid et de ses enfants directs (workers gunicorn)"""
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat', 'rb') as f:
+                    # Le nom du processus (2e champ) peut contenir des espaces
+                    fields = f.read().rsplit(b')', 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[1]) == pid:
+                pids.append(int(entry))
+    total = 0
+    for child in pids:
+        try:
+            with open(f'/proc/{child}/statm', 'rb') as f:
+                total += int(f.read().split()[1]) * page_size
+        except OSError:
+            pass
+    return total
+
+
+class LoadRun:
+    """Envoie les requêtes, garde chaque mesure et échantillonne la mémoire du service"""
+
+    def __init__(self, base_url, request_mix, concurrency=8, rate=0.0, duration=30.0, timeout=30.0,
+                 pid=None, interval=5.0, report=print):
+        self.base_url = base_url.rstrip('/')
+        self.request_mix = request_mix
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.timeout = timeout
+        self.pid = pid
+        self.interval = interval
+        self.report = report
+        # (type, fin relative au début, latence, statut HTTP ou 0 si échec de connexion)
+        self.samples = []
+        # (instant relatif, mémoire résidente en octets)
+        self.memory = []
+        self.windows = []
+        self._local = threading.local()
+        self._start = None
+
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def send(self, scheduled=None):
+        """Une requête du mélange ; latence comptée depuis l'arrivée prévue (ou l'envoi)"""
+        name, method, path, kwargs = self.request_mix.next()
+        start = time.perf_counter() if scheduled is None else scheduled
+        try:
+            response = self.session().request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        end = time.perf_counter()
+        self.samples.append((name, end - self._start, end - start, status))
+
+    def sample_memory(self):
+        if self.pid:
+            rss = process_rss(self.pid)
+        else:
+            try:
+                health = self.session().get(self.base_url + '/health', timeout=self.timeout).json()
+                rss = health.get('process', {}).get('rss_bytes')
+            except (requests.RequestException, ValueError):
+                rss = None
+        if rss:
+            self.memory.append((time.perf_counter() - self._start, rss))
+        return rss
+
+    def run(self):
+        self._start = time.perf_counter()
+        self.sample_memory()
+        stop = threading.Event()
+        monitor = threading.Thread(target=self._monitor, args=(stop,), daemon=True)
+        monitor.start()
+        try:
+            if self.rate > 0:
+                self._open_loop()
+            else:
+                self._closed_loop()
+        finally:
+            stop.set()
+            monitor.join()
+        elapsed = time.perf_counter() - self._start
+        self.sample_memory()
+        return self.result(elapsed)
+
+    def _open_loop(self):
+        rng = random.Random(1)
+        deadline = self._start + self.duration
+        arrival = self._start
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                arrival += rng.expovariate(self.rate)
+                if arrival >= deadline:
+                    break
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, arrival)
+
+    def _closed_loop(self):
+        deadline = self._start + self.duration
+
+        def client():
+            while time.perf_counter() < deadline:
+                self.send()
+
+        threads = [threading.Thread(target=client) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _monitor(self, stop):
+        seen = 0
+        window_start = 0.0
+        while not stop.wait(self.interval):
+            now = time.perf_counter() - self._start
+            window = self.samples[seen:]
+            seen += len(window)
+            summary = summarize(window, now - window_start)
+            summary['t'] = now
+            summary['rss_bytes'] = self.sample_memory()
+            self.windows.append(summary)
+            self.report(format_window(summary))
+            window_start = now
+
+    def result(self, elapsed):
+        by_type = {}
+        for sample in self.samples:
+            by_type.setdefault(sample[0], []).append(sample)
+        statuses = {}
+        for *_, status in self.samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        memory = {}
+        if self.memory:
+            memory = {
+                'start_bytes': self.memory[0][1],
+                'end_bytes': self.memory[-1][1],
+                'peak_bytes': max(rss for _, rss in self.memory),
+                'growth_bytes': self.memory[-1][1] - self.memory[0][1],
+                'samples': self.memory
+            }
+        return {
+            'settings': {
+                'url': self.base_url,
+                'concurrency': self.concurrency,
+                'rate': self.rate,
+                'duration': self.duration,
+                'mix': self.request_mix.mix
+            },
+            'elapsed': elapsed,
+            'total': summarize(self.samples, elapsed),
+            'by_type': {name: summarize(samples, elapsed) for name, samples in sorted(by_type.items())},
+            'statuses': statuses,
+            'windows': self.windows,
+            'memory': memory
+        }
+
+
+def format_ms(value):
+    return '      -' if value is None else f'{value:7.1f}'
+
+
+def format_window(summary):
+    rss = summary.get('rss_bytes')
+    return (f"t={summary['t']:6.1f}s  {summary['throughput']:7.1f} req/s  "
+            f"p50 {format_ms(summary['p50_ms'])}  p95 {format_ms(summary['p95_ms'])}  "
+            f"p99 {format_ms(summary['p99_ms'])} ms  erreurs {100 * summary['error_rate']:5.1f} %  "
+            f"RSS {'-' if rss is None else f'{rss / 2 ** 20:.1f} Mo'}")
+
+
+def print_report(result):
+    print(f"\n{result['total']['requests']} requêtes en {result['elapsed']:.1f} s")
+    print(f"{'type':28s} {'req':>6s} {'req/s':>8s} {'p50':>7s} {'p95':>7s} {'p99':>7s} {'erreurs':>8s}")
+    for name, summary in list(result['by_type'].items()) + [('total', result['total'])]:
+        print(f"{name:28s} {summary['requests']:6d} {summary['throughput']:8.1f} "
+              f"{format_ms(summary['p50_ms'])} {format_ms(summary['p95_ms'])} {format_ms(summary['p99_ms'])} "
+              f"{100 * summary['error_rate']:7.1f} %")
+    print(f"Statuts : {result['statuses']}")
+    memory = result['memory']
+    if memory:
+        print(f"RSS : {memory['start_bytes'] / 2 ** 20:.1f} -> {memory['end_bytes'] / 2 ** 20:.1f} Mo "
+              f"(pic {memory['peak_bytes'] / 2 ** 20:.1f} Mo, {memory['growth_bytes'] / 2 ** 20:+.1f} Mo)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--concurrency', type=int, default=8, help='connexions simultanées (défaut: 8)')
+    parser.add_argument('--rate', type=float, default=0.0, help='arrivées par seconde (0: boucle fermée)')
+    parser.add_argument('--duration', type=float, default=30.0, help='durée en secondes (défaut: 30)')
+    parser.add_argument('--interval', type=float, default=5.0, help='période des relevés en secondes')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--mix', default='', help="poids par type, ex. 'classify-object=50,health=0'")
+    parser.add_argument('--pid', type=int, help='processus du service (mémoire lue dans /proc)')
+    parser.add_argument('--quick', action='store_true', help='petites images uniquement')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='enregistrer le rapport complet dans ce fichier')
+    parser.add_argument('--associations', type=int, default=0,
+                        help='remplacer les associations du service par N synthétiques (défaut: 0, aucune)')
+    args = parser.parse_args()
+
+    if args.associations:
+        response = requests.post(f'{args.url}/associations/refresh',
+                                 json=synthetic_associations(args.associations, args.seed), timeout=args.timeout)
+        response.raise_for_status()
+
+    corpus = build_corpus(args.seed, args.quick)
+    image_server, image_base_url = start_image_server(corpus)
+    try:
+        request_mix = RequestMix(corpus, image_base_url, parse_mix(args.mix), args.seed)
+        load = LoadRun(args.url, request_mix, args.concurrency, args.rate, args.duration, args.timeout,
+                       args.pid, args.interval)
+        result = load.run()
+    finally:
+        image_server.shutdown()
+
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,15 @@ from dotenv import load_dotenv
 # Charger les variables d'environnement
 load_dotenv()
 
+def parse_size(value):
+    """Convertir une taille lisible ('10MB', '512KB', '1024') en octets"""
+    units = {'GB': 1024 ** 3, 'MB': 1024 ** 2, 'KB': 1024, 'B': 1}
+    value = str(value).strip().upper()
+    for unit, factor in units.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
 class Config:
     """Configuration de base pour le service IA"""
     
@@ -14,16 +23,102 @@ class Config:
     # Configuration du port
     PORT = int(os.environ.get('PORT', 5001))
     
+    # Configuration du serveur : 'development' (serveur Werkzeug) ou 'gunicorn' (multi-workers)
+    SERVER = os.environ.get('AI_SERVER', 'development')
+    WEB_WORKERS = int(os.environ.get('AI_WEB_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+    WEB_THREADS = int(os.environ.get('AI_WEB_THREADS', 4))
+    WEB_KEEPALIVE = int(os.environ.get('AI_WEB_KEEPALIVE', 5))
+    WEB_TIMEOUT = int(os.environ.get('AI_WEB_TIMEOUT', 60))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('AI_WEB_GRACEFUL_TIMEOUT', 30))
+    WEB_MAX_REQUESTS = int(os.environ.get('AI_WEB_MAX_REQUESTS', 1000))
+    
     # Configuration CORS
     FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
     
-    # Configuration des modèles IA
+    # Configuration des modèles IA : backend de classification ('heuristic', 'onnx', 'torchscript'),
+    # répertoire du modèle et regroupement des inférences en lots
+    AI_MODEL_BACKEND = os.environ.get('AI_MODEL_BACKEND', 'heuristic')
     AI_MODEL_PATH = os.environ.get('AI_MODEL_PATH', './models')
+    AI_MODEL_BATCH_SIZE = int(os.environ.get('AI_MODEL_BATCH_SIZE', 8))
+    AI_MODEL_BATCH_WAIT_MS = float(os.environ.get('AI_MODEL_BATCH_WAIT_MS', 0))
     AI_CACHE_SIZE = int(os.environ.get('AI_CACHE_SIZE', 1000))
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 3600))
+    # Répertoire du cache disque partagé entre workers (vide = cache mémoire uniquement)
+    AI_CACHE_DIR = os.environ.get('AI_CACHE_DIR', '')
+    # Taille maximale de ce cache disque (0 = illimitée)
+    AI_CACHE_DIR_MAX_SIZE = parse_size(os.environ.get('AI_CACHE_DIR_MAX_SIZE', '512MB'))
     
     # Configuration des images
     MAX_IMAGE_SIZE = os.environ.get('MAX_IMAGE_SIZE', '10MB')
+    MAX_IMAGE_BYTES = parse_size(MAX_IMAGE_SIZE)
     ALLOWED_IMAGE_TYPES = os.environ.get('ALLOWED_IMAGE_TYPES', 'jpg,jpeg,png,gif,webp').split(',')
+    # Plus grand côté (en pixels) de l'image analysée, 0 pour analyser en pleine résolution
+    ANALYSIS_MAX_EDGE = int(os.environ.get('AI_ANALYSIS_MAX_EDGE', 512))
+    # Extraction des couleurs dominantes : 'histogram' (déterministe) ou 'kmeans'
+    AI_PALETTE_ENGINE = os.environ.get('AI_PALETTE_ENGINE', 'histogram')
+    
+    # Téléchargement des images distantes (image_url)
+    AI_FETCH_TIMEOUT = float(os.environ.get('AI_FETCH_TIMEOUT', 10))
+    AI_FETCH_POOL_SIZE = int(os.environ.get('AI_FETCH_POOL_SIZE', 10))
+    # Répertoire du cache disque des images distantes (vide = désactivé)
+    AI_FETCH_CACHE_DIR = os.environ.get('AI_FETCH_CACHE_DIR', '')
+    AI_FETCH_CACHE_MAX_SIZE = parse_size(os.environ.get('AI_FETCH_CACHE_MAX_SIZE', '1GB'))
+    AI_FETCH_NEGATIVE_TTL = int(os.environ.get('AI_FETCH_NEGATIVE_TTL', 60))
+    # Nombre maximal d'URLs en échec mémorisées par le cache négatif
+    AI_FETCH_NEGATIVE_MAX_ENTRIES = int(os.environ.get('AI_FETCH_NEGATIVE_MAX_ENTRIES', 10000))
+    
+    # Mode asynchrone (AI_SERVER=aiohttp) : téléchargements simultanés et threads d'analyse
+    AI_ASYNC_FETCH_CONNECTIONS = int(os.environ.get('AI_ASYNC_FETCH_CONNECTIONS', 100))
+    AI_ASYNC_CPU_WORKERS = int(os.environ.get('AI_ASYNC_CPU_WORKERS', os.cpu_count() or 4))
+    
+    # Classification par lots
+    BATCH_MAX_ITEMS = int(os.environ.get('AI_BATCH_MAX_ITEMS', 16))
+    BATCH_WORKERS = int(os.environ.get('AI_BATCH_WORKERS', 4))
+    
+    # Taille maximale d'une requête (413 au-delà) : une image encodée en base64,
+    # un lot complet d'images pour /classify-object/batch et /classify-food/batch
+    MAX_CONTENT_LENGTH = MAX_IMAGE_BYTES * 4 // 3 + 1024 * 1024
+    BATCH_MAX_CONTENT_LENGTH = MAX_IMAGE_BYTES * BATCH_MAX_ITEMS * 4 // 3 + 1024 * 1024
+    
+    # Pool de processus pour l'analyse d'image (0 = analyse dans le processus web)
+    AI_WORKER_POOL_SIZE = int(os.environ.get('AI_WORKER_POOL_SIZE', 0))
+    AI_WORKER_QUEUE_DEPTH = int(os.environ.get('AI_WORKER_QUEUE_DEPTH', 8))
+    AI_WORKER_TIMEOUT = float(os.environ.get('AI_WORKER_TIMEOUT', 30))
+    AI_WORKER_RETRY_AFTER = int(os.environ.get('AI_WORKER_RETRY_AFTER', 1))
+    AI_WORKER_START_METHOD = os.environ.get('AI_WORKER_START_METHOD', 'spawn')
+    
+    # Chargement des modules lourds (OpenCV, scikit-learn...) : 'background' (thread de chaque
+    # worker, après son démarrage), 'preload' (maître gunicorn, avant le fork) ou 'off' (première requête)
+    AI_WARMUP = os.environ.get('AI_WARMUP', 'background')
+    
+    # Export des traces (format Chrome Trace Event, vide = désactivé) et durée minimale exportée
+    AI_TRACE_FILE = os.environ.get('AI_TRACE_FILE', '')
+    AI_TRACE_MIN_MS = float(os.environ.get('AI_TRACE_MIN_MS', 0))
+    
+    # Index des photos quasi identiques (pHash) : fichier partagé par les workers (vide = en mémoire),
+    # distance de Hamming maximale des recherches et distance de réutilisation d'une classification (-1 = jamais).
+    # Avec AI_WORKER_POOL_SIZE > 0, la réutilisation se fait dans les processus du pool : elle demande
+    # AI_DEDUP_INDEX_FILE et AI_CACHE_DIR, sinon chaque processus ne voit que ses propres photos
+    AI_DEDUP_INDEX_FILE = os.environ.get('AI_DEDUP_INDEX_FILE', '')
+    AI_DEDUP_MAX_DISTANCE = int(os.environ.get('AI_DEDUP_MAX_DISTANCE', 10))
+    AI_DEDUP_REUSE_DISTANCE = int(os.environ.get('AI_DEDUP_REUSE_DISTANCE', -1))
+    
+    # Recherche d'annonces visuellement proches : fichier des vecteurs (vide = en mémoire),
+    # listes parcourues par recherche et nombre maximal de résultats
+    AI_SIMILAR_INDEX_FILE = os.environ.get('AI_SIMILAR_INDEX_FILE', '')
+    AI_SIMILAR_NPROBE = int(os.environ.get('AI_SIMILAR_NPROBE', 8))
+    AI_SIMILAR_MAX_RESULTS = int(os.environ.get('AI_SIMILAR_MAX_RESULTS', 50))
+    
+    # Recommandation d'associations : export JSON de la collection Association partagé par les
+    # workers (vide = photographie en mémoire), rayon de recherche en km et nombre de résultats
+    AI_ASSOCIATIONS_FILE = os.environ.get('AI_ASSOCIATIONS_FILE', '')
+    AI_ASSOCIATION_MAX_KM = float(os.environ.get('AI_ASSOCIATION_MAX_KM', 50))
+    AI_ASSOCIATION_RESULTS = int(os.environ.get('AI_ASSOCIATION_RESULTS', 5))
+    
+    # Optimisation des tournées de livraison : nombre maximal de livraisons par requête et
+    # temps accordé par défaut à l'amélioration 2-opt (ms)
+    AI_ROUTE_MAX_DELIVERIES = int(os.environ.get('AI_ROUTE_MAX_DELIVERIES', 500))
+    AI_ROUTE_TIME_BUDGET_MS = float(os.environ.get('AI_ROUTE_TIME_BUDGET_MS', 200))
     
     # Configuration des logs
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -42,6 +137,7 @@ class ProductionConfig(Config):
     """Configuration pour la production"""
     DEBUG = False
     LOG_LEVEL = 'WARNING'
+    SERVER = os.environ.get('AI_SERVER', 'gunicorn')
 
 class TestingConfig(Config):
     """Configuration pour les tests"""
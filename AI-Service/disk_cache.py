@@ -0,0 +1,78 @@
+"""
+Taille bornée des caches disque partagés par les workers (résultats, images distantes)
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DiskBudget:
+    """Budget d'un répertoire de cache, vérifié après chaque tranche d'écritures
+
+    Quand les octets écrits depuis le dernier passage dépassent un dixième du budget,
+    le répertoire est parcouru : les entrées (fichiers de même nom, extensions mises à
+    part) écrites depuis plus de max_age secondes sont supprimées, puis les moins
+    récemment écrites jusqu'à revenir à 90 % de max_bytes. max_bytes = 0 : pas de limite.
+    """
+
+    def __init__(self, directory, max_bytes, max_age=None, clock=time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._written = 0
+        self.evicted = 0
+
+    def wrote(self, size):
+        """Noter une écriture de size octets, et élaguer le répertoire si la tranche est atteinte"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            self._written += size
+            if self._written < self.max_bytes // 10:
+                return
+            self._written = 0
+        self.prune()
+
+    def prune(self):
+        """Supprimer les entrées expirées puis les plus anciennes au-delà du budget"""
+        entries = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                # Fichiers temporaires en cours d'écriture par un autre worker
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                stem = os.path.splitext(path)[0]
+                size, mtime, paths = entries.get(stem, (0, 0.0, ()))
+                entries[stem] = (size + stat.st_size, max(mtime, stat.st_mtime), paths + (path,))
+
+        now = self._clock()
+        total = sum(size for size, _, _ in entries.values())
+        target = self.max_bytes * 9 // 10 if self.max_bytes else None
+        removed = 0
+        for size, mtime, paths in sorted(entries.values(), key=lambda entry: entry[1]):
+            expired = self.max_age is not None and mtime + self.max_age <= now
+            if not expired and (target is None or total <= target):
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        if removed:
+            with self._lock:
+                self.evicted += removed
+            logger.info(f"Cache disque {self.directory}: {removed} entrées supprimées")
+        return removed
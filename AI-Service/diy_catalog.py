@@ -0,0 +1,65 @@
+"""
+Catalogue des projets DIY, chargé une seule fois depuis data/diy_projects.json
+"""
+
+import json
+import os
+from functools import lru_cache
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'diy_projects.json')
+
+
+class DiyCatalog:
+    """Projets DIY immuables indexés par catégorie, état de l'objet et difficulté
+
+    Les projets sont partagés entre les requêtes (listes converties en tuples, dicts
+    à ne pas modifier). L'adaptation à l'état de l'objet est une surcouche légère
+    (difficulté remplacée, conseils ajoutés) calculée une fois par (catégorie, état).
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self._projects = {
+            category: tuple(freeze(project) for project in projects)
+            for category, projects in data['categories'].items()
+        }
+        self._default = tuple(freeze(project) for project in data['default'])
+        self._overlays = {condition: freeze(overlay) for condition, overlay in data['condition_overlays'].items()}
+        self.renamed_object_words = tuple(data['renamed_object_words'])
+        # Clés issues des requêtes : cache borné
+        self.projects = lru_cache(maxsize=256)(self._projects_uncached)
+
+    @property
+    def categories(self):
+        return list(self._projects)
+
+    def _projects_uncached(self, category, condition, difficulty=None):
+        """Projets adaptés à l'état de l'objet, filtrés par difficulté (mémoïsés)"""
+        projects = self._projects.get(category, self._default)
+        overlay = self._overlays.get(condition)
+        if overlay is not None:
+            projects = tuple(apply_overlay(project, overlay) for project in projects)
+        if difficulty:
+            projects = tuple(project for project in projects if project['difficulty'] == difficulty)
+        return projects
+
+
+def apply_overlay(project, overlay):
+    """Projet adapté : nouvelles valeurs de surface, listes du projet partagées"""
+    adapted = dict(project)
+    if 'difficulty' in overlay:
+        adapted['difficulty'] = overlay['difficulty']
+    if 'extra_tips' in overlay:
+        adapted['tips'] = project.get('tips', ()) + overlay['extra_tips']
+    return adapted
+
+
+def freeze(value):
+    """Copie dont les listes deviennent des tuples (sérialisées à l'identique en JSON)"""
+    if isinstance(value, dict):
+        return {key: freeze(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
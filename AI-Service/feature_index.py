@@ -0,0 +1,320 @@
+"""
+Vecteurs de caractéristiques visuelles des annonces et recherche approchée des plus proches voisins (IVF)
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from record_store import ITEM_ID_BYTES, RecordStore, decode_item_id, encode_item_id
+
+logger = logging.getLogger(__name__)
+
+# Histogramme de palette 4 x 4 x 4 (RGB) et propriétés scalaires de l'image
+PALETTE_LEVELS = 4
+PALETTE_BINS = PALETTE_LEVELS ** 3
+SCALAR_FEATURES = ('brightness', 'contrast', 'sharpness', 'aspect_ratio',
+                   'circularity', 'vertices', 'area', 'contour_count')
+FEATURE_DIM = PALETTE_BINS + len(SCALAR_FEATURES)
+# Poids des propriétés scalaires face à l'histogramme (de norme 1)
+SCALAR_WEIGHT = 0.35
+
+# Enregistrement du fichier de vecteurs : vecteur et identifiant de l'annonce
+RECORD = np.dtype([('vector', '<f4', (FEATURE_DIM,)), ('item_id', f'S{ITEM_ID_BYTES}')])
+
+
+def feature_vector(image_analysis):
+    """Vecteur float32 (FEATURE_DIM) à partir de image_analysis d'une classification d'objet
+
+    Palette : parts des couleurs dominantes réparties entre les 8 cases voisines de la grille
+    RGB (interpolation trilinéaire, sans effet de seuil), puis racine carrée (distance de
+    Hellinger). Propriétés ramenées entre 0 et 1.
+    """
+    vector = np.zeros(FEATURE_DIM, dtype=np.float32)
+    palette = image_analysis.get('dominant_colors') or []
+    if palette:
+        position = np.array([color['rgb'] for color in palette], dtype=np.float32) / 255 * (PALETTE_LEVELS - 1)
+        weights = np.array([color['frequency'] for color in palette], dtype=np.float32)
+        lower = np.minimum(np.floor(position), PALETTE_LEVELS - 2).astype(np.intp)
+        fraction = position - lower
+        histogram = np.zeros(PALETTE_BINS, dtype=np.float32)
+        for corner in np.ndindex(2, 2, 2):
+            offset = np.array(corner)
+            share = np.prod(np.where(offset, fraction, 1 - fraction), axis=1)
+            cells = (lower + offset) @ np.array([PALETTE_LEVELS ** 2, PALETTE_LEVELS, 1])
+            np.add.at(histogram, cells, weights * share)
+        if histogram.sum() > 0:
+            vector[:PALETTE_BINS] = np.sqrt(histogram / histogram.sum())
+
+    shape = image_analysis.get('shape_features') or {}
+    dimensions = image_analysis.get('analysis_dimensions') or {}
+    pixels = max(dimensions.get('width', 0) * dimensions.get('height', 0), 1)
+    scalars = [
+        image_analysis.get('brightness', 0) / 255,
+        image_analysis.get('contrast', 0) / 128,
+        image_analysis.get('sharpness', 0) / 64,
+        0.5 + 0.5 * np.tanh(np.log(max(image_analysis.get('aspect_ratio', 1), 1e-3))),
+        shape.get('circularity', 0),
+        shape.get('vertices', 0) / 16,
+        shape.get('area', 0) / pixels,
+        np.log1p(shape.get('contour_count', 0)) / np.log1p(1000)
+    ]
+    vector[PALETTE_BINS:] = SCALAR_WEIGHT * np.clip(scalars, 0, 1)
+    return vector
+
+
+def squared_distances(vectors, centroids):
+    """Distances euclidiennes au carré (lignes de vectors x lignes de centroids), en float32"""
+    distances = vectors @ centroids.T
+    distances *= -2
+    distances += np.einsum('ij,ij->i', centroids, centroids)
+    distances += np.einsum('ij,ij->i', vectors, vectors)[:, None]
+    return distances
+
+
+def nearest_centroids(vectors, centroids, chunk=16384):
+    """Liste (centroïde le plus proche) de chaque vecteur, calculée par tranches"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        part = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+        assignments[start:start + chunk] = squared_distances(part, centroids).argmin(axis=1)
+    return assignments
+
+
+def train_centroids(vectors, lists, rng, iterations=8, sample_per_list=32):
+    """k-moyennes sur un échantillon : centroïdes des listes de l'index"""
+    sample = vectors[np.sort(rng.choice(len(vectors), min(len(vectors), lists * sample_per_list), replace=False))]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = squared_distances(sample, centroids).argmin(axis=1)
+        counts = np.bincount(assignments, minlength=lists)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Liste vide : repartir d'un point de l'échantillon
+        centroids[~filled] = sample[rng.choice(len(sample), int((~filled).sum()))]
+    return centroids
+
+
+def list_tables(vectors, assignments, lists, chunk=65536):
+    """(positions des vecteurs triées par liste, début de chaque liste, normes au carré des vecteurs)"""
+    order = np.argsort(assignments, kind='stable').astype(np.intp)
+    starts = np.zeros(lists + 1, dtype=np.intp)
+    np.cumsum(np.bincount(assignments, minlength=lists), out=starts[1:])
+    norms = np.empty(len(assignments), dtype=np.float32)
+    for start in range(0, len(norms), chunk):
+        part = np.asarray(vectors[start:min(start + chunk, len(norms))], dtype=np.float32)
+        norms[start:start + len(part)] = np.einsum('ij,ij->i', part, part)
+    return order, starts, norms
+
+
+class VectorIndex:
+    """Vecteurs en ajout seul et index IVF : top-k approché des plus proches voisins
+
+    Les vecteurs sont répartis en listes autour de centroïdes (k-moyennes, environ racine
+    de n listes) ; une recherche ne parcourt que les nprobe listes les plus proches de la
+    requête, puis classe exactement leurs vecteurs. Les ajouts récents, pas encore dans les
+    listes, sont comparés directement ; les listes sont reconstruites dans un thread en
+    arrière-plan quand ils deviennent nombreux (centroïdes réentraînés quand l'index a
+    quadruplé depuis l'entraînement, sinon seuls les nouveaux vecteurs sont affectés).
+
+    Avec un chemin, les vecteurs sont un fichier d'enregistrements projeté en mémoire et
+    partagé par les workers ; les listes sont sauvegardées à côté (chemin + '.ivf.npz')
+    pour ne pas être recalculées au redémarrage.
+    """
+
+    def __init__(self, path=None, nprobe=8, rebuild_threshold=2048, min_train_size=1024,
+                 background=True, seed=0):
+        self.path = path
+        self.nprobe = nprobe
+        self.rebuild_threshold = rebuild_threshold
+        self.min_train_size = min_train_size
+        self.background = background
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._store = RecordStore(RECORD, path)
+        # Listes : centroïdes, liste de chaque vecteur indexé, vecteurs triés par liste et début de chaque liste
+        self._centroids = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._order = np.empty(0, dtype=np.intp)
+        self._starts = None
+        self._norms = np.empty(0, dtype=np.float32)
+        self._trained_count = 0
+        self._building = False
+        # Listes sauvegardées relues à la première recherche (pas au démarrage du service)
+        self._lists_loaded = not self.path
+
+    @property
+    def lists_path(self):
+        return f'{self.path}.ivf.npz'
+
+    def __len__(self):
+        with self._lock:
+            self._store.refresh()
+            return len(self._store)
+
+    def add(self, vector, item_id):
+        """Ajouter le vecteur d'une annonce"""
+        record = np.zeros(1, dtype=RECORD)
+        record['vector'] = vector
+        record['item_id'] = encode_item_id(item_id)
+        with self._lock:
+            self._store.append(record)
+
+    def vector_for(self, item_id):
+        """Dernier vecteur enregistré pour cette annonce, ou None"""
+        try:
+            encoded = encode_item_id(item_id)
+        except ValueError:
+            return None
+        with self._lock:
+            self._store.refresh()
+            records = self._store.records
+        matches = np.flatnonzero(records['item_id'] == encoded)
+        return np.array(records['vector'][matches[-1]]) if len(matches) else None
+
+    def lookup(self, vector, k=10, nprobe=None):
+        """[(identifiant, distance)] des k vecteurs les plus proches (approché)"""
+        query = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._store.refresh()
+            self._maybe_rebuild()
+            records = self._store.records
+            norms = self._norms
+            candidates = self._candidates(query, nprobe or self.nprobe)
+
+        # |v - q|² = |v|² - 2 v.q + |q|², normes des vecteurs indexés calculées à la construction
+        vectors = records['vector']
+        tail = np.asarray(vectors[len(norms):], dtype=np.float32)
+        indexes = np.concatenate([candidates, np.arange(len(norms), len(records))])
+        if not len(indexes):
+            return []
+        distances = np.concatenate([
+            norms[candidates] - 2 * (vectors[candidates] @ query),
+            np.einsum('ij,ij->i', tail, tail) - 2 * (tail @ query)
+        ])
+        distances = np.maximum(distances + query @ query, 0)
+        if len(indexes) > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+            indexes, distances = indexes[nearest], distances[nearest]
+        order = np.lexsort((indexes, distances))
+        return [
+            (decode_item_id(records['item_id'][i]), float(np.sqrt(d)))
+            for i, d in zip(indexes[order], distances[order])
+        ]
+
+    def stats(self):
+        with self._lock:
+            self._store.refresh()
+            return {
+                'size': len(self._store),
+                'indexed': len(self._assignments),
+                'lists': 0 if self._centroids is None else len(self._centroids),
+                'nprobe': self.nprobe,
+                'building': self._building,
+                'persistent': bool(self.path)
+            }
+
+    def rebuild(self):
+        """Reconstruire les listes avec tous les vecteurs présents (bloquant)"""
+        with self._lock:
+            self._store.refresh()
+            records = self._store.records
+            snapshot = (self._centroids, self._assignments, self._trained_count)
+        self._install(*self._build(records, *snapshot))
+
+    def _candidates(self, query, nprobe):
+        """Vecteurs indexés des nprobe listes dont le centroïde est le plus proche de la requête"""
+        if self._centroids is None or not len(self._order):
+            return np.empty(0, dtype=np.intp)
+        distances = squared_distances(query[None, :], self._centroids)[0]
+        probes = np.argpartition(distances, min(nprobe, len(distances)) - 1)[:nprobe]
+        begins = self._starts[probes]
+        lengths = self._starts[probes + 1] - begins
+        total = int(lengths.sum())
+        # Concaténation des tranches [début, début + longueur) sans boucle Python
+        offsets = np.repeat(begins - np.cumsum(lengths) + lengths, lengths)
+        return self._order[offsets + np.arange(total)]
+
+    def _maybe_rebuild(self):
+        """Lancer la reconstruction des listes si les ajouts récents sont trop nombreux"""
+        if not self._lists_loaded:
+            self._lists_loaded = True
+            self._load_lists()
+        count = len(self._store)
+        tail = count - len(self._assignments)
+        if self._building or count < self.min_train_size:
+            return
+        if tail <= max(self.rebuild_threshold, len(self._assignments) // 16) and self._centroids is not None:
+            return
+        snapshot = (self._store.records, self._centroids, self._assignments, self._trained_count)
+        if not self.background:
+            self._install(*self._build(*snapshot), locked=True)
+            return
+        self._building = True
+        threading.Thread(target=self._build_in_background, args=snapshot, name='vector-index',
+                         daemon=True).start()
+
+    def _build_in_background(self, *snapshot):
+        try:
+            self._install(*self._build(*snapshot))
+        except Exception as e:
+            logger.error(f"Erreur lors de la reconstruction de l'index de similarité: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _build(self, records, centroids, assignments, trained_count):
+        """(centroïdes, listes de tous les vecteurs de records, taille à l'entraînement)"""
+        start = time.perf_counter()
+        vectors = records['vector']
+        if centroids is None or len(records) >= 4 * trained_count:
+            lists = int(np.clip(np.sqrt(len(records)), 1, 4096))
+            centroids = train_centroids(vectors, lists, self._rng)
+            assignments = nearest_centroids(vectors, centroids)
+            trained_count = len(records)
+        else:
+            assignments = np.concatenate([assignments, nearest_centroids(vectors[len(assignments):], centroids)])
+        logger.info(f"Index de similarité : {len(records)} vecteurs, {len(centroids)} listes, "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        return records, centroids, assignments, trained_count
+
+    def _install(self, records, centroids, assignments, trained_count, locked=False):
+        order, starts, norms = list_tables(records['vector'], assignments, len(centroids))
+        if not locked:
+            self._lock.acquire()
+        try:
+            # Une reconstruction plus ancienne ne remplace pas des listes plus complètes
+            if len(assignments) >= len(self._assignments):
+                self._centroids, self._assignments, self._trained_count = centroids, assignments, trained_count
+                self._order, self._starts, self._norms = order, starts, norms
+        finally:
+            if not locked:
+                self._lock.release()
+        if self.path:
+            self._save_lists(centroids, assignments, trained_count)
+
+    def _save_lists(self, centroids, assignments, trained_count):
+        temporary = f'{self.lists_path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            np.savez(f, centroids=centroids, assignments=assignments, trained_count=trained_count)
+        os.replace(temporary, self.lists_path)
+
+    def _load_lists(self):
+        """Reprendre les listes sauvegardées si elles correspondent au fichier de vecteurs"""
+        try:
+            with np.load(self.lists_path) as saved:
+                centroids, assignments = saved['centroids'], saved['assignments']
+                trained_count = int(saved['trained_count'])
+        except (OSError, KeyError, ValueError):
+            return
+        if centroids.shape[1:] != (FEATURE_DIM,) or len(assignments) > len(self._store):
+            return
+        self._centroids, self._assignments, self._trained_count = centroids, assignments, trained_count
+        self._order, self._starts, self._norms = list_tables(self._store.records['vector'], assignments,
+                                                             len(centroids))
@@ -0,0 +1,70 @@
+"""
+Configuration gunicorn du service IA ECOSHARE (production)
+
+Usage : gunicorn --config gunicorn.conf.py app:app
+Les réglages proviennent de config.py (variables d'environnement AI_WEB_*).
+"""
+
+import os
+import threading
+
+# 'config' est un réglage gunicorn : le dictionnaire du service est importé sous un autre nom
+from config import config as service_configs
+
+# Même configuration par défaut que app.py (l'image Docker définit FLASK_ENV=production)
+settings = service_configs[os.environ.get('FLASK_ENV', 'development')]
+
+bind = f"0.0.0.0:{settings.PORT}"
+
+# Workers multi-threads : les threads attendent les E/S (téléchargements, pool d'analyse)
+worker_class = 'gthread'
+workers = settings.WEB_WORKERS
+threads = settings.WEB_THREADS
+
+keepalive = settings.WEB_KEEPALIVE
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+
+# Recyclage périodique des workers pour borner la croissance mémoire
+max_requests = settings.WEB_MAX_REQUESTS
+max_requests_jitter = max(settings.WEB_MAX_REQUESTS // 10, 1)
+
+# Application chargée une fois dans le maître : modules, index et catalogues
+# sont partagés en copie sur écriture entre les workers issus du fork
+preload_app = True
+
+# Limites des en-têtes ; la taille du corps est bornée par route dans app.py (MAX_CONTENT_LENGTH)
+limit_request_line = 8190
+limit_request_fields = 100
+
+accesslog = '-'
+errorlog = '-'
+loglevel = settings.LOG_LEVEL.lower()
+
+
+# Délai (secondes) entre le démarrage d'un worker et son préchauffage en arrière-plan
+WARMUP_DELAY = 0.25
+
+
+def when_ready(server):
+    """AI_WARMUP=preload : modules lourds chargés une fois dans le maître, partagés par les workers"""
+    if settings.AI_WARMUP == 'preload':
+        from app import warm_up
+        warm_up(analyze=False)
+
+
+def post_worker_init(worker):
+    """Préchauffer le worker en arrière-plan : il accepte les requêtes sans attendre les imports"""
+    if settings.AI_WARMUP != 'off':
+        from app import warm_up
+        # Court délai : les premières sondes /health passent avant que les imports n'occupent le GIL
+        timer = threading.Timer(WARMUP_DELAY, warm_up)
+        timer.name = 'warm-up'
+        timer.daemon = True
+        timer.start()
+
+
+def worker_exit(server, worker):
+    """Arrêter proprement le pool d'analyse du worker qui se termine"""
+    from app import analysis_pool
+    analysis_pool.shutdown(wait=False)
@@ -0,0 +1,302 @@
+"""
+Téléchargement des images distantes (image_url) : connexions réutilisées, taille bornée,
+cache disque borné revalidé par ETag / Last-Modified et cache négatif des URLs en échec
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from disk_cache import DiskBudget
+
+logger = logging.getLogger(__name__)
+
+
+class ImageFetchError(Exception):
+    """Image distante indisponible, en erreur ou trop volumineuse"""
+
+
+class ImageFetcher:
+    """Client HTTP partagé pour les images distantes
+
+    - une session et un pool de connexions keep-alive partagés par tous les threads ;
+    - un téléchargement en flux interrompu dès que max_bytes est dépassé ;
+    - un cache disque optionnel, limité à cache_max_bytes : réponse réutilisée telle
+      quelle pendant son max-age, puis revalidée par requête conditionnelle
+      (If-None-Match / If-Modified-Since) ; les réponses no-store ne sont pas conservées ;
+    - un cache négatif : une URL en échec n'est pas retentée pendant negative_ttl secondes
+      (au plus negative_max_entries URLs, les plus anciennes oubliées d'abord).
+    """
+
+    def __init__(self, max_bytes, timeout=10, pool_size=10, cache_dir=None,
+                 negative_ttl=60, chunk_size=64 * 1024, clock=time.time,
+                 cache_max_bytes=0, negative_max_entries=10000):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.negative_ttl = negative_ttl
+        self.negative_max_entries = negative_max_entries
+        self.chunk_size = chunk_size
+        self._clock = clock
+        self._pool_size = pool_size
+        self._session = None
+
+        # URL -> instant de la prochaine tentative, dans l'ordre des échecs (même durée pour tous)
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'downloads': 0, 'cache_hits': 0, 'revalidated': 0,
+                          'negative_hits': 0, 'errors': 0}
+
+        self._disk_budget = DiskBudget(cache_dir, cache_max_bytes, clock=clock) if cache_dir else None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def session(self):
+        """Session requests créée au premier téléchargement (import de requests différé)"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self._pool_size, pool_maxsize=self._pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def fetch(self, url):
+        """Retourner les octets de l'image à l'URL donnée, ou lever ImageFetchError"""
+        import requests
+
+        now = self._clock()
+        fresh, cached, headers = self._lookup(url, now)
+        if fresh is not None:
+            return fresh
+
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    return self._revalidated(url, response.headers, cached, now)
+                response.raise_for_status()
+                self._check_declared_size(response.headers)
+                content = self._join_capped(response.iter_content(self.chunk_size))
+                response_headers = response.headers
+        except (requests.RequestException, ImageFetchError, ValueError) as e:
+            raise self._record_failure(url, now, e) from e
+
+        return self._downloaded(url, response_headers, content, now)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, negative_entries=len(self._failures))
+        stats['disk_evictions'] = self._disk_budget.evicted if self._disk_budget else 0
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _lookup(self, url, now):
+        """Cache négatif puis cache disque : (corps encore frais, corps à revalider, en-têtes conditionnels)"""
+        with self._lock:
+            retry_at = self._failures.get(url)
+            if retry_at is not None and retry_at > now:
+                self._counters['negative_hits'] += 1
+                raise ImageFetchError(f"URL en échec récent: {url}")
+            self._failures.pop(url, None)
+
+        meta, body = self._read_cache(url)
+        if body is not None and meta.get('fresh_until', 0) > now:
+            self._count('cache_hits')
+            return body, None, {}
+
+        headers = {}
+        if body is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return None, body, headers
+
+    def _revalidated(self, url, headers, body, now):
+        self._count('revalidated')
+        self._write_cache(url, headers, body, now)
+        return body
+
+    def _downloaded(self, url, headers, body, now):
+        self._count('downloads')
+        self._write_cache(url, headers, body, now)
+        return body
+
+    def _record_failure(self, url, now, error):
+        """Mettre l'URL dans le cache négatif ; retourne l'ImageFetchError à lever"""
+        with self._lock:
+            self._failures[url] = now + self.negative_ttl
+            self._failures.move_to_end(url)
+            # Les plus anciens échecs en tête : expirés, ou au-delà de la taille maximale
+            while self._failures and (len(self._failures) > self.negative_max_entries
+                                      or next(iter(self._failures.values())) <= now):
+                self._failures.popitem(last=False)
+            self._counters['errors'] += 1
+        return ImageFetchError(f"Téléchargement impossible ({url}): {error}")
+
+    def _check_declared_size(self, headers):
+        declared = headers.get('Content-Length')
+        if declared is not None and int(declared) > self.max_bytes:
+            raise ImageFetchError(f"Image distante trop volumineuse ({declared} octets)")
+
+    def _join_capped(self, chunks_iterator):
+        chunks = []
+        total = 0
+        for chunk in chunks_iterator:
+            total += len(chunk)
+            if total > self.max_bytes:
+                raise ImageFetchError(f"Image distante trop volumineuse (> {self.max_bytes} octets)")
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _cache_paths(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, digest[:2], digest)
+        return f'{base}.json', f'{base}.body'
+
+    def _read_cache(self, url):
+        if not self.cache_dir:
+            return {}, None
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return {}, None
+
+    def _write_cache(self, url, headers, body, now):
+        if not self.cache_dir:
+            return
+        cache_control = headers.get('Cache-Control', '').lower()
+        if 'no-store' in cache_control:
+            # Ne rien conserver, pas même une version précédente
+            self._remove_cache(url)
+            return
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        max_age = parse_max_age(cache_control)
+        if not (etag or last_modified or max_age):
+            return
+
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh_until': now + max_age if max_age else 0
+        }
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            # Le corps est écrit avant les métadonnées, chacun de façon atomique
+            atomic_write(body_path, body)
+            atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire le cache des images distantes: {e}")
+            return
+        self._disk_budget.wrote(len(body))
+
+    def _remove_cache(self, url):
+        for path in self._cache_paths(url):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class AsyncImageFetcher(ImageFetcher):
+    """Variante asyncio (aiohttp) partageant le cache disque et le cache négatif
+
+    Un seul processus peut ainsi attendre des centaines de téléchargements à la fois.
+    La session aiohttp est créée dans la boucle d'événements qui l'utilise ; les lectures
+    et écritures du cache disque passent par le pool de threads par défaut de la boucle.
+    """
+
+    def __init__(self, max_bytes, max_connections=100, **kwargs):
+        super().__init__(max_bytes, **kwargs)
+        self.max_connections = max_connections
+        self._async_session = None
+
+    async def fetch_async(self, url):
+        """Retourner les octets de l'image à l'URL donnée, ou lever ImageFetchError"""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        now = self._clock()
+        fresh, cached, headers = await loop.run_in_executor(None, self._lookup, url, now)
+        if fresh is not None:
+            return fresh
+
+        try:
+            async with self._get_async_session().get(url, headers=headers) as response:
+                if response.status == 304 and cached is not None:
+                    return await loop.run_in_executor(None, self._revalidated, url, response.headers, cached, now)
+                response.raise_for_status()
+                self._check_declared_size(response.headers)
+
+                chunks = []
+                total = 0
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    total += len(chunk)
+                    if total > self.max_bytes:
+                        raise ImageFetchError(f"Image distante trop volumineuse (> {self.max_bytes} octets)")
+                    chunks.append(chunk)
+                content = b''.join(chunks)
+                response_headers = response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError, ImageFetchError, ValueError) as e:
+            raise self._record_failure(url, now, e) from e
+
+        return await loop.run_in_executor(None, self._downloaded, url, response_headers, content, now)
+
+    async def close(self):
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    def _get_async_session(self):
+        import aiohttp
+
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._async_session
+
+
+def parse_max_age(cache_control):
+    """Durée de fraîcheur (s) annoncée par Cache-Control, 0 si absente ou no-cache"""
+    directives = cache_control.lower()
+    if 'no-cache' in directives or 'no-store' in directives:
+        return 0
+    match = re.search(r'max-age=(\d+)', directives)
+    return int(match.group(1)) if match else 0
+
+
+def atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,118 @@
+"""
+Recherche de mots-clés en une seule passe (automate d'Aho-Corasick) et taxonomies indexées
+"""
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """Automate d'Aho-Corasick compilé une fois pour toutes à partir des mots-clés
+
+    find() parcourt le texte une seule fois, quel que soit le nombre de mots-clés,
+    et retourne l'ensemble des mots-clés présents comme sous-chaînes (équivalent à
+    {mot for mot in mots_clés if mot in texte}).
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(keywords))
+
+        # Trie des mots-clés
+        transitions = [{}]
+        outputs = [set()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(transitions)
+                    transitions[state][char] = next_state
+                    transitions.append({})
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(keyword)
+
+        # Liens d'échec en largeur, puis transitions complétées : un seul accès par caractère
+        fail = [0] * len(transitions)
+        queue = deque(transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            for char, next_state in transitions[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in transitions[fallback]:
+                    fallback = fail[fallback]
+                candidate = transitions[fallback].get(char, 0)
+                fail[next_state] = candidate if candidate != next_state else 0
+            for char, target in transitions[fail[state]].items():
+                transitions[state].setdefault(char, target)
+
+        self._transitions = transitions
+        self._outputs = [frozenset(output) for output in outputs]
+
+    def find(self, text):
+        """Ensemble des mots-clés présents dans le texte"""
+        transitions = self._transitions
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = transitions[state].get(char)
+            if state is None:
+                state = transitions[0].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+
+class KeywordTaxonomy:
+    """Catégories -> mots-clés, indexées pour exploiter le résultat de KeywordMatcher.find()"""
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self._category_indexes = {}
+        self._positions = {}
+        position = 0
+        for index, (category, keywords) in enumerate(categories.items()):
+            for keyword in keywords:
+                self._category_indexes.setdefault(keyword, []).append(index)
+                self._positions.setdefault(keyword, []).append(position)
+                position += 1
+
+    @property
+    def keywords(self):
+        return list(self._positions)
+
+    def first_category(self, matched, default=None):
+        """Première catégorie (dans l'ordre de la taxonomie) dont un mot-clé est présent"""
+        indexes = [index for keyword in matched for index in self._category_indexes.get(keyword, ())]
+        return self.categories[min(indexes)] if indexes else default
+
+    def category_counts(self, matched):
+        """Nombre de mots-clés présents par catégorie, dans l'ordre de la taxonomie"""
+        counts = dict.fromkeys(self.categories, 0)
+        for keyword in matched:
+            for index in self._category_indexes.get(keyword, ()):
+                counts[self.categories[index]] += 1
+        return counts
+
+    def ordered_keywords(self, matched):
+        """Mots-clés présents dans l'ordre de la taxonomie (répétés s'ils figurent dans plusieurs catégories)"""
+        positions = sorted(
+            (position, keyword)
+            for keyword in matched
+            for position in self._positions.get(keyword, ())
+        )
+        return [keyword for _, keyword in positions]
+
+
+def searchable_text(image_data):
+    """Texte analysable d'une source d'image, en minuscules
+
+    Pour une data URL, seul l'en-tête (avant la virgule) est retenu : la charge utile
+    base64 n'est jamais parcourue.
+    """
+    text = str(image_data)
+    if text.startswith('data:'):
+        text = text.split(',', 1)[0]
+    return text.lower()
@@ -0,0 +1,236 @@
+"""
+Métriques au format texte Prometheus : compteurs, histogrammes et jauges calculées à la lecture
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Bornes (secondes) des histogrammes de latence : de 0,5 ms à 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bornes (octets) des tailles de requêtes : de 1 Ko à 16 Mo
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(8))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Counter:
+    """Compteur monotone, une valeur par combinaison d'étiquettes"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, self._labels(label_values), value
+
+    def _labels(self, label_values, extra=()):
+        return tuple(zip(self.label_names, label_values)) + tuple(extra)
+
+
+class Histogram(Counter):
+    """Histogramme à bornes fixes : observe() ne fait qu'une recherche dichotomique et deux additions"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                # [effectifs par case (+Inf en dernier), somme des valeurs]
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for label_values, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', self._labels(label_values, [('le', format_value(bound))]), cumulative
+            yield f'{self.name}_sum', self._labels(label_values), total
+            yield f'{self.name}_count', self._labels(label_values), cumulative
+
+
+class Gauge:
+    """Jauge calculée à chaque lecture : callback() retourne {valeurs d'étiquettes: valeur}"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, label_names, callback, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self):
+        for label_values, value in sorted(self.callback().items()):
+            yield self.name, tuple(zip(self.label_names, label_values)), value
+
+
+class MetricsRegistry:
+    """Ensemble de métriques exposées ensemble par /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge(self, name, documentation, label_names, callback, kind='gauge'):
+        """Valeurs lues au moment de l'export (kind='counter' pour des compteurs tenus ailleurs)"""
+        return self.register(Gauge(name, documentation, label_names, callback, kind))
+
+    def render(self):
+        """Exposition texte Prometheus (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ','.join(f'{key}="{escape_label(str(val))}"' for key, val in labels)
+                    name = f'{name}{{{label_text}}}'
+                lines.append(f'{name} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Registre du processus et durée des étapes du pipeline
+registry = MetricsRegistry()
+STAGE_SECONDS = registry.histogram(
+    'ai_stage_duration_seconds', "Durée des étapes du pipeline d'analyse", ['stage']
+)
+
+_local = threading.local()
+
+
+class StageRecording:
+    """Étapes [(nom, début perf_counter, durée)] et attributs notés pendant un traitement"""
+
+    def __init__(self, previous=None):
+        self.stages = []
+        self.attributes = {}
+        # Enregistrement englobant, rétabli par stop_recording()
+        self.previous = previous
+
+
+def record_stage(stage, seconds, start=None):
+    """Observer la durée d'une étape (et la noter si un enregistrement est en cours dans ce thread)"""
+    STAGE_SECONDS.observe(seconds, stage)
+    recording = getattr(_local, 'recording', None)
+    if recording is not None:
+        recording.stages.append((stage, start, seconds))
+
+
+def record_attribute(name, value):
+    """Noter une information sur le traitement en cours (sans effet hors enregistrement)"""
+    recording = getattr(_local, 'recording', None)
+    if recording is not None:
+        recording.attributes[name] = value
+
+
+def timed_stage(stage):
+    """Décorateur : durée de chaque appel observée dans ai_stage_duration_seconds{stage=...}"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - start, start)
+        return wrapper
+    return decorator
+
+
+def start_recording():
+    """Commencer à noter les étapes de ce thread ; retourne l'enregistrement à passer à stop_recording()"""
+    recording = StageRecording(getattr(_local, 'recording', None))
+    _local.recording = recording
+    return recording
+
+
+def stop_recording(recording):
+    _local.recording = recording.previous
+
+
+def bind_recording(function):
+    """function notant ses étapes dans l'enregistrement en cours de ce thread, depuis le thread qui l'exécute
+
+    Pour les tâches soumises à un pool de threads (images d'un lot) pendant une requête détaillée.
+    """
+    recording = getattr(_local, 'recording', None)
+    if recording is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, 'recording', None)
+        _local.recording = recording
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.recording = previous
+    return wrapper
+
+
+@contextmanager
+def recording_stages():
+    """StageRecording des étapes mesurées dans ce thread pendant le bloc
+
+    Sert à rapatrier les mesures faites dans un processus du pool d'analyse, dont
+    le registre n'est jamais exporté, et à détailler une requête (en-tête X-Timing).
+    """
+    recording = start_recording()
+    try:
+        yield recording
+    finally:
+        stop_recording(recording)
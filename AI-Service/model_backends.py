@@ -0,0 +1,227 @@
+"""
+Backends de classification d'objets : règles heuristiques (défaut) ou modèle CPU chargé depuis AI_MODEL_PATH
+
+Un modèle est un répertoire contenant model.json (étiquettes, prétraitement, fichier)
+et le fichier du modèle. Seul le framework du backend choisi est importé, au premier
+chargement, une fois par processus.
+"""
+
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_METADATA = 'model.json'
+
+# None : règles visuelles et similarité textuelle d'app.py, sans modèle
+MODEL_BACKENDS = {
+    'heuristic': None
+}
+
+
+def register_backend(backend):
+    """Ajouter un backend à MODEL_BACKENDS (décorateur) ; une classe dont run() manque est refusée"""
+    if inspect.isabstract(backend):
+        raise TypeError(f"Backend {backend.__name__} incomplet : {', '.join(sorted(backend.__abstractmethods__))}")
+    MODEL_BACKENDS[backend.name] = backend
+    return backend
+
+
+class ModelBackend(ABC):
+    """Modèle chargé une fois par processus ; predict() traite un lot d'images RGB uint8
+
+    model.json : {"labels": [...], "file": "...", "input_size": [largeur, hauteur],
+    "mean": [...], "std": [...], "layout": "NCHW" | "NHWC", "output": "logits" | "probabilities",
+    "version": "..."}. Les étiquettes sont des catégories de OBJECT_CATEGORIES.
+    """
+
+    name = None
+    default_file = None
+    # Chargement possible dans le maître gunicorn avant le fork (poids partagés en copie sur écriture)
+    fork_safe = False
+
+    def __init__(self, model_dir, metadata):
+        self.labels = list(metadata['labels'])
+        self.model_file = os.path.join(model_dir, metadata.get('file', self.default_file))
+        self.input_size = tuple(metadata.get('input_size', (224, 224)))
+        self.mean = np.asarray(metadata.get('mean', (0.485, 0.456, 0.406)), dtype=np.float32) * 255
+        self.std = np.asarray(metadata.get('std', (0.229, 0.224, 0.225)), dtype=np.float32) * 255
+        self.layout = metadata.get('layout', 'NCHW')
+        self.logits = metadata.get('output', 'logits') == 'logits'
+
+    def preprocess(self, images):
+        """Lot float32 normalisé (n x 3 x h x w ou n x h x w x 3) à partir d'images RGB uint8"""
+        import cv2
+        batch = np.empty((len(images), self.input_size[1], self.input_size[0], 3), dtype=np.float32)
+        for i, image in enumerate(images):
+            batch[i] = cv2.resize(image, self.input_size, interpolation=cv2.INTER_AREA)
+        batch -= self.mean
+        batch /= self.std
+        return np.ascontiguousarray(batch.transpose(0, 3, 1, 2)) if self.layout == 'NCHW' else batch
+
+    @abstractmethod
+    def run(self, batch):
+        """Scores (n x étiquettes) du modèle pour un lot prétraité"""
+
+    def predict(self, images):
+        """[(catégorie, confiance)] pour une liste d'images RGB uint8"""
+        scores = np.asarray(self.run(self.preprocess(images)), dtype=np.float64)
+        if self.logits:
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+        best = scores.argmax(axis=1)
+        return [(self.labels[index], float(scores[row, index])) for row, index in enumerate(best)]
+
+
+@register_backend
+class OnnxBackend(ModelBackend):
+    """Modèle ONNX exécuté par ONNX Runtime (CPU)
+
+    Les poids stockés en données externes (model.onnx.data) sont projetés en mémoire par
+    ONNX Runtime : les workers partagent le cache de pages. La session crée ses propres
+    threads et n'est donc jamais ouverte avant le fork.
+    """
+
+    name = 'onnx'
+    default_file = 'model.onnx'
+
+    def __init__(self, model_dir, metadata):
+        super().__init__(model_dir, metadata)
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        # Le parallélisme vient des workers : un thread d'inférence par session
+        options.intra_op_num_threads = int(metadata.get('threads', 1))
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(self.model_file, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+@register_backend
+class TorchScriptBackend(ModelBackend):
+    """Modèle TorchScript exécuté par PyTorch (CPU)
+
+    Chargé dans le maître gunicorn avec AI_WARMUP=preload, ses tenseurs sont partagés
+    en copie sur écriture par les workers (aucun thread PyTorch n'existe avant le fork).
+    """
+
+    name = 'torchscript'
+    default_file = 'model.pt'
+    fork_safe = True
+
+    def __init__(self, model_dir, metadata):
+        super().__init__(model_dir, metadata)
+        import torch
+
+        self._torch = torch
+        self.module = torch.jit.load(self.model_file, map_location='cpu').eval()
+
+    def run(self, batch):
+        with self._torch.inference_mode():
+            return self.module(self._torch.from_numpy(batch)).numpy()
+
+
+def read_model_metadata(model_dir):
+    with open(os.path.join(model_dir, MODEL_METADATA), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ModelRunner:
+    """Backend choisi, chargé paresseusement, et regroupement des inférences en lots
+
+    Les appels concurrents à predict() (threads des workers, lots de /classify-object/batch)
+    sont servis par un thread d'inférence : tout ce qui attend quand il se libère forme le
+    lot suivant (au plus max_batch images, max_wait secondes d'attente supplémentaire).
+    """
+
+    def __init__(self, backend, model_dir, max_batch=8, max_wait=0.0):
+        self.backend_name = backend
+        self.model_dir = model_dir
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metadata = read_model_metadata(model_dir) if self.enabled else {}
+        self._backend = None
+        self._lock = threading.Lock()
+        self._queue = None
+        self._owner_pid = None
+        self._counters = {'batches': 0, 'images': 0}
+
+    @property
+    def enabled(self):
+        return MODEL_BACKENDS[self.backend_name] is not None
+
+    @property
+    def version(self):
+        """Identifiant du modèle pour les clés du cache de résultats"""
+        if not self.enabled:
+            return self.backend_name
+        return f"{self.backend_name}:{self.metadata.get('version', '')}"
+
+    def load(self, before_fork=False):
+        """Charger le modèle s'il ne l'est pas (avant le fork : seulement si le backend le permet)"""
+        backend_class = MODEL_BACKENDS[self.backend_name]
+        if backend_class is None or (before_fork and not backend_class.fork_safe):
+            return None
+        with self._lock:
+            if self._backend is None:
+                start = time.perf_counter()
+                self._backend = backend_class(self.model_dir, self.metadata)
+                logger.info(f"Modèle {self.backend_name} chargé en {(time.perf_counter() - start) * 1000:.0f} ms")
+            return self._backend
+
+    def predict(self, image):
+        """(catégorie, confiance) pour une image RGB uint8, inférée dans le lot suivant"""
+        future = Future()
+        self._get_queue().put((image, future))
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, backend=self.backend_name, loaded=self._backend is not None)
+
+    def _get_queue(self):
+        # Le thread d'inférence ne survit pas au fork : chaque processus démarre le sien
+        with self._lock:
+            if self._queue is None or self._owner_pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                self._owner_pid = os.getpid()
+                threading.Thread(target=self._serve, args=(self._queue,), name='model-inference',
+                                 daemon=True).start()
+            return self._queue
+
+    def _serve(self, pending):
+        while True:
+            items = [pending.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(items) < self.max_batch:
+                try:
+                    items.append(pending.get(timeout=max(deadline - time.perf_counter(), 0))
+                                 if self.max_wait else pending.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(items)
+
+    def _run_batch(self, items):
+        try:
+            predictions = self.load().predict([image for image, _ in items])
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self._counters['batches'] += 1
+            self._counters['images'] += len(items)
+        for (_, future), prediction in zip(items, predictions):
+            future.set_result(prediction)
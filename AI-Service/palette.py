@@ -0,0 +1,94 @@
+"""
+Extraction des couleurs dominantes : quantification par histogramme (par défaut) ou k-means OpenCV
+"""
+
+import numpy as np
+
+# OpenCV n'est importé qu'au premier échantillonnage (démarrage du service plus rapide)
+
+# Côté de l'échantillon analysé (150 x 150 = 22 500 pixels, comme le k-means historique)
+SAMPLE_EDGE = 150
+
+
+def sample_pixels(img_array):
+    """Pixels RGB de l'image réduite à SAMPLE_EDGE x SAMPLE_EDGE"""
+    import cv2
+    return cv2.resize(img_array, (SAMPLE_EDGE, SAMPLE_EDGE)).reshape((-1, 3))
+
+
+def histogram_palette(img_array, k=5, bits=4, iterations=4):
+    """Palette déterministe par quantification de l'histogramme des couleurs
+
+    Les pixels sont répartis dans 2^(3*bits) cases. Les centres initiaux sont choisis
+    sans hasard (case la plus peuplée, puis case maximisant effectif x distance² aux
+    centres déjà choisis), puis affinés par quelques itérations de Lloyd pondérées
+    sur les cases non vides plutôt que sur les pixels.
+    """
+    pixels = sample_pixels(img_array)
+    shift = 8 - bits
+    quantized = pixels >> shift
+    bins = (quantized[:, 0].astype(np.intp) << (2 * bits)) | (quantized[:, 1].astype(np.intp) << bits) | quantized[:, 2]
+
+    size = 1 << (3 * bits)
+    counts = np.bincount(bins, minlength=size)
+    sums = np.stack([np.bincount(bins, weights=pixels[:, c], minlength=size) for c in range(3)], axis=1)
+
+    occupied = np.flatnonzero(counts)
+    bin_counts = counts[occupied].astype(np.float64)
+    bin_means = sums[occupied] / bin_counts[:, None]
+
+    centers = bin_means[farthest_point_seeds(bin_means, bin_counts, k)]
+
+    for _ in range(iterations):
+        labels = nearest_center(bin_means, centers)
+        weights = np.bincount(labels, weights=bin_counts, minlength=len(centers))
+        for c in range(3):
+            channel = np.bincount(labels, weights=bin_means[:, c] * bin_counts, minlength=len(centers))
+            centers[:, c] = np.divide(channel, weights, out=centers[:, c].copy(), where=weights > 0)
+
+    labels = nearest_center(bin_means, centers)
+    frequencies = np.bincount(labels, weights=bin_counts, minlength=len(centers)).astype(np.int64)
+    return format_palette(centers.astype(np.float32), frequencies)
+
+
+def kmeans_palette(img_array, k=5):
+    """Palette par k-means OpenCV (10 essais, centres aléatoires : non déterministe)"""
+    import cv2
+    data = np.float32(sample_pixels(img_array))
+
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+    _, labels, centers = cv2.kmeans(data, k, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
+
+    frequencies = np.bincount(labels.ravel(), minlength=len(centers))
+    return format_palette(centers, frequencies)
+
+
+def farthest_point_seeds(points, weights, k):
+    """Indices de k points initiaux déterministes (variante pondérée de k-means++ sans tirage)"""
+    chosen = [int(np.argmax(weights))]
+    distances = ((points - points[chosen[0]]) ** 2).sum(axis=1)
+    for _ in range(1, min(k, len(points))):
+        index = int(np.argmax(weights * distances))
+        chosen.append(index)
+        distances = np.minimum(distances, ((points - points[index]) ** 2).sum(axis=1))
+    return np.array(chosen)
+
+
+def nearest_center(points, centers):
+    distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+def format_palette(centers, frequencies):
+    """[{'rgb': [r, g, b], 'frequency': n}] trié par fréquence décroissante, sans centre vide"""
+    order = np.argsort(-frequencies, kind='stable')
+    return [
+        {'rgb': centers[i].tolist(), 'frequency': int(frequencies[i])}
+        for i in order if frequencies[i] > 0
+    ]
+
+
+PALETTE_ENGINES = {
+    'histogram': histogram_palette,
+    'kmeans': kmeans_palette
+}
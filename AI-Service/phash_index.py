@@ -0,0 +1,174 @@
+"""
+Empreintes perceptuelles (pHash 64 bits) et index des photos quasi identiques par distance de Hamming
+"""
+
+import hashlib
+import threading
+from itertools import combinations
+
+import numpy as np
+
+from record_store import ITEM_ID_BYTES, RecordStore, decode_item_id, encode_item_id
+
+# Empreinte découpée en 4 blocs de 16 bits, indexés séparément (multi-index hashing)
+CHUNKS = 4
+CHUNK_BITS = 16
+
+# Enregistrement du fichier d'index : empreinte, clé du cache de résultats (SHA-256), empreinte du
+# libellé de la source (nom de fichier, URL) et identifiant libre
+RECORD = np.dtype([('hash', '<u8'), ('key', 'u1', (32,)), ('source', '<u8'), ('item_id', f'S{ITEM_ID_BYTES}')])
+
+# Écart type minimal des basses fréquences : en dessous (image unie, bruit sans structure),
+# les bits de l'empreinte ne dépendent que d'égalités ou du hasard
+MIN_FREQUENCY_STD = 8.0
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(values):
+    """Nombre de bits à 1 de chaque entier d'un tableau uint64"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT8[np.ascontiguousarray(values).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def perceptual_hash(image):
+    """pHash 64 bits d'une image Pillow, ou None pour une image sans structure (unie)
+
+    Bits des 8 x 8 plus basses fréquences de la DCT de l'image réduite à 32 x 32 niveaux
+    de gris, comparées à leur médiane (composante continue exclue) : insensible au
+    réencodage, au redimensionnement et aux petits recadrages.
+    """
+    import cv2
+    from PIL import Image
+
+    gray = np.asarray(image.convert('L').resize((32, 32), Image.BOX), dtype=np.float32)
+    low = cv2.dct(gray)[:8, :8].ravel()
+    if low[1:].std() < MIN_FREQUENCY_STD:
+        return None
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def source_digest(label):
+    """Empreinte 64 bits du libellé d'une source, comparée lors des réutilisations"""
+    return int.from_bytes(hashlib.blake2b(label.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def chunk_masks(radius):
+    """Masques de CHUNK_BITS bits comptant au plus radius bits à 1"""
+    masks = [0]
+    for count in range(1, radius + 1):
+        masks.extend(sum(1 << bit for bit in bits) for bits in combinations(range(CHUNK_BITS), count))
+    return np.array(masks, dtype=np.intp)
+
+
+class HashIndex:
+    """Index d'empreintes 64 bits : voisins à distance de Hamming <= max_distance
+
+    Deux empreintes à distance <= d ont au moins un bloc de 16 bits à distance <= d // 4
+    (principe des tiroirs) : pour chaque bloc, seules les valeurs voisines de celui de la
+    requête sont lues dans une table triée (positions par valeur de bloc), puis les
+    candidats sont vérifiés ensemble. Les derniers ajouts, pas encore dans les tables,
+    sont comparés directement ; les tables sont reconstruites quand ils deviennent nombreux.
+
+    Avec un chemin, l'index est un fichier d'enregistrements en ajout seul, projeté en
+    mémoire et partagé par les workers : chacun voit les ajouts des autres.
+    """
+
+    def __init__(self, path=None, max_distance=10, rebuild_threshold=4096):
+        self.path = path
+        self.max_distance = max_distance
+        self.rebuild_threshold = rebuild_threshold
+        self._lock = threading.Lock()
+        self._masks = [chunk_masks(radius) for radius in range(max_distance // CHUNKS + 1)]
+        self._store = RecordStore(RECORD, path)
+        # Tables par bloc : (ordre des enregistrements triés par valeur du bloc, début de chaque valeur)
+        self._tables = []
+        self._indexed = 0
+
+    def __len__(self):
+        with self._lock:
+            self._store.refresh()
+            return len(self._store)
+
+    def add(self, image_hash, key, item_id='', source=0):
+        """Ajouter une empreinte, la clé de cache (hexadécimale), l'identifiant de la photo et source_digest()"""
+        record = np.zeros(1, dtype=RECORD)
+        record['hash'] = image_hash
+        record['key'][0] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+        record['source'] = source
+        record['item_id'] = encode_item_id(item_id)
+        with self._lock:
+            self._store.append(record)
+
+    def lookup(self, image_hash, max_distance=None, limit=10, source=None):
+        """[(clé, identifiant, distance)] des empreintes les plus proches, à distance <= max_distance
+
+        Avec source (source_digest()), seules les photos enregistrées avec le même libellé sont retenues.
+        """
+        distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        with self._lock:
+            self._store.refresh()
+            if len(self._store) - self._indexed > max(self.rebuild_threshold, self._indexed // 16):
+                self._rebuild()
+            records = self._store.records
+            candidates = self._candidates(image_hash, distance)
+            indexes = np.concatenate([candidates, np.arange(self._indexed, len(records))])
+
+        if not len(indexes):
+            return []
+        distances = popcount64(records['hash'][indexes] ^ np.uint64(image_hash))
+        close = distances <= distance
+        if source is not None:
+            close &= records['source'][indexes] == np.uint64(source)
+        # Un enregistrement peut être candidat par plusieurs blocs : dédoublonner les seuls retenus
+        indexes, first = np.unique(indexes[close], return_index=True)
+        distances = distances[close][first]
+        order = np.lexsort((indexes, distances))[:limit]
+        return [
+            (records['key'][i].tobytes().hex(), decode_item_id(records['item_id'][i]), int(d))
+            for i, d in zip(indexes[order], distances[order])
+        ]
+
+    def stats(self):
+        with self._lock:
+            self._store.refresh()
+            return {
+                'size': len(self._store),
+                'indexed': self._indexed,
+                'max_distance': self.max_distance,
+                'persistent': bool(self.path)
+            }
+
+    def _candidates(self, image_hash, distance):
+        """Enregistrements indexés dont un bloc est à distance <= distance // CHUNKS de celui de la requête
+
+        Un même enregistrement peut apparaître plusieurs fois (un bloc proche ou plus).
+        """
+        if not self._indexed:
+            return np.empty(0, dtype=np.intp)
+        masks = self._masks[distance // CHUNKS]
+        found = []
+        for chunk, (order, starts) in enumerate(self._tables):
+            probes = ((image_hash >> (chunk * CHUNK_BITS)) & 0xFFFF) ^ masks
+            begins = starts[probes]
+            lengths = starts[probes + 1] - begins
+            total = int(lengths.sum())
+            if total:
+                # Concaténation des tranches [début, début + longueur) sans boucle Python
+                offsets = np.repeat(begins - np.cumsum(lengths) + lengths, lengths)
+                found.append(order[offsets + np.arange(total)])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def _rebuild(self):
+        hashes = self._store.records['hash']
+        tables = []
+        for chunk in range(CHUNKS):
+            values = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(0xFFFF)).astype(np.uint16)
+            order = np.argsort(values, kind='stable').astype(np.intp)
+            starts = np.zeros(2 ** CHUNK_BITS + 1, dtype=np.intp)
+            np.cumsum(np.bincount(values, minlength=2 ** CHUNK_BITS), out=starts[1:])
+            tables.append((order, starts))
+        self._tables = tables
+        self._indexed = len(hashes)
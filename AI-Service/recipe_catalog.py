@@ -0,0 +1,172 @@
+"""
+Catalogue de recettes indexé par ingrédient, chargé une seule fois depuis data/recipes.json
+"""
+
+import json
+import os
+import unicodedata
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'recipes.json')
+
+
+class RecipeCatalog:
+    """Recettes indexées par ingrédient (index inversé) et par restriction (bitsets)
+
+    Chaque ensemble de recettes est un entier Python dont le bit i désigne la
+    recette i : la liste des recettes d'un ingrédient, celles qui contiennent un
+    ingrédient d'une étiquette donnée (viande, gluten, ...), celles d'une taille
+    donnée et les candidats d'une requête se combinent par |, & et ~ sans parcourir
+    le catalogue. Seules les recettes retournées sont examinées individuellement.
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self._labels = {}
+        self._ingredient_bits = {}
+        self._aliases = {}
+        ingredient_tags = {}
+        for ingredient, info in data['ingredients'].items():
+            self._labels[ingredient] = info['label']
+            self._ingredient_bits[ingredient] = 1 << len(self._ingredient_bits)
+            ingredient_tags[ingredient] = info.get('tags', [])
+            for alias in [ingredient, info['label'], *info.get('aliases', [])]:
+                self._aliases.setdefault(normalize(alias), ingredient)
+
+        self.recipes = tuple(data['recipes'])
+        self._recipe_ingredients = []
+        self._postings = dict.fromkeys(self._labels, 0)
+        self._tag_masks = {}
+        # Recettes par nombre d'ingrédients
+        self._size_masks = {}
+        for index, recipe in enumerate(self.recipes):
+            bit = 1 << index
+            ingredients = 0
+            for item in recipe['ingredients']:
+                ingredient = item['id']
+                ingredients |= self._ingredient_bits[ingredient]
+                self._postings[ingredient] |= bit
+                for tag in ingredient_tags[ingredient]:
+                    self._tag_masks[tag] = self._tag_masks.get(tag, 0) | bit
+            self._recipe_ingredients.append(ingredients)
+            size = popcount(ingredients)
+            self._size_masks[size] = self._size_masks.get(size, 0) | bit
+        self._all = (1 << len(self.recipes)) - 1
+
+        self._restrictions = {normalize(name): tuple(tags) for name, tags in data['restrictions'].items()}
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def resolve(self, name):
+        """Identifiant canonique d'un ingrédient (alias français, pluriel, accents), ou None"""
+        key = normalize(name)
+        ingredient = self._aliases.get(key)
+        if ingredient is None and key[-1:] in ('s', 'x'):
+            ingredient = self._aliases.get(key[:-1])
+        return ingredient
+
+    def excluded_mask(self, restrictions):
+        """Bitset des recettes interdites par des restrictions alimentaires ou allergènes"""
+        excluded = 0
+        for restriction in restrictions:
+            key = normalize(restriction)
+            for tag in self._restrictions.get(key, (key,)):
+                excluded |= self._tag_masks.get(tag, 0)
+        return excluded
+
+    def search(self, ingredients, restrictions=(), limit=5):
+        """[(index, bitset des ingrédients couverts)] des meilleures recettes
+
+        Classement : part des ingrédients de la recette disponibles, puis nombre
+        d'ingrédients disponibles, puis ordre du catalogue. Les recettes ne sont
+        jamais parcourues une à une : at_least[c] est le bitset des recettes qui
+        contiennent au moins c ingrédients demandés, et chaque classe (c ingrédients
+        couverts sur s) s'obtient par intersection avec les bitsets de taille.
+        """
+        postings = {}
+        for name in ingredients:
+            ingredient = self.resolve(name)
+            if ingredient is not None:
+                postings[ingredient] = self._postings[ingredient]
+        wanted = sum(self._ingredient_bits[ingredient] for ingredient in postings)
+
+        at_least = [self._all & ~self.excluded_mask(restrictions)] + [0] * len(postings)
+        for posting in postings.values():
+            for count in range(len(at_least) - 1, 0, -1):
+                at_least[count] |= at_least[count - 1] & posting
+
+        classes = sorted(
+            ((count / size, count, size) for size in self._size_masks
+             for count in range(1, min(size, len(postings)) + 1)),
+            reverse=True
+        )
+        results = []
+        for _, count, size in classes:
+            exact = at_least[count] & ~(at_least[count + 1] if count < len(postings) else 0)
+            members = exact & self._size_masks[size]
+            while members and len(results) < limit:
+                low = members & -members
+                index = low.bit_length() - 1
+                members ^= low
+                results.append((index, self._recipe_ingredients[index] & wanted))
+            if len(results) >= limit:
+                break
+        return results
+
+    def suggest(self, ingredients, restrictions=(), servings=None, limit=5):
+        """Recettes prêtes à servir (format attendu par le backend), adaptées au nombre de portions"""
+        return [self.format_recipe(index, matched, servings) for index, matched in
+                self.search(ingredients, restrictions, limit)]
+
+    def format_recipe(self, index, matched=0, servings=None):
+        """Recette du catalogue avec quantités recalculées et ingrédients disponibles / manquants"""
+        recipe = self.recipes[index]
+        servings = servings or recipe['servings']
+        ratio = servings / recipe['servings']
+        available = []
+        missing = []
+        lines = []
+        for item in recipe['ingredients']:
+            label = self._labels[item['id']]
+            (available if matched & self._ingredient_bits[item['id']] else missing).append(label)
+            quantity = format_quantity(item['quantity'] * ratio)
+            lines.append(' '.join(part for part in (quantity, item['unit'], label) if part))
+
+        return {
+            'title': recipe['title'],
+            'description': recipe['description'],
+            'ingredients': lines + recipe['pantry'],
+            'instructions': list(recipe['instructions']),
+            'prep_time': recipe['prep_time'],
+            'cook_time': recipe['cook_time'],
+            'servings': servings,
+            'difficulty': recipe['difficulty'],
+            'nutritional_info': dict(recipe['nutritional_info']),
+            'tags': list(recipe['tags']),
+            'image': None,
+            'matched_ingredients': available,
+            'missing_ingredients': missing,
+            'coverage': round(len(available) / len(lines), 2)
+        }
+
+
+def normalize(text):
+    """Minuscules, sans accents ni ligatures, espaces réduits"""
+    text = str(text).lower().replace('œ', 'oe').replace('æ', 'ae')
+    text = unicodedata.normalize('NFKD', text)
+    return ' '.join(''.join(char for char in text if not unicodedata.combining(char)).split())
+
+
+def popcount(bits):
+    # int.bit_count() n'existe qu'à partir de Python 3.10 (image Docker en 3.9)
+    return bin(bits).count('1')
+
+
+def format_quantity(quantity):
+    """Quantité arrondie (à l'unité au-delà de 10, sinon à la demie), virgule à la française"""
+    quantity = round(quantity) if quantity >= 10 else max(0.5, round(quantity * 2) / 2)
+    if quantity == int(quantity):
+        return str(int(quantity))
+    return str(quantity).replace('.', ',')
@@ -0,0 +1,85 @@
+"""
+Enregistrements de taille fixe en ajout seul, projetés en mémoire et partagés par les workers
+"""
+
+import os
+
+import numpy as np
+
+# Taille du champ item_id des enregistrements (octets UTF-8)
+ITEM_ID_BYTES = 24
+
+
+def encode_item_id(item_id):
+    """Identifiant encodé en UTF-8, ValueError au-delà de ITEM_ID_BYTES octets (jamais tronqué)"""
+    encoded = item_id.encode('utf-8')
+    if len(encoded) > ITEM_ID_BYTES:
+        raise ValueError(f"Identifiant trop long (plus de {ITEM_ID_BYTES} octets en UTF-8)")
+    return encoded
+
+
+def decode_item_id(encoded):
+    # Enregistrements écrits avant la vérification : un caractère coupé en fin d'identifiant est ignoré
+    return encoded.decode('utf-8', 'ignore')
+
+
+class RecordStore:
+    """Tableau d'enregistrements numpy (dtype structuré) qui ne fait que grandir
+
+    Avec un chemin, chaque ajout est un seul appel système en mode ajout et le fichier est
+    reprojeté en mémoire quand il a grandi : les workers voient les ajouts des autres.
+    Sans chemin, un tableau en mémoire agrandi par doublement. Pas de verrou : l'appelant
+    protège les appels.
+    """
+
+    def __init__(self, dtype, path=None):
+        self.dtype = dtype
+        self.path = path
+        # Projection du fichier, ou tableau en mémoire dont les count premiers sont utilisés
+        self._records = np.empty(0, dtype=dtype)
+        self._count = 0
+        self._file_size = 0
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.refresh()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def records(self):
+        return self._records[:self._count]
+
+    def append(self, record):
+        """Ajouter un enregistrement (tableau de longueur 1 du dtype)"""
+        if self.path:
+            # Un seul appel système en mode ajout : les workers peuvent écrire en même temps
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record.tobytes())
+            finally:
+                os.close(fd)
+            self.refresh()
+        else:
+            if self._count == len(self._records):
+                grown = np.empty(max(1024, 2 * len(self._records)), dtype=self.dtype)
+                grown[:self._count] = self._records[:self._count]
+                self._records = grown
+            self._records[self._count] = record[0]
+            self._count += 1
+
+    def refresh(self):
+        """Reprojeter le fichier s'il a grandi (ajouts de ce worker ou des autres)"""
+        if not self.path:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        # Un enregistrement en cours d'écriture par un autre worker est ignoré
+        size -= size % self.dtype.itemsize
+        if size != self._file_size:
+            self._records = np.memmap(self.path, dtype=self.dtype, mode='r', shape=(size // self.dtype.itemsize,))
+            self._count = len(self._records)
+            self._file_size = size
@@ -0,0 +1,155 @@
+"""
+Cache des résultats de classification, adressé par le contenu des images
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from disk_cache import DiskBudget
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ResultCache:
+    """Cache LRU en mémoire avec expiration, doublé d'un niveau disque optionnel
+
+    Le niveau disque (un fichier JSON par entrée) est partagé entre les workers
+    d'un même hôte : un résultat calculé par un worker profite aux autres. Il est
+    limité à disk_max_bytes, les entrées expirées et les plus anciennes supprimées d'abord.
+    """
+
+    def __init__(self, max_size=1000, ttl=3600, disk_dir=None, version='1', clock=time.time,
+                 disk_max_bytes=0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.version = version
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk_budget = DiskBudget(disk_dir, disk_max_bytes, max_age=ttl, clock=clock) if disk_dir else None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def make_key(self, kind, image_bytes, source=''):
+        """Empreinte SHA-256 des octets de l'image, du type d'analyse et de la version du pipeline
+
+        image_bytes peut être un objet bytes ou un fichier binaire, lu par blocs puis rembobiné.
+        """
+        digest = hashlib.sha256(f'{self.version}\0{kind}\0{source}\0'.encode('utf-8'))
+        if hasattr(image_bytes, 'read'):
+            image_bytes.seek(0)
+            for chunk in iter(lambda: image_bytes.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+            image_bytes.seek(0)
+        else:
+            digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Retourner le résultat en cache, ou None s'il est absent ou expiré"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value, now)
+        return value
+
+    def set(self, key, value):
+        """Mémoriser un résultat (les valeurs mises en cache ne doivent plus être modifiées)"""
+        now = self._clock()
+        with self._lock:
+            self._store(key, value, now)
+        self._write_disk(key, value)
+
+    def clear(self):
+        """Vider le niveau mémoire et remettre les compteurs à zéro"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """Compteurs exposés par /health"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'disk_enabled': bool(self.disk_dir),
+                'disk_evictions': self._disk_budget.evicted if self._disk_budget else 0
+            }
+
+    def _store(self, key, value, now):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f'{key}.json')
+
+    def _read_disk(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl <= now:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Écriture atomique : les autres workers ne lisent jamais un fichier partiel
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Impossible d'écrire le cache disque: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._disk_budget.wrote(size)
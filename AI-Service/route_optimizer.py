@@ -0,0 +1,112 @@
+"""
+Ordre des arrêts d'une tournée de livraisons (collecte puis dépôt de chaque livraison), sans service de cartes
+"""
+
+import time
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def distance_matrix(latitudes, longitudes):
+    """Distances haversine en km entre tous les points, calculées en une passe"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lng = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lng[:, None] - lng[None, :]) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_neighbor_route(distances, count, head):
+    """Arrêt le plus proche à chaque pas, un dépôt n'étant possible qu'après sa collecte"""
+    # Arrêts 2d (collecte) et 2d + 1 (dépôt) de la livraison d
+    available = np.zeros(2 * count, dtype=bool)
+    available[0::2] = True
+    order = np.empty(2 * count, dtype=np.intp)
+    current = head
+    for position in range(2 * count):
+        stop = int(np.argmin(np.where(available, distances[current, :2 * count], np.inf)))
+        order[position] = stop
+        available[stop] = False
+        if stop % 2 == 0:
+            available[stop + 1] = True
+        current = stop
+    return order
+
+
+def two_opt(distances, route, count, deadline):
+    """Inversions de segments qui raccourcissent la tournée sans mettre un dépôt avant sa collecte
+
+    route commence par le point de départ et finit par un point fictif à distance nulle
+    de tous les arrêts (tournée ouverte) ; elle est modifiée sur place. Retourne le
+    nombre d'inversions appliquées et si l'amélioration a convergé avant deadline.
+    """
+    last = 2 * count
+    moves = 0
+    improved = True
+    while improved:
+        improved = False
+        position = np.empty(len(route), dtype=np.intp)
+        position[route] = np.arange(len(route))
+        for i in range(1, last):
+            if time.perf_counter() > deadline:
+                return moves, False
+            # Un segment [i, j] ne peut contenir à la fois la collecte et le dépôt d'une livraison
+            pickups = position[0:last:2]
+            inside = pickups >= i
+            limit = min(int(position[1:last:2][inside].min()) - 1 if inside.any() else last, last)
+            if limit <= i:
+                continue
+            a, b = route[i - 1], route[i]
+            c, e = route[i + 1:limit + 1], route[i + 2:limit + 2]
+            gains = distances[a, b] + distances[c, e] - distances[a, c] - distances[b, e]
+            best = int(np.argmax(gains))
+            if gains[best] > 1e-9:
+                j = i + 1 + best
+                route[i:j + 1] = route[i:j + 1][::-1].copy()
+                position[route[i:j + 1]] = np.arange(i, j + 1)
+                moves += 1
+                improved = True
+    return moves, True
+
+
+def optimize_route(pickups, dropoffs, start=None, time_budget=0.1):
+    """Tournée ouverte passant par chaque collecte puis son dépôt, depuis start si fourni
+
+    pickups et dropoffs sont des listes de (lat, lng) ; le résultat donne l'ordre des
+    arrêts (2d : collecte de la livraison d, 2d + 1 : son dépôt), la distance de chaque
+    étape et les distances totales avant et après amélioration.
+    """
+    start_time = time.perf_counter()
+    count = len(pickups)
+    points = np.empty((2 * count + 1, 2), dtype=np.float64)
+    points[0:2 * count:2] = pickups
+    points[1:2 * count:2] = dropoffs
+    points[-1] = start if start is not None else points[:2 * count].mean(axis=0)
+
+    # Arrêts, départ (ou barycentre) puis point fictif de fin de tournée
+    distances = np.zeros((2 * count + 2, 2 * count + 2))
+    distances[:-1, :-1] = distance_matrix(points[:, 0], points[:, 1])
+    head, tail = 2 * count, 2 * count + 1
+    if start is None:
+        # Sans départ imposé : première collecte la plus éloignée du barycentre, puis trajet libre
+        first = 2 * int(np.argmax(distances[head, 0:2 * count:2]))
+        distances[head, :] = np.where(np.arange(2 * count + 2) == first, 0.0, np.inf)
+        order = nearest_neighbor_route(distances, count, head)
+        distances[head, :] = 0.0
+    else:
+        order = nearest_neighbor_route(distances, count, head)
+    route = np.concatenate(([head], order, [tail])).astype(np.intp)
+
+    initial = float(distances[route[:-1], route[1:]].sum())
+    moves, converged = two_opt(distances, route, count, start_time + time_budget)
+    legs = distances[route[:-2], route[1:-1]]
+    return {
+        'order': route[1:-1].tolist(),
+        'legs_km': legs.tolist(),
+        'total_km': float(legs.sum()),
+        'initial_km': initial,
+        'moves': moves,
+        'converged': converged
+    }
@@ -0,0 +1,272 @@
+"""
+Règles de classification déclaratives, compilées en opérations de masques NumPy
+
+Une règle est une disjonction (OU) de clauses ; une clause est une conjonction (ET)
+de contraintes (gauche, opérateur, droite, décalage) signifiant
+« gauche opérateur droite + décalage », droite valant None pour une constante.
+Les tables sont compilées au chargement du module et s'évaluent sur un lot entier
+de palettes ou d'images à la fois.
+"""
+
+import operator
+
+import numpy as np
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
+# Caractéristiques d'une couleur de palette
+COLOR_FEATURES = ('r', 'g', 'b', 'max', 'min')
+
+# Familles de couleurs : une couleur de la palette suffit à activer l'indicateur
+COLOR_FAMILY_RULES = [
+    # Couleurs métalliques (gris, argent, or)
+    ('has_metallic_colors', [
+        [('r', '>=', None, 100), ('r', '<=', None, 200), ('g', '>=', None, 100),
+         ('g', '<=', None, 200), ('b', '>=', None, 100), ('b', '<=', None, 200)]
+    ]),
+    # Couleurs neutres (beiges, bruns, gris) ou tons bruns
+    ('has_neutral_colors', [
+        [('r', '>=', None, 80), ('r', '<=', None, 180), ('g', '>=', None, 80),
+         ('g', '<=', None, 180), ('b', '>=', None, 80), ('b', '<=', None, 180)],
+        [('r', '>', 'g', 20), ('r', '>', 'b', 20)]
+    ]),
+    # Couleurs vives (saturation élevée)
+    ('has_vibrant_colors', [
+        [('max', '>', None, 150), ('max', '>', 'min', 50)]
+    ]),
+    # Couleurs bois (bruns, beiges)
+    ('has_wood_colors', [
+        [('r', '>', 'g', 10), ('r', '>', 'b', 10), ('r', '>', None, 100)]
+    ]),
+    # Couleurs vives et saturées
+    ('has_bright_colors', [
+        [('max', '>', None, 180), ('min', '<', None, 100)]
+    ]),
+    # Couleurs sport (rouge, bleu, vert vifs)
+    ('has_sport_colors', [
+        [('r', '>', None, 150), ('g', '<', None, 100), ('b', '<', None, 100)],
+        [('b', '>', None, 150), ('r', '<', None, 100), ('g', '<', None, 100)],
+        [('g', '>', None, 150), ('r', '<', None, 100), ('b', '<', None, 100)]
+    ]),
+    # Couleurs beauté (pastels, roses, violets)
+    ('has_beauty_colors', [
+        [('r', '>', None, 150), ('g', '>', None, 100), ('b', '>', None, 150)],
+        [('r', '>', None, 150), ('g', '<', None, 100), ('b', '>', None, 150)]
+    ]),
+    # Couleurs maison (neutres, terre)
+    ('has_home_colors', [
+        [('r', '>=', None, 50), ('r', '<=', None, 150), ('g', '>=', None, 50),
+         ('g', '<=', None, 150), ('b', '>=', None, 50), ('b', '<=', None, 150)]
+    ])
+]
+
+COLOR_FAMILIES = tuple(name for name, _ in COLOR_FAMILY_RULES)
+DEFAULT_RGB = [0, 0, 0]
+
+# Propriétés d'image et leur valeur par défaut quand elles sont absentes
+PROPERTY_DEFAULTS = {
+    'brightness': 128,
+    'contrast': 50,
+    'aspect_ratio': 1.0,
+    'sharpness': 0
+}
+
+# Règles par catégorie, dans l'ordre de priorité en cas d'égalité de score
+CATEGORY_RULES = [
+    # Électronique - objets sombres, couleurs métalliques
+    ('electronics', 0.7, [
+        [('brightness', '<', None, 100)],
+        [('has_metallic_colors', '>', None, 0)]
+    ]),
+    # Livres - forme rectangulaire, couleurs neutres
+    ('books', 0.8, [
+        [('aspect_ratio', '>=', None, 0.6), ('aspect_ratio', '<=', None, 1.4),
+         ('has_neutral_colors', '>', None, 0)]
+    ]),
+    # Vêtements - fort contraste, couleurs vives
+    ('clothing', 0.7, [
+        [('contrast', '>', None, 60), ('has_vibrant_colors', '>', None, 0)]
+    ]),
+    # Meubles - forme carrée/rectangulaire, couleurs bois
+    ('furniture', 0.8, [
+        [('aspect_ratio', '>=', None, 0.7), ('aspect_ratio', '<=', None, 1.3),
+         ('has_wood_colors', '>', None, 0)]
+    ]),
+    # Jouets - couleurs vives, formes variées
+    ('toys', 0.6, [
+        [('has_bright_colors', '>', None, 0), ('sharpness', '>', None, 0.05)]
+    ]),
+    # Sports - couleurs vives, contraste élevé
+    ('sports', 0.7, [
+        [('contrast', '>', None, 80), ('has_sport_colors', '>', None, 0)]
+    ]),
+    # Beauté - couleurs pastel ou vives, forme compacte
+    ('beauty', 0.6, [
+        [('has_beauty_colors', '>', None, 0), ('aspect_ratio', '<', None, 2)]
+    ]),
+    # Maison - couleurs neutres, forme variée
+    ('home', 0.6, [
+        [('has_home_colors', '>', None, 0)]
+    ])
+]
+
+# Règles de repli (première clause vérifiée) quand aucune catégorie n'atteint MIN_SCORE
+MIN_SCORE = 0.5
+FALLBACK_SCORE = 0.5
+FALLBACK_RULES = [
+    ('electronics', [[('brightness', '<', None, 120)]]),
+    ('books', [[('aspect_ratio', '>', None, 1.5)], [('aspect_ratio', '<', None, 0.7)]]),
+    ('clothing', [[('contrast', '>', None, 40)]])
+]
+FALLBACK_DEFAULT = 'home'
+
+
+class RuleSet:
+    """Table de règles compilée : un petit nombre d'opérations NumPy pour tout un lot
+
+    Les contraintes distinctes (atomes) sont regroupées par opérateur et évaluées une
+    seule fois ; une clause est vérifiée quand tous ses atomes le sont (produit par la
+    matrice d'appartenance), une règle quand l'une de ses clauses l'est.
+    """
+
+    def __init__(self, rules, feature_names):
+        self.feature_names = tuple(feature_names)
+        index = {name: column for column, name in enumerate(self.feature_names)}
+        constant = len(self.feature_names)  # colonne de zéros pour les seuils constants
+
+        atoms = {}
+        clauses, clause_rules = [], []
+        for rule_index, rule in enumerate(rules):
+            for clause in rule:
+                clause_atoms = []
+                for left, op, right, offset in clause:
+                    atom = (op, index[left], constant if right is None else index[right], float(offset))
+                    clause_atoms.append(atoms.setdefault(atom, atom))
+                clauses.append(clause_atoms)
+                clause_rules.append(rule_index)
+
+        ordered = sorted(atoms, key=lambda atom: list(OPERATORS).index(atom[0]))
+        position = {atom: i for i, atom in enumerate(ordered)}
+        self._lhs = np.array([atom[1] for atom in ordered], dtype=np.intp)
+        self._rhs = np.array([atom[2] for atom in ordered], dtype=np.intp)
+        self._offsets = np.array([atom[3] for atom in ordered])[:, None]
+        self._groups = []
+        for op, compare in OPERATORS.items():
+            indexes = [i for i, atom in enumerate(ordered) if atom[0] == op]
+            if indexes:
+                self._groups.append((compare, slice(indexes[0], indexes[-1] + 1)))
+
+        self._clause_atoms = np.zeros((len(clauses), len(ordered)))
+        for clause_index, clause_atoms in enumerate(clauses):
+            for atom in clause_atoms:
+                self._clause_atoms[clause_index, position[atom]] += 1
+        self._clause_sizes = self._clause_atoms.sum(axis=1)[:, None]
+        self._rule_clauses = np.zeros((len(rules), len(clauses)))
+        self._rule_clauses[clause_rules, np.arange(len(clauses))] = 1
+
+    def evaluate(self, features):
+        """Masque (n x règles) pour une matrice de caractéristiques (n x feature_names)"""
+        values = np.zeros((len(self.feature_names) + 1, len(features)))
+        values[:-1] = np.asarray(features, dtype=np.float64).T
+        left = values[self._lhs]
+        right = values[self._rhs] + self._offsets
+
+        satisfied = np.empty(left.shape)
+        for compare, rows in self._groups:
+            satisfied[rows] = compare(left[rows], right[rows])
+
+        clauses = (self._clause_atoms @ satisfied) == self._clause_sizes
+        return (self._rule_clauses @ clauses > 0).T
+
+
+COLOR_FAMILY_RULESET = RuleSet([rule for _, rule in COLOR_FAMILY_RULES], COLOR_FEATURES)
+CATEGORY_FEATURES = tuple(PROPERTY_DEFAULTS) + COLOR_FAMILIES
+CATEGORY_RULESET = RuleSet([rule for _, _, rule in CATEGORY_RULES], CATEGORY_FEATURES)
+FALLBACK_RULESET = RuleSet([rule for _, rule in FALLBACK_RULES], CATEGORY_FEATURES)
+
+CATEGORY_NAMES = np.array([category for category, _, _ in CATEGORY_RULES], dtype=object)
+CATEGORY_SCORES = np.array([score for _, score, _ in CATEGORY_RULES], dtype=np.float64)
+FALLBACK_NAMES = np.array([category for category, _ in FALLBACK_RULES], dtype=object)
+
+
+def color_family_masks(colors, owners, count):
+    """Indicateurs de familles de couleurs (count x familles) pour un lot de palettes
+
+    colors : couleurs RGB de toutes les palettes (n x 3), owners : palette de chaque couleur.
+    """
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    features = np.column_stack([colors, colors.max(axis=1), colors.min(axis=1)])
+
+    masks = np.zeros((count, len(COLOR_FAMILY_RULES)), dtype=bool)
+    matched_colors, families = np.nonzero(COLOR_FAMILY_RULESET.evaluate(features))
+    masks[owners[matched_colors], families] = True
+    return masks
+
+
+def category_scores(properties, family_masks):
+    """Meilleure catégorie et score pour un lot d'images
+
+    properties : matrice (n x PROPERTY_DEFAULTS), family_masks : sortie de color_family_masks.
+    """
+    features = np.column_stack([np.asarray(properties, dtype=np.float64).reshape(-1, len(PROPERTY_DEFAULTS)),
+                                family_masks])
+    count = len(features)
+
+    scores = np.where(CATEGORY_RULESET.evaluate(features), CATEGORY_SCORES, -np.inf)
+    # argmax retient la première catégorie à score égal, comme l'ordre d'insertion
+    best = scores.argmax(axis=1)
+    best_score = scores[np.arange(count), best]
+    categories = CATEGORY_NAMES[best]
+
+    # Repli : première règle vérifiée, sinon FALLBACK_DEFAULT
+    fallback = best_score < MIN_SCORE
+    if fallback.any():
+        matched = FALLBACK_RULESET.evaluate(features)
+        fallback_categories = np.where(matched.any(axis=1), FALLBACK_NAMES[matched.argmax(axis=1)], FALLBACK_DEFAULT)
+        categories = np.where(fallback, fallback_categories, categories)
+        best_score = np.where(fallback, FALLBACK_SCORE, best_score)
+
+    return categories, best_score
+
+
+def analyze_palettes(palettes):
+    """Indicateurs de familles de couleurs pour une liste de palettes [{'rgb': ...}]"""
+    colors, owners = flatten_palettes(palettes)
+    masks = color_family_masks(colors, owners, len(palettes))
+    return [
+        {name: bool(flag) for name, flag in zip(COLOR_FAMILIES, row)} if palette else {}
+        for palette, row in zip(palettes, masks)
+    ]
+
+
+def classify_properties(analyses):
+    """Catégorie et confiance pour une liste de résultats d'analyse d'image"""
+    results = [{'category': 'other', 'confidence': 0.5} for _ in analyses]
+    indexes = [i for i, analysis in enumerate(analyses) if analysis]
+    if not indexes:
+        return results
+
+    present = [analyses[i] for i in indexes]
+    properties = [
+        [analysis.get(name, default) for name, default in PROPERTY_DEFAULTS.items()]
+        for analysis in present
+    ]
+    colors, owners = flatten_palettes([analysis.get('dominant_colors', []) for analysis in present])
+    masks = color_family_masks(colors, owners, len(present))
+
+    categories, scores = category_scores(properties, masks)
+    for i, category, score in zip(indexes, categories, scores):
+        results[i] = {'category': str(category), 'confidence': float(score)}
+    return results
+
+
+def flatten_palettes(palettes):
+    """Couleurs de toutes les palettes (liste de RGB) et indice de la palette de chaque couleur"""
+    colors = [color_data.get('rgb', DEFAULT_RGB) for palette in palettes for color_data in palette]
+    owners = np.repeat(np.arange(len(palettes)), [len(palette) for palette in palettes])
+    return colors, owners
@@ -0,0 +1,35 @@
+"""
+Lancement du service IA selon le serveur choisi dans config.py (SERVER)
+"""
+
+import os
+
+
+def run_production_server(app):
+    """Démarrer gunicorn en interne avec les réglages de gunicorn.conf.py"""
+    from gunicorn.app.base import Application
+
+    class ProductionServer(Application):
+        def init(self, parser, opts, args):
+            return None
+
+        def load_config(self):
+            config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+            self.load_config_from_file(config_path)
+
+        def load(self):
+            return app
+
+    ProductionServer().run()
+
+
+def run_server(app):
+    """Démarrer le serveur configuré : gunicorn en production, aiohttp en mode asynchrone,
+    Werkzeug en développement"""
+    if app.config['SERVER'] == 'gunicorn':
+        run_production_server(app)
+    elif app.config['SERVER'] == 'aiohttp':
+        import async_app
+        async_app.run(app.config['PORT'])
+    else:
+        app.run(host='0.0.0.0', port=app.config['PORT'], debug=app.config['DEBUG'])
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Définir l'environnement de test avant que les modules de test n'importent l'app
+os.environ['FLASK_ENV'] = 'testing'
+
+# Ajouter le répertoire parent au path pour importer l'app et les modules du service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
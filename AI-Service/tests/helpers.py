@@ -0,0 +1,48 @@
+"""
+Images synthétiques partagées par les tests
+"""
+
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+
+def make_image(width=320, height=240, seed=0):
+    """Image synthétique déterministe (dégradé + bruit)"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([
+        np.broadcast_to(x, (height, width)),
+        np.broadcast_to(y, (height, width)),
+        rng.uniform(0, 255, (height, width))
+    ], axis=-1)
+    return Image.fromarray(pixels.astype(np.uint8), 'RGB')
+
+
+def png_bytes(width=320, height=240, seed=0):
+    buffer = io.BytesIO()
+    make_image(width, height, seed).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_data_url(image, fmt='JPEG'):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    mime = 'jpeg' if fmt == 'JPEG' else fmt.lower()
+    return f"data:image/{mime};base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def make_photo(seed):
+    """Photo synthétique : grandes plages de couleur lissées, comme un objet sur un fond"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.uniform(0, 255, (6, 8, 3)).astype(np.uint8)
+    return Image.fromarray(blocks).resize((320, 240), Image.BICUBIC)
+
+
+def encode(image, fmt='PNG', **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
@@ -1,21 +1,8 @@
-import pytest
 import sys
 import os
 
-# Définir l'environnement de test avant d'importer l'app
-os.environ['FLASK_ENV'] = 'testing'
-
-# Ajouter le répertoire parent au path pour importer l'app
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from app import app
 
-@pytest.fixture
-def client():
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client
-
 def test_health_endpoint(client):
     """Test que l'endpoint de santé fonctionne"""
     response = client.get('/health')
@@ -35,3 +22,177 @@ def test_classify_food_endpoint(client):
     response = client.post('/classify-food')
     # Devrait retourner 400 car pas d'image fournie, mais l'endpoint existe
     assert response.status_code == 400
+
+def test_classify_food_with_unreadable_data_url_falls_back(client):
+    """Une data URL sans virgule ou au base64 invalide donne la classification de secours"""
+    for image_url in ('data:image/png;base64', 'data:image/png;base64,abc'):
+        response = client.post('/classify-food', json={'image_url': image_url})
+        assert response.status_code == 200
+        assert 'food_type' in response.get_json()
+
+def test_classify_object_batch_endpoint(client):
+    """Le lot renvoie un résultat ou une erreur par image, dans l'ordre"""
+    from tests.helpers import make_data_url, make_image
+
+    images = [make_data_url(make_image(seed=1)), 42, make_data_url(make_image(seed=2), 'PNG')]
+    response = client.post('/classify-object/batch', json={'images': images})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 3
+    assert [item['index'] for item in data['results']] == [0, 1, 2]
+    assert [item['success'] for item in data['results']] == [True, False, True]
+    assert 'category' in data['results'][2]['result']
+
+def test_classify_food_batch_endpoint_multipart(client):
+    """Le lot accepte des fichiers multipart"""
+    import io
+    from tests.helpers import make_image
+
+    files = []
+    for name in ('apple.jpg', 'bread.jpg'):
+        buffer = io.BytesIO()
+        make_image().save(buffer, format='JPEG')
+        buffer.seek(0)
+        files.append((buffer, name))
+
+    response = client.post('/classify-food/batch', data={'images': files},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [item['result']['food_type'] for item in results] == ['fruits', 'bakery']
+
+def test_classify_batch_rejects_empty_and_oversized(client):
+    """Un lot vide ou trop grand est refusé"""
+    assert client.post('/classify-object/batch', json={'images': []}).status_code == 400
+    too_many = ['https://example.com/chair.jpg'] * (app.config['BATCH_MAX_ITEMS'] + 1)
+    assert client.post('/classify-object/batch', json={'images': too_many}).status_code == 400
+
+def test_classify_object_raw_image_body(client):
+    """Le corps brut image/* est classifié sans passer par base64"""
+    import io
+    from tests.helpers import make_image
+
+    buffer = io.BytesIO()
+    make_image(seed=3).save(buffer, format='JPEG')
+    response = client.post('/classify-object?filename=chair.jpg', data=buffer.getvalue(),
+                           content_type='image/jpeg')
+    assert response.status_code == 200
+    assert response.get_json()['image_analysis']['dimensions'] == {'width': 320, 'height': 240}
+
+def test_classify_object_multipart_upload(client):
+    """Un fichier multipart 'image' est classifié"""
+    import io
+    from tests.helpers import make_image
+
+    buffer = io.BytesIO()
+    make_image(seed=4).save(buffer, format='PNG')
+    buffer.seek(0)
+    response = client.post('/classify-object', data={'image': (buffer, 'lamp.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert 'category' in response.get_json()
+
+def test_raw_image_body_over_limit_is_rejected(client, monkeypatch):
+    """Un corps brut plus grand que MAX_IMAGE_SIZE est refusé avec 413"""
+    monkeypatch.setitem(app.config, 'MAX_IMAGE_BYTES', 1024)
+    response = client.post('/classify-food', data=b'\xff' * 2048, content_type='image/jpeg')
+    assert response.status_code == 413
+
+def test_classify_object_returns_503_when_pool_is_saturated(client, monkeypatch):
+    """Une file d'analyse pleine renvoie 503 avec Retry-After"""
+    import app as ai_app
+    from worker_pool import PoolSaturatedError
+
+    def saturated(image_data, image_bytes, key):
+        raise PoolSaturatedError(retry_after=2)
+
+    ai_app.result_cache.clear()
+    monkeypatch.setattr(ai_app, 'run_object_analysis', saturated)
+    response = client.post('/classify-object?filename=x.jpg', data=b'not-an-image',
+                           content_type='image/jpeg')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
+
+def test_classify_object_through_process_pool(client, monkeypatch):
+    """Avec le pool activé, l'analyse s'exécute dans un processus du pool"""
+    import io
+    import app as ai_app
+    from worker_pool import AnalysisPool
+    from tests.helpers import make_image
+
+    pool = AnalysisPool(size=1, queue_depth=1, initializer=ai_app.initialize_analysis_worker)
+    monkeypatch.setattr(ai_app, 'analysis_pool', pool)
+    ai_app.result_cache.clear()
+    try:
+        buffer = io.BytesIO()
+        make_image(seed=5).save(buffer, format='PNG')
+        buffer.seek(0)
+        response = client.post('/classify-object', data={'image': (buffer, 'desk.png')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.get_json()['image_analysis']['dimensions'] == {'width': 320, 'height': 240}
+    finally:
+        pool.shutdown()
+
+def test_run_server_uses_configured_debug_flag(monkeypatch):
+    """Le serveur de développement n'active plus le mode debug sans configuration"""
+    from server import run_server
+
+    calls = []
+    monkeypatch.setitem(app.config, 'SERVER', 'development')
+    monkeypatch.setitem(app.config, 'DEBUG', False)
+    monkeypatch.setattr(app, 'run', lambda **kwargs: calls.append(kwargs))
+    run_server(app)
+    assert calls == [{'host': '0.0.0.0', 'port': app.config['PORT'], 'debug': False}]
+
+def test_request_body_is_limited_by_max_content_length(client, monkeypatch):
+    """Les requêtes plus grandes que MAX_CONTENT_LENGTH sont refusées avec 413, les lots ont leur propre limite"""
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+    monkeypatch.setitem(app.config, 'BATCH_MAX_CONTENT_LENGTH', 8192)
+    response = client.post('/classify-object', json={'image_url': 'x' * 4096})
+    assert response.status_code == 413
+    assert response.get_json() == {'error': 'Requête trop volumineuse'}
+    assert client.post('/classify-object/batch', json={'images': ['x' * 4096]}).status_code == 200
+    assert client.post('/classify-object/batch', json={'images': ['x' * 16384]}).status_code == 413
+
+def test_decoded_image_is_limited_by_max_image_size(client, monkeypatch):
+    """Une data URL JSON dont l'image décodée dépasse MAX_IMAGE_SIZE est refusée"""
+    import base64
+    import app as ai_app
+
+    ai_app.result_cache.clear()
+    monkeypatch.setitem(app.config, 'MAX_IMAGE_BYTES', 1024)
+    image_url = 'data:image/png;base64,' + base64.b64encode(b'\x00' * 2048).decode()
+    for route in ('/classify-object', '/predict_object', '/classify-food', '/predict_food'):
+        assert client.post(route, json={'image_url': image_url}).status_code == 413
+    results = client.post('/classify-food/batch', json={'images': [image_url]}).get_json()['results']
+    assert results == [{'index': 0, 'success': False, 'error': 'Image trop volumineuse'}]
+
+def test_local_file_paths_are_not_read(client, tmp_path):
+    """Un chemin de fichier du serveur passé en image_url n'est jamais ouvert"""
+    import app as ai_app
+    from tests.helpers import make_image
+
+    path = tmp_path / 'photo.png'
+    make_image(seed=6).save(path)
+    ai_app.result_cache.clear()
+    result = client.post('/classify-object', json={'image_url': str(path)}).get_json()
+    assert result['image_analysis'] == {}
+    assert client.post('/dedupe', json={'image_url': str(path)}).status_code == 400
+    assert client.post('/dedupe', json={'image_url': '/dev/zero'}).status_code == 400
+
+def test_running_app_py_serves_the_imported_module():
+    """python app.py : les hooks gunicorn et async_app retrouvent le module servi, non rechargé"""
+    import subprocess
+
+    service_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ("import runpy, server\n"
+              "served = []\n"
+              "server.run_server = served.append\n"
+              "runpy.run_path('app.py', run_name='__main__')\n"
+              "from app import app, warm_up\n"
+              "import async_app\n"
+              "print(app is served[0], warm_up.__module__, async_app.service.app is app)")
+    completed = subprocess.run([sys.executable, '-c', script], cwd=service_dir, capture_output=True,
+                               text=True, check=True, env=dict(os.environ, FLASK_ENV='testing'))
+    assert completed.stdout.split() == ['True', '__main__', 'True']
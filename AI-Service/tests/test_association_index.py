@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+import app as ai_app
+from association_index import AssociationIndex, AssociationSnapshot, read_export
+
+TUNIS = (36.8065, 10.1815)
+
+
+def association(identifier, lat, lng, accepted, needs=(), **fields):
+    return dict({
+        '_id': {'$oid': identifier},
+        'name': f'Association {identifier}',
+        'type': 'charity',
+        'status': 'active',
+        'address': {'city': 'Tunis', 'coordinates': {'lat': lat, 'lng': lng}},
+        'acceptedCategories': list(accepted),
+        'needs': [{'category': category, 'priority': priority} for category, priority in needs]
+    }, **fields)
+
+
+def documents():
+    return [
+        association('proche', 36.81, 10.19, ['clothing']),
+        association('urgente', 36.815, 10.195, ['clothing'], [('clothing', 'urgent')]),
+        association('tout', 36.80, 10.17, ['other']),
+        association('banque', 36.82, 10.18, ['food'], type='food_bank'),
+        association('loin', 34.7406, 10.7603, ['clothing', 'food']),
+        association('inactive', 36.8065, 10.1815, ['clothing'], status='pending'),
+        association('sans-position', 0, 0, ['clothing'], address={'city': 'Tunis'})
+    ]
+
+
+def test_snapshot_ranks_by_distance_and_priority():
+    snapshot = AssociationSnapshot(documents())
+    assert len(snapshot) == 5
+    ranked = snapshot.recommend('clothing', *TUNIS, limit=10)
+    ids = [item['id'] for item, _, _ in ranked]
+    # Besoin urgent à ~1.5 km devant une association à ~1 km, 'other' en dernier ; Sfax hors du rayon
+    assert ids == ['urgente', 'proche', 'tout']
+    assert [priority for _, _, priority in ranked] == [5, 3, 2]
+    assert ranked[1][1] == pytest.approx(0.83, abs=0.05)
+
+    food = snapshot.recommend('food', *TUNIS, limit=10, max_km=300)
+    assert [(item['id'], priority) for item, _, priority in food] == [('banque', 4), ('tout', 2), ('loin', 3)]
+    assert food[0][0]['is_food_bank'] and 220 < food[2][1] < 240
+    assert snapshot.recommend('toys', *TUNIS)[0][0]['id'] == 'tout'
+
+
+def test_read_export_formats_and_shared_file(tmp_path):
+    lines = '\n'.join(json.dumps(document) for document in documents())
+    assert read_export(lines) == documents() == read_export(json.dumps({'associations': documents()}))
+    assert read_export('') == []
+
+    path = str(tmp_path / 'associations.json')
+    writer, reader = AssociationIndex(path), AssociationIndex(path)
+    assert reader.snapshot() is None
+    writer.refresh(documents())
+    assert len(reader.snapshot()) == 5
+
+    writer.refresh(documents()[:2])
+    # Un autre worker voit la nouvelle version à sa requête suivante
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert len(reader.snapshot()) == 2
+    assert reader.stats()['persistent'] and reader.stats()['categories']['clothing'] == 2
+
+
+def test_recommend_associations_endpoint(client, monkeypatch):
+    monkeypatch.setattr(ai_app, 'association_index', AssociationIndex())
+    request = {'category': 'clothing', 'location': {'lat': TUNIS[0], 'lng': TUNIS[1]}}
+    assert client.post('/recommend-associations', json=request).status_code == 503
+
+    response = client.post('/associations/refresh', data='\n'.join(json.dumps(d) for d in documents()),
+                           content_type='application/x-ndjson')
+    assert response.get_json()['loaded'] == 5
+
+    data = client.post('/recommend-associations', json=request).get_json()
+    assert data['success'] and data['category'] == 'clothing' and data['lookup_ms'] >= 0
+    first = data['associations'][0]
+    assert first['association_id'] == 'urgente' and first['priority'] == 5
+    assert 'priorité urgente' in first['reason']
+
+    # Catégories de /classify-food et /classify-object ramenées aux valeurs de acceptedCategories
+    data = client.post('/recommend-associations', json=dict(request, category='fruits', limit=1)).get_json()
+    assert data['category'] == 'food' and data['associations'][0]['is_food_bank']
+    assert client.post('/recommend-associations', json=dict(request, category='sports')).get_json()['category'] == 'other'
+
+    assert client.post('/recommend-associations', json={'category': 'food'}).status_code == 400
+    assert client.post('/recommend-associations', json=dict(request, location={'lat': 95, 'lng': 0})).status_code == 400
+    assert client.post('/recommend-associations', json=dict(request, category=5)).status_code == 400
+    assert client.post('/associations/refresh', data='{pas du json', content_type='application/json').status_code == 400
+    assert client.post('/associations/refresh', json=['x']).status_code == 400
+    for limit in (-3, 0, 51):
+        assert client.post('/recommend-associations', json=dict(request, limit=limit)).status_code == 400
+
+    # Documents malformés refusés sans remplacer les associations chargées
+    for fields in ({'needs': ['clothing']}, {'acceptedCategories': 'clothing'}, {'address': 'Tunis'},
+                   {'needs': [{'category': 'clothing', 'priority': ['urgent']}]},
+                   {'capacity': {'maxItemsPerDay': '10', 'currentItems': 3}}):
+        response = client.post('/associations/refresh', json=[dict(association('x', *TUNIS, ['clothing']), **fields)])
+        assert response.status_code == 400 and 'Association 0 invalide' in response.get_json()['error']
+    assert len(ai_app.association_index.snapshot()) == 5
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('aiohttp')
+from aiohttp.test_utils import TestClient, TestServer
+
+import app as service
+from async_app import create_app
+from tests.helpers import png_bytes
+
+FETCH_DELAY = 0.5
+
+
+class SlowImageHandler(BaseHTTPRequestHandler):
+    """CDN local lent : chaque image met FETCH_DELAY secondes à arriver"""
+
+    def do_GET(self):
+        if not self.path.startswith('/chair-'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        time.sleep(FETCH_DELAY)
+        body = png_bytes(64, 48, seed=int(self.path.split('-')[1].split('.')[0]))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def run_with_client(scenario):
+    async def main():
+        async with TestClient(TestServer(create_app())) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_concurrent_url_classifications_overlap(slow_server):
+    """Les téléchargements lents sont attendus simultanément, pas l'un après l'autre"""
+    service.result_cache.clear()
+    count = 8
+
+    async def scenario(client):
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post('/predict_object', json={'image_url': f'{slow_server}/chair-{i}.png'})
+            for i in range(count)
+        ])
+        elapsed = time.perf_counter() - start
+        return [(r.status, await r.json()) for r in responses], elapsed
+
+    results, elapsed = run_with_client(scenario)
+    assert all(status == 200 for status, _ in results)
+    assert all(body['image_analysis']['dimensions'] == {'width': 64, 'height': 48}
+               for _, body in results)
+    assert elapsed < count * FETCH_DELAY / 2
+
+
+def test_async_routes_handle_raw_body_and_errors(slow_server):
+    """Corps brut image/*, URL manquante et image inaccessible"""
+    async def scenario(client):
+        raw = await client.post('/classify-object?filename=chaise.png', data=png_bytes(64, 48, seed=1),
+                                headers={'Content-Type': 'image/png'})
+        missing = await client.post('/predict_object', json={})
+        unreachable = await client.post('/predict_object', json={'image_url': f'{slow_server}/absent.png'})
+        food = await client.post('/predict_food', json={'image_url': 'pomme.jpg'})
+        return (raw.status, await raw.json()), missing.status, await unreachable.json(), food.status
+
+    (raw_status, raw_body), missing_status, unreachable_body, food_status = run_with_client(scenario)
+    assert raw_status == 200
+    assert 'image_analysis' in raw_body
+    assert missing_status == 400
+    assert unreachable_body['image_analysis'] == {}
+    assert food_status == 200
@@ -0,0 +1,28 @@
+from benchmarks.bench_suite import compare_results, run_suite
+from benchmarks.corpus import build_corpus
+
+
+def test_corpus_is_deterministic_and_varied():
+    corpus = build_corpus(seed=3, quick=True)
+    assert [item.data for item in corpus] == [item.data for item in build_corpus(seed=3, quick=True)]
+    assert {item.format for item in corpus} == {'JPEG', 'PNG', 'WEBP'}
+    assert len({item.content for item in corpus}) == 5
+    assert len({(item.width, item.height) for item in corpus}) == 2
+
+
+def test_regressions_beyond_threshold_are_reported():
+    baseline = {'stage:decode': 10.0, 'stage:serialization': 0.01, 'route:GET /health': 1.0}
+    results = {'stage:decode': 12.5, 'stage:serialization': 0.03, 'route:GET /health': 1.1, 'new': 5.0}
+
+    # +25 % sur decode ; +200 % sur serialization mais sous le seuil absolu de 0,05 ms
+    assert compare_results(results, baseline, threshold=20) == [('stage:decode', 10.0, 12.5)]
+    assert compare_results(results, baseline, threshold=30) == []
+
+
+def test_suite_runs_offline_on_each_stage():
+    corpus = build_corpus(quick=True)[:2]
+    results = run_suite(corpus, repeat=1, name_filter='stage:')
+    assert {'stage:decode', 'stage:analyze_image_properties', 'stage:get_dominant_colors',
+            'stage:extract_visual_features', 'stage:detect_object_condition',
+            'stage:calculate_quality_score', 'stage:serialization'} <= set(results)
+    assert all(value > 0 for value in results.values())
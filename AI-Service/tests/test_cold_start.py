@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['cv2', 'PIL', 'scipy', 'sklearn', 'requests']
+
+
+def loaded_modules(code):
+    """Modules lourds présents dans sys.modules après code, dans un interpréteur neuf"""
+    script = f'import sys\n{code}\nprint(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    completed = subprocess.run([sys.executable, '-c', script], cwd=SERVICE_DIR, capture_output=True,
+                               text=True, check=True, env=dict(os.environ, FLASK_ENV='testing'))
+    return [name for name in completed.stdout.strip().split(',') if name]
+
+
+def test_health_is_served_without_heavy_modules():
+    assert loaded_modules("import app\nassert app.app.test_client().get('/health').status_code == 200") == []
+    recipes = "app.app.test_client().post('/generate-recipes', json={'ingredients': ['pommes']})"
+    assert loaded_modules(f"import app\n{recipes}") == []
+
+
+def test_warm_up_loads_every_heavy_module():
+    assert loaded_modules('import app\napp.warm_up()') == HEAVY_MODULES
@@ -0,0 +1,37 @@
+import app as ai_app
+from diy_catalog import DiyCatalog
+
+
+def test_condition_overlay_shares_catalog_lists():
+    """L'état de l'objet ajoute des conseils sans recopier ni modifier le catalogue"""
+    catalog = DiyCatalog()
+    base = catalog.projects('clothing', 'good')
+    poor = catalog.projects('clothing', 'poor')
+
+    assert [project['difficulty'] for project in poor] == ['easy', 'easy']
+    assert poor[0]['tips'][:len(base[0]['tips'])] == base[0]['tips']
+    assert poor[0]['tips'][-1] == 'Nettoyez soigneusement avant de commencer'
+    assert poor[0]['steps'] is base[0]['steps']
+    assert catalog.projects('clothing', 'poor') is poor
+    assert 'Nettoyez soigneusement avant de commencer' not in base[0]['tips']
+
+
+def test_difficulty_filter_and_default_projects():
+    catalog = DiyCatalog()
+    assert [p['title'] for p in catalog.projects('electronics', 'good', 'hard')] == ['Lampe de bureau LED']
+    assert [p['title'] for p in catalog.projects('inconnue', 'good')] == ['Projet créatif général']
+
+
+def test_generate_diy_route_alias_and_renaming(client):
+    """La route /generate-diy appelée par le backend renvoie les projets adaptés"""
+    response = client.post('/generate-diy', json={
+        'category': 'electronics', 'object_name': 'Table de chevet', 'condition': 'excellent'
+    })
+    assert response.status_code == 200
+    projects = response.get_json()['diy_projects']
+    assert [p['title'] for p in projects] == ['Transformation de Table de chevet'] * 2
+    assert all(isinstance(p['tips'], list) for p in projects)
+    assert ai_app.diy_catalog.projects('electronics', 'excellent')[0]['title'] == 'Station de charge multi-appareils'
+
+    for invalid in ({'difficulty': ['facile']}, {'difficulty': {'niveau': 1}}, {'condition': ['good']}):
+        assert client.post('/generate-diy', json=dict({'category': 'furniture'}, **invalid)).status_code == 400
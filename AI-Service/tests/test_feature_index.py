@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+import app as ai_app
+from feature_index import FEATURE_DIM, PALETTE_BINS, VectorIndex, feature_vector
+from tests.helpers import encode, make_photo
+
+
+def analysis(palette, **properties):
+    return dict({
+        'dominant_colors': [{'rgb': rgb, 'frequency': frequency} for rgb, frequency in palette],
+        'brightness': 120.0, 'contrast': 50.0, 'sharpness': 12.0, 'aspect_ratio': 4 / 3,
+        'analysis_dimensions': {'width': 320, 'height': 240},
+        'shape_features': {'area': 20000.0, 'vertices': 4, 'circularity': 0.7, 'contour_count': 12}
+    }, **properties)
+
+
+def clustered_vectors(count, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.random((clusters, FEATURE_DIM), dtype=np.float32)
+    return (centers[rng.integers(0, clusters, count)]
+            + rng.normal(0, 0.05, (count, FEATURE_DIM))).astype(np.float32)
+
+
+def exact_neighbors(vectors, query, k):
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    return [f'item-{i}' for i in np.lexsort((np.arange(len(vectors)), distances))[:k]]
+
+
+def test_feature_vector_is_fixed_width_and_smooth():
+    palette = [([200, 30, 30], 600), ([20, 20, 20], 300), ([240, 240, 240], 100)]
+    vector = feature_vector(analysis(palette))
+    assert vector.dtype == np.float32 and vector.shape == (FEATURE_DIM,)
+    assert np.linalg.norm(vector[:PALETTE_BINS]) == pytest.approx(1.0, abs=1e-5)
+    assert np.array_equal(vector, feature_vector(analysis(palette[::-1])))
+
+    # Couleurs légèrement décalées : vecteur proche (pas de saut de case), autre palette : éloigné
+    shifted = feature_vector(analysis([([205, 34, 28], 600), ([24, 18, 22], 300), ([236, 240, 244], 100)]))
+    other = feature_vector(analysis([([30, 90, 200], 700), ([250, 220, 40], 300)]))
+    assert np.linalg.norm(vector - shifted) < 0.1 < np.linalg.norm(vector - other)
+    assert feature_vector({}).shape == (FEATURE_DIM,)
+
+
+def test_lookup_finds_nearest_neighbors():
+    vectors = clustered_vectors(6000)
+    index = VectorIndex(nprobe=4, background=False)
+    for position, vector in enumerate(vectors[:5000]):
+        index.add(vector, f'item-{position}')
+    index.lookup(vectors[0])
+    stats = index.stats()
+    assert stats['indexed'] == 5000 and stats['lists'] == int(np.sqrt(5000))
+    # Ajouts récents comparés directement
+    for position, vector in enumerate(vectors[5000:], start=5000):
+        index.add(vector, f'item-{position}')
+
+    queries = vectors[::250] + 0.01
+    recall = np.mean([
+        len(set(exact_neighbors(vectors, query, 10)) & {item for item, _ in index.lookup(query, 10)}) / 10
+        for query in queries
+    ])
+    assert recall >= 0.9
+    # Toutes les listes parcourues : résultat exact
+    for query in queries[:5]:
+        found = index.lookup(query, 10, nprobe=stats['lists'])
+        assert [item for item, _ in found] == exact_neighbors(vectors, query, 10)
+    assert index.lookup(vectors[5500], 1)[0] == ('item-5500', pytest.approx(0.0, abs=1e-3))
+
+
+def test_persistent_index_reuses_saved_lists(tmp_path):
+    path = str(tmp_path / 'vectors.bin')
+    vectors = clustered_vectors(2000)
+    index = VectorIndex(path, background=False)
+    for position, vector in enumerate(vectors):
+        index.add(vector, f'item-{position}')
+    index.rebuild()
+    assert os.path.exists(index.lists_path)
+
+    reopened = VectorIndex(path, background=False)
+    assert len(reopened) == 2000 and reopened.stats()['indexed'] == 0
+    query = vectors[7] + 0.01
+    assert reopened.lookup(query, 5) == index.lookup(query, 5)
+    assert reopened.stats()['indexed'] == 2000
+    assert np.array_equal(reopened.vector_for('item-7'), vectors[7])
+    assert reopened.vector_for('inconnu') is None
+
+    with pytest.raises(ValueError):
+        reopened.add(vectors[0], 'é' * 13)
+    reopened.add(vectors[0], 'é' * 12)
+    assert 'é' * 12 in [item_id for item_id, _ in VectorIndex(path, background=False).lookup(vectors[0], 2)]
+    assert reopened.vector_for('é' * 13) is None
+
+
+def test_similar_objects_endpoint(client, monkeypatch):
+    monkeypatch.setattr(ai_app, 'similar_index', VectorIndex(background=False))
+    ai_app.result_cache.clear()
+    for seed in range(1, 5):
+        response = client.post(f'/similar-objects?filename=objet-{seed}.png&item_id=annonce-{seed}&add=1',
+                               data=encode(make_photo(seed)), content_type='image/png')
+        assert response.status_code == 200
+    assert len(ai_app.similar_index) == 4
+
+    response = client.post('/similar-objects?filename=objet.jpg&k=2', data=encode(make_photo(1), 'JPEG', quality=80),
+                           content_type='image/jpeg')
+    data = response.get_json()
+    assert data['category'] and data['lookup_ms'] >= 0
+    assert [item['item_id'] for item in data['similar']][0] == 'annonce-1' and len(data['similar']) == 2
+
+    response = client.post('/similar-objects', json={'item_id': 'annonce-2', 'k': 10})
+    similar = [item['item_id'] for item in response.get_json()['similar']]
+    assert sorted(similar) == ['annonce-1', 'annonce-3', 'annonce-4']
+
+    assert client.post('/similar-objects', json={'item_id': 'inconnue'}).status_code == 404
+    assert client.post('/similar-objects', json={}).status_code == 400
+    assert client.post('/similar-objects', json={'item_id': 'é' * 13}).status_code == 400
+    for k in (-3, 0, 2.5, 'deux', [1]):
+        assert client.post('/similar-objects', json={'item_id': 'annonce-2', 'k': k}).status_code == 400
+    assert client.post('/similar-objects?add=1', data=encode(make_photo(5)),
+                       content_type='image/png').status_code == 400
@@ -0,0 +1,63 @@
+import app as ai_app
+from tests.helpers import make_data_url, make_image
+
+
+def test_stages_match_with_shared_context():
+    """Les étapes donnent le même résultat avec ou sans contexte partagé"""
+    image = make_image()
+    context = ai_app.create_analysis_context(image)
+
+    with_context = ai_app.analyze_image_properties(image, context)
+    without_context = ai_app.analyze_image_properties(image)
+    for key in ('dimensions', 'brightness', 'contrast', 'sharpness', 'aspect_ratio'):
+        assert with_context[key] == without_context[key]
+
+    assert ai_app.extract_visual_features(image, context) == ai_app.extract_visual_features(image)
+    assert ai_app.detect_object_condition(image, 'home', context) == ai_app.detect_object_condition(image, 'home')
+    assert ai_app.calculate_quality_score(image, 'good', context) == ai_app.calculate_quality_score(image, 'good')
+
+
+def test_enhanced_classify_object_builds_context_once(monkeypatch):
+    """Le pipeline ne prépare les représentations de l'image qu'une fois"""
+    calls = []
+    original = ai_app.create_analysis_context
+
+    def counting_context(image):
+        calls.append(image.size)
+        return original(image)
+
+    monkeypatch.setattr(ai_app, 'create_analysis_context', counting_context)
+    result = ai_app.enhanced_classify_object(make_data_url(make_image()))
+
+    assert len(calls) == 1
+    assert result['image_analysis']['dimensions'] == {'width': 320, 'height': 240}
+
+
+def test_large_jpeg_is_decoded_at_bounded_resolution():
+    """Les grandes photos sont analysées réduites mais gardent leurs dimensions d'origine"""
+    data_url = make_data_url(make_image(2400, 1800))
+
+    image = ai_app.load_image_from_data(data_url)
+    assert max(image.size) <= ai_app.app.config['ANALYSIS_MAX_EDGE']
+    assert image.info['original_size'] == (2400, 1800)
+
+    analysis = ai_app.analyze_image_properties(image)
+    assert analysis['dimensions'] == {'width': 2400, 'height': 1800}
+    assert analysis['analysis_dimensions'] == {'width': 512, 'height': 384}
+    assert analysis['aspect_ratio'] == 2400 / 1800
+
+
+def test_reuploaded_image_is_served_from_cache():
+    """Une photo renvoyée à l'identique n'est pas réanalysée"""
+    ai_app.result_cache.clear()
+    data_url = make_data_url(make_image(seed=7))
+
+    with ai_app.app.test_client() as client:
+        first = client.post('/classify-object', json={'image_url': data_url})
+        second = client.post('/classify-object', json={'image_url': data_url})
+        health = client.get('/health').get_json()
+
+    assert first.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert health['cache']['hits'] == 1
+    assert health['cache']['misses'] == 1
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from image_fetcher import AsyncImageFetcher, ImageFetchError, ImageFetcher
+
+IMAGE = b'\x89PNG fake image body' * 10
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    """Serveur local jouant le rôle du CDN d'images"""
+    hits = []
+
+    def do_GET(self):
+        StubImageHandler.hits.append(self.path)
+        if self.path.split('?')[0] == '/photo.png':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', str(len(IMAGE)))
+            self.end_headers()
+            self.wfile.write(IMAGE)
+        elif self.path == '/fresh.png':
+            self.send_response(200)
+            self.send_header('Cache-Control', 'public, max-age=600')
+            self.send_header('Content-Length', str(len(IMAGE)))
+            self.end_headers()
+            self.wfile.write(IMAGE)
+        elif self.path == '/private.png':
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Cache-Control', 'private, no-store')
+            self.send_header('Content-Length', str(len(IMAGE)))
+            self.end_headers()
+            self.wfile.write(IMAGE)
+        elif self.path == '/huge.png':
+            # Pas de Content-Length : la limite doit être appliquée pendant la lecture
+            self.send_response(200)
+            self.end_headers()
+            for _ in range(64):
+                self.wfile.write(b'x' * 1024)
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubImageHandler.hits = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_conditional_revalidation_reuses_disk_cache(stub_server, tmp_path):
+    """Une image déjà en cache est revalidée par ETag sans retransférer le corps"""
+    fetcher = ImageFetcher(max_bytes=10_000, cache_dir=str(tmp_path))
+    assert fetcher.fetch(f'{stub_server}/photo.png') == IMAGE
+    assert fetcher.fetch(f'{stub_server}/photo.png') == IMAGE
+
+    stats = fetcher.stats()
+    assert stats['downloads'] == 1
+    assert stats['revalidated'] == 1
+
+
+def test_fresh_response_is_served_without_request(stub_server, tmp_path):
+    """Pendant son max-age, la réponse en cache est servie sans contacter le serveur"""
+    fetcher = ImageFetcher(max_bytes=10_000, cache_dir=str(tmp_path))
+    fetcher.fetch(f'{stub_server}/fresh.png')
+    assert fetcher.fetch(f'{stub_server}/fresh.png') == IMAGE
+    assert StubImageHandler.hits == ['/fresh.png']
+
+
+def test_download_is_aborted_past_max_bytes(stub_server):
+    """Le téléchargement s'arrête dès que la taille maximale est dépassée"""
+    fetcher = ImageFetcher(max_bytes=8 * 1024)
+    with pytest.raises(ImageFetchError):
+        fetcher.fetch(f'{stub_server}/huge.png')
+
+
+def test_failing_url_is_negatively_cached(stub_server):
+    """Une URL en échec n'est pas retentée pendant negative_ttl"""
+    fetcher = ImageFetcher(max_bytes=10_000, negative_ttl=60)
+    for _ in range(3):
+        with pytest.raises(ImageFetchError):
+            fetcher.fetch(f'{stub_server}/missing.png')
+
+    assert StubImageHandler.hits == ['/missing.png']
+    assert fetcher.stats()['negative_hits'] == 2
+
+
+def test_no_store_responses_are_not_cached(stub_server, tmp_path):
+    """Une réponse no-store n'est pas écrite sur disque, même avec un ETag"""
+    fetcher = ImageFetcher(max_bytes=10_000, cache_dir=str(tmp_path))
+    for _ in range(2):
+        assert fetcher.fetch(f'{stub_server}/private.png') == IMAGE
+    assert StubImageHandler.hits == ['/private.png'] * 2
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names]
+
+
+def test_caches_are_bounded(stub_server, tmp_path):
+    """Cache négatif limité en nombre d'URLs, cache disque limité en octets"""
+    fetcher = ImageFetcher(max_bytes=10_000, negative_ttl=60, negative_max_entries=2)
+    for name in ('a', 'b', 'c'):
+        with pytest.raises(ImageFetchError):
+            fetcher.fetch(f'{stub_server}/{name}.png')
+    assert fetcher.stats()['negative_entries'] == 2
+
+    fetcher = ImageFetcher(max_bytes=10_000, cache_dir=str(tmp_path), cache_max_bytes=4 * len(IMAGE))
+    for index in range(20):
+        fetcher.fetch(f'{stub_server}/photo.png?{index}')
+    stored = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(tmp_path) for name in names)
+    assert stored <= 4 * len(IMAGE) and fetcher.stats()['disk_evictions'] > 0
+    # Les images les plus récentes restent en cache
+    assert fetcher.fetch(f'{stub_server}/photo.png?19') == IMAGE and fetcher.stats()['revalidated'] == 1
+
+
+def test_async_fetch_keeps_disk_cache_off_the_event_loop(stub_server, tmp_path, monkeypatch):
+    """Les accès au cache disque de fetch_async se font hors du thread de la boucle"""
+    pytest.importorskip('aiohttp')
+    fetcher = AsyncImageFetcher(max_bytes=10_000, cache_dir=str(tmp_path))
+    threads = []
+    for name in ('_read_cache', '_write_cache'):
+        original = getattr(fetcher, name)
+
+        def spy(*args, original=original):
+            threads.append(threading.get_ident())
+            return original(*args)
+        monkeypatch.setattr(fetcher, name, spy)
+
+    async def scenario():
+        try:
+            return [await fetcher.fetch_async(f'{stub_server}/photo.png') for _ in range(2)], threading.get_ident()
+        finally:
+            await fetcher.close()
+
+    bodies, loop_thread = asyncio.run(scenario())
+    assert bodies == [IMAGE, IMAGE] and fetcher.stats()['revalidated'] == 1
+    assert threads and loop_thread not in threads
@@ -0,0 +1,42 @@
+import base64
+
+import numpy as np
+
+import app as ai_app
+from keyword_matcher import KeywordMatcher, KeywordTaxonomy, searchable_text
+
+
+def test_matcher_finds_same_keywords_as_substring_tests():
+    """Une passe de l'automate équivaut à un test de sous-chaîne par mot-clé"""
+    keywords = ai_app.OBJECT_TAXONOMY.keywords + ai_app.FOOD_TAXONOMY.keywords + ['he', 'she', 'his', 'hers']
+    matcher = KeywordMatcher(keywords)
+    rng = np.random.default_rng(0)
+    alphabet = list('abehiklnoprstuy -_/.')
+    texts = [''.join(rng.choice(alphabet, size=rng.integers(0, 80))) for _ in range(500)]
+    texts += ['https://cdn.example.com/teddy-bear-and-notebook.jpg', 'ushers', 'textbook']
+
+    for text in texts:
+        assert matcher.find(text) == {keyword for keyword in keywords if keyword in text}
+
+
+def test_taxonomy_helpers_follow_category_order():
+    taxonomy = KeywordTaxonomy({'toys': ['toy', 'ball'], 'sports': ['ball', 'bike']})
+    assert taxonomy.first_category({'bike', 'ball'}) == 'toys'
+    assert taxonomy.first_category(set(), default='other') == 'other'
+    assert taxonomy.category_counts({'ball', 'bike'}) == {'toys': 1, 'sports': 2}
+    assert taxonomy.ordered_keywords({'bike', 'ball', 'toy'}) == ['toy', 'ball', 'ball', 'bike']
+
+
+def test_base64_payload_is_never_scanned():
+    """Seul l'en-tête d'une data URL est analysé, jamais la charge utile"""
+    payload = base64.b64encode(b'laptop chair banana' * 100).decode()
+    data_url = f'data:image/png;base64,{payload}'
+    assert searchable_text(data_url) == 'data:image/png;base64'
+    assert ai_app.extract_text_from_image(data_url) == 'objet inconnu'
+    assert ai_app.fallback_classification(data_url)['category'] == 'other'
+
+
+def test_extract_text_keeps_original_keyword_order():
+    text = ai_app.extract_text_from_image('https://cdn.example.com/Ball-Notebook.PNG')
+    assert text == 'book notebook ball ball book magazine reading ball sport exercise'
+    assert sorted(ai_app.check_allergens(['mixed nuts', 'soy milk', 'bread'])) == ['nuts', 'soy']
@@ -0,0 +1,48 @@
+import os
+import random
+
+import pytest
+
+import app as ai_app
+from benchmarks.corpus import build_corpus
+from association_index import AssociationIndex
+from benchmarks.load_replay import (
+    DEFAULT_MIX, RequestMix, parse_mix, percentile, start_image_server, summarize, synthetic_associations
+)
+
+
+def test_mix_and_percentiles():
+    mix = parse_mix('health=0, generate-diy=40')
+    assert 'health' not in mix and mix['generate-diy'] == 40
+    with pytest.raises(ValueError):
+        parse_mix('inconnu=1')
+
+    values = sorted(range(1, 101))
+    assert [percentile(values, q) for q in (50, 95, 99)] == [50, 95, 99]
+    assert percentile([], 50) is None
+
+    summary = summarize([('health', 0.1, 0.010, 200), ('health', 0.2, 0.030, 500)], elapsed=2.0)
+    assert summary['throughput'] == 1.0 and summary['error_rate'] == 0.5
+    assert summary['p50_ms'] == pytest.approx(10.0)
+
+
+def test_every_request_type_is_accepted_by_the_service(client, monkeypatch):
+    """Chaque type du mélange, image_url servie par le serveur local comprise, obtient une réponse 200"""
+    monkeypatch.setattr(ai_app, 'association_index', AssociationIndex())
+    assert client.post('/associations/refresh', json=synthetic_associations(200)).get_json()['loaded'] == 200
+    corpus = build_corpus(quick=True)[:3]
+    server, base_url = start_image_server(corpus)
+    try:
+        request_mix = RequestMix(corpus, base_url)
+        rng = random.Random(0)
+        for name in DEFAULT_MIX:
+            method, path, kwargs = request_mix.build(name, rng)
+            response = client.open(path, method=method, query_string=kwargs.get('params'), data=kwargs.get('data'),
+                                   json=kwargs.get('json'), headers=kwargs.get('headers'))
+            assert response.status_code == 200, (name, response.get_json())
+    finally:
+        server.shutdown()
+
+    health = client.get('/health').get_json()
+    assert health['process']['pid'] == os.getpid()
+    assert health['process']['rss_bytes'] > 0
@@ -0,0 +1,54 @@
+import app as ai_app
+from metrics import MetricsRegistry, STAGE_SECONDS
+from tests.helpers import png_bytes
+
+PIPELINE_STAGES = ['decode', 'analyze_image_properties', 'get_dominant_colors', 'extract_visual_features',
+                   'detect_object_condition', 'calculate_quality_score', 'serialization']
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latence', ['route'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, '/a"b')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP latency_seconds Latence', '# TYPE latency_seconds histogram']
+    assert lines[2:] == [
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a\\"b"} 4.05',
+        'latency_seconds_count{route="/a\\"b"} 4'
+    ]
+
+
+def test_metrics_endpoint_reports_stages_routes_and_fallbacks(client):
+    ai_app.result_cache.clear()
+    before = {stage: STAGE_SECONDS.count(stage) for stage in PIPELINE_STAGES}
+    fallbacks = ai_app.FALLBACKS.value()
+
+    response = client.post('/classify-object?filename=chaise.png', data=png_bytes(seed=11), content_type='image/png')
+    assert response.status_code == 200
+    client.post('/predict_object', json={'image_url': 'introuvable/chaise.jpg'})
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+
+    assert all(STAGE_SECONDS.count(stage) > before[stage] for stage in PIPELINE_STAGES)
+    assert 'ai_stage_duration_seconds_bucket{stage="get_dominant_colors",le="+Inf"}' in text
+    assert 'ai_requests_total{route="/classify-object",method="POST",status="200"}' in text
+    assert 'ai_request_payload_bytes_count{route="/classify-object"}' in text
+    assert 'ai_cache_hit_ratio{cache="results"}' in text
+    assert ai_app.FALLBACKS.value() == fallbacks + 1
+
+
+def test_pool_analysis_returns_its_stage_timings():
+    """Les mesures faites dans un processus du pool sont renvoyées avec le résultat"""
+    result, image_hash, stages, attributes = ai_app.analyze_with_stage_timings('chaise.png', png_bytes(seed=12))
+    assert result['image_analysis'] and image_hash is not None
+    assert attributes['image_resolution'] == {'width': 320, 'height': 240}
+    recorded = {stage for stage, _, _ in stages}
+    assert set(PIPELINE_STAGES) - {'serialization'} <= recorded
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import app as ai_app
+import model_backends
+from model_backends import MODEL_BACKENDS, ModelBackend, ModelRunner, register_backend
+from tests.helpers import png_bytes
+
+
+class BrightnessBackend(ModelBackend):
+    """Modèle factice : image claire -> furniture, sombre -> electronics (logits)"""
+
+    name = 'brightness'
+    default_file = 'weights.bin'
+    calls = []
+
+    def __init__(self, model_dir, metadata):
+        super().__init__(model_dir, metadata)
+        self.delay = metadata.get('delay', 0)
+
+    def run(self, batch):
+        self.calls.append(batch.shape)
+        time.sleep(self.delay)
+        brightness = batch.mean(axis=(1, 2, 3))
+        return np.stack([brightness, -brightness], axis=1) * 10
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(MODEL_BACKENDS, 'brightness', BrightnessBackend)
+    BrightnessBackend.calls = []
+
+    def write(**metadata):
+        metadata = dict({'labels': ['furniture', 'electronics'], 'input_size': [32, 24], 'version': '3'}, **metadata)
+        (tmp_path / 'model.json').write_text(json.dumps(metadata))
+        return str(tmp_path)
+    return write
+
+
+def test_runner_preprocesses_and_labels_a_batch(model_dir):
+    runner = ModelRunner('brightness', model_dir())
+    assert runner.enabled and runner.version == 'brightness:3'
+    assert runner.stats()['loaded'] is False
+
+    bright = np.full((240, 320, 3), 250, dtype=np.uint8)
+    dark = np.full((48, 64, 3), 5, dtype=np.uint8)
+    predictions = runner.load().predict([bright, dark])
+    assert BrightnessBackend.calls == [(2, 3, 24, 32)]
+    assert [label for label, _ in predictions] == ['furniture', 'electronics']
+    assert all(0.5 < confidence <= 1.0 for _, confidence in predictions)
+
+
+def test_concurrent_predictions_are_batched(model_dir):
+    runner = ModelRunner('brightness', model_dir(delay=0.05), max_batch=8)
+    image = np.full((24, 32, 3), 200, dtype=np.uint8)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(runner.predict(image))) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = runner.stats()
+    assert len(results) == 12 and stats['images'] == 12
+    # Le premier appel part seul, les suivants attendent et sont regroupés
+    assert stats['batches'] < 12
+    assert max(shape[0] for shape in BrightnessBackend.calls) <= 8
+
+
+def test_classification_uses_the_selected_backend(model_dir, monkeypatch):
+    assert ai_app.model_runner.backend_name == 'heuristic' and not ai_app.model_runner.enabled
+
+    monkeypatch.setattr(ai_app, 'model_runner', ModelRunner('brightness', model_dir()))
+    result = ai_app.enhanced_classify_object('chaise.png', png_bytes(seed=4))
+    assert result['category'] in ('furniture', 'electronics')
+    assert result['subcategory'] in ai_app.OBJECT_CATEGORIES[result['category']]
+    assert ai_app.model_runner.stats() == {'batches': 1, 'images': 1, 'backend': 'brightness', 'loaded': True}
+
+
+def test_incomplete_backend_is_refused_at_registration(monkeypatch):
+    """Un backend sans run() est refusé dès son enregistrement, pas à la première classification"""
+    monkeypatch.setattr(model_backends, 'MODEL_BACKENDS', dict(MODEL_BACKENDS))
+
+    class Incomplete(ModelBackend):
+        name = 'incomplet'
+
+    with pytest.raises(TypeError):
+        register_backend(Incomplete)
+    assert register_backend(BrightnessBackend) is BrightnessBackend
+    assert model_backends.MODEL_BACKENDS['brightness'] is BrightnessBackend
@@ -0,0 +1,35 @@
+import numpy as np
+
+from palette import SAMPLE_EDGE, histogram_palette, kmeans_palette
+
+
+def blocks_image():
+    """Image de trois aplats : 1/2 rouge, 1/3 bleu, 1/6 gris"""
+    pixels = np.zeros((SAMPLE_EDGE, SAMPLE_EDGE, 3), dtype=np.uint8)
+    pixels[:, :75] = (200, 30, 30)
+    pixels[:, 75:125] = (20, 40, 220)
+    pixels[:, 125:] = (128, 128, 128)
+    return pixels
+
+
+def test_histogram_palette_is_deterministic_and_well_formed():
+    """Même entrée, même palette ; structure {'rgb', 'frequency'} triée par fréquence"""
+    rng = np.random.default_rng(3)
+    pixels = rng.integers(0, 256, size=(200, 300, 3), dtype=np.uint8)
+
+    first = histogram_palette(pixels)
+    assert first == histogram_palette(pixels.copy())
+    assert len(first) == 5
+    assert sum(color['frequency'] for color in first) == SAMPLE_EDGE * SAMPLE_EDGE
+    frequencies = [color['frequency'] for color in first]
+    assert frequencies == sorted(frequencies, reverse=True)
+    assert all(len(color['rgb']) == 3 for color in first)
+
+
+def test_histogram_palette_recovers_flat_colors():
+    """Les aplats sont retrouvés comme le ferait le k-means"""
+    palette = histogram_palette(blocks_image())
+    reference = kmeans_palette(blocks_image(), k=3)
+
+    assert [color['rgb'] for color in palette] == [[200.0, 30.0, 30.0], [20.0, 40.0, 220.0], [128.0, 128.0, 128.0]]
+    assert [color['frequency'] for color in palette] == [color['frequency'] for color in reference]
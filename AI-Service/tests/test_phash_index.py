@@ -0,0 +1,142 @@
+import base64
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import app as ai_app
+from phash_index import RECORD, HashIndex, perceptual_hash, popcount64
+from tests.helpers import encode, make_photo
+
+
+@pytest.fixture
+def dedup_index(monkeypatch):
+    index = HashIndex(max_distance=10)
+    monkeypatch.setattr(ai_app, 'dedup_index', index)
+    ai_app.result_cache.clear()
+    return index
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def brute_force(hashes, query, max_distance):
+    distances = popcount64(hashes ^ np.uint64(query))
+    return sorted((int(d), int(i)) for i, d in enumerate(distances) if d <= max_distance)
+
+
+def test_hash_survives_reencoding_and_resizing():
+    photo = make_photo(1)
+    reference = perceptual_hash(photo)
+    jpeg = Image.open(io.BytesIO(encode(photo, 'JPEG', quality=60)))
+    assert hamming(reference, perceptual_hash(jpeg)) <= 4
+    assert hamming(reference, perceptual_hash(photo.resize((200, 150)))) <= 4
+    assert hamming(reference, perceptual_hash(photo.crop((8, 6, 312, 234)))) <= 8
+    assert all(hamming(reference, perceptual_hash(make_photo(seed))) > 16 for seed in range(2, 6))
+    # Images unies : pas d'empreinte (toutes auraient la même)
+    assert perceptual_hash(Image.new('RGB', (320, 240), (255, 0, 0))) is None
+    assert perceptual_hash(Image.new('RGB', (320, 240), (0, 0, 255))) is None
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_lookup_matches_brute_force(tmp_path, persistent):
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2 ** 63, 3000, dtype=np.uint64)
+    # Variantes proches de quelques empreintes (1 à 12 bits inversés)
+    for i in range(0, 3000, 10):
+        flips = rng.choice(64, rng.integers(1, 13), replace=False)
+        hashes[i + 1] = hashes[i] ^ np.uint64(sum(1 << int(bit) for bit in flips))
+
+    path = str(tmp_path / 'phash.idx') if persistent else None
+    index = HashIndex(path, max_distance=10, rebuild_threshold=500)
+    for position, value in enumerate(hashes[:2500]):
+        index.add(int(value), f'{position:064x}', f'item-{position}')
+    index.lookup(0)
+    # Les derniers ajouts ne sont pas encore dans les tables triées
+    for position, value in enumerate(hashes[2500:], start=2500):
+        index.add(int(value), f'{position:064x}', f'item-{position}')
+    assert index.stats()['indexed'] == 2500 and len(index) == 3000
+
+    reopened = HashIndex(path, max_distance=10) if persistent else index
+    for query in hashes[::97]:
+        for max_distance in (0, 5, 10):
+            expected = brute_force(hashes, int(query), max_distance)
+            found = reopened.lookup(int(query), max_distance, limit=len(hashes))
+            assert [(distance, int(key, 16)) for key, _, distance in found] == expected
+            assert all(item_id == f'item-{int(key, 16)}' for key, item_id, _ in found)
+
+
+def test_dedupe_endpoint_returns_near_duplicates(client, dedup_index):
+    photo = make_photo(1)
+    response = client.post('/dedupe?filename=velo.png&add=1&item_id=annonce-1', data=encode(photo),
+                           content_type='image/png')
+    assert response.status_code == 200
+    assert response.get_json()['duplicates'] == []
+    assert len(dedup_index) == 1
+
+    client.post('/dedupe?add=true&item_id=annonce-2', data=encode(make_photo(2)), content_type='image/png')
+    response = client.post('/dedupe?filename=velo.jpg', data=encode(photo, 'JPEG', quality=70),
+                           content_type='image/jpeg')
+    data = response.get_json()
+    assert [duplicate['item_id'] for duplicate in data['duplicates']] == ['annonce-1']
+    assert data['duplicates'][0]['distance'] <= 4 and not data['duplicates'][0]['same_image']
+    assert len(data['hash']) == 16 and data['lookup_ms'] >= 0
+    assert len(dedup_index) == 2
+
+    assert client.post('/dedupe', json={}).status_code == 400
+    assert client.post('/dedupe', data=b'not-an-image', content_type='image/png').status_code == 400
+    long_id = {'image_url': 'data:image/png;base64,' + base64.b64encode(encode(photo)).decode(),
+               'add': True, 'item_id': 'é' * 13}
+    assert client.post('/dedupe', json=long_id).status_code == 400
+    assert len(dedup_index) == 2
+
+
+def test_item_ids_are_never_truncated(tmp_path):
+    """Un identifiant de plus de 24 octets UTF-8 est refusé ; un ancien enregistrement tronqué reste lisible"""
+    path = str(tmp_path / 'phash.idx')
+    index = HashIndex(path)
+    index.add(1, '00' * 32, 'é' * 12)
+    with pytest.raises(ValueError):
+        index.add(2, '00' * 32, 'é' * 13)
+
+    record = np.zeros(1, dtype=RECORD)
+    record['hash'], record['item_id'] = 3, ('x' + 'é' * 12).encode('utf-8')[:24]
+    with open(path, 'ab') as f:
+        f.write(record.tobytes())
+    found = HashIndex(path).lookup(1, max_distance=1)
+    assert sorted(item_id for _, item_id, _ in found) == ['x' + 'é' * 11, 'é' * 12]
+
+
+def test_near_duplicate_reuses_cached_classification(client, dedup_index, monkeypatch):
+    monkeypatch.setitem(ai_app.app.config, 'AI_DEDUP_REUSE_DISTANCE', 6)
+    photo = make_photo(3)
+    first = client.post('/classify-object?filename=chaise.jpg', data=encode(photo), content_type='image/png')
+    assert first.status_code == 200 and len(dedup_index) == 1
+
+    calls = []
+
+    def pipeline(image_data, image_bytes=None, image=None):
+        calls.append(image_data)
+        return ai_app.fallback_classification(image_data)
+
+    monkeypatch.setattr(ai_app, 'enhanced_classify_object', pipeline)
+    second = client.post('/classify-object?filename=chaise.jpg', data=encode(photo, 'JPEG', quality=70),
+                         content_type='image/jpeg')
+    assert second.get_json() == first.get_json() and calls == []
+
+    # Autre nom de fichier : la catégorie en dépend, la photo repasse par le pipeline
+    client.post('/classify-object?filename=ours-jouet.jpg', data=encode(photo, 'JPEG', quality=60),
+                content_type='image/jpeg')
+    assert calls == ['ours-jouet.jpg']
+
+    # Réutilisation désactivée (défaut) : la photo repasse par le pipeline
+    monkeypatch.setitem(ai_app.app.config, 'AI_DEDUP_REUSE_DISTANCE', -1)
+    client.post('/classify-object?filename=chaise.jpg', data=encode(photo, 'JPEG', quality=50),
+                content_type='image/jpeg')
+    assert calls == ['ours-jouet.jpg', 'chaise.jpg']
+
+    # Image unie : ni empreinte ni entrée dans l'index
+    plain = encode(Image.new('RGB', (320, 240), (255, 0, 0)))
+    assert client.post('/dedupe', data=plain, content_type='image/png').status_code == 400
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from recipe_catalog import DEFAULT_CATALOG_PATH, RecipeCatalog, normalize
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return RecipeCatalog()
+
+
+def test_ingredient_names_resolve_to_canonical_ids(catalog):
+    """Alias français, pluriels, accents et ligatures"""
+    assert catalog.resolve('Pommes') == 'apple'
+    assert catalog.resolve('pommes de terre') == 'potato'
+    assert catalog.resolve('Œufs') == 'egg'
+    assert catalog.resolve('Épinards') == 'spinach'
+    assert catalog.resolve('tomato') == 'tomato'
+    assert catalog.resolve('caviar') is None
+
+
+def test_ranking_by_coverage_and_restrictions(catalog):
+    """La recette entièrement couverte passe en tête ; les restrictions excluent par étiquette"""
+    ranked = catalog.suggest(['banane', 'fraises', 'yaourt', 'miel'])
+    assert ranked[0]['title'] == 'Smoothie aux fruits'
+    assert ranked[0]['coverage'] == 1.0
+    assert ranked[0]['missing_ingredients'] == []
+
+    vegan = catalog.suggest(['riz', 'oeufs', 'tomates', 'thon'], ['Végétalien'])
+    assert vegan
+    assert all(recipe['title'] not in ('Riz sauté aux légumes', 'Salade de riz') for recipe in vegan)
+
+    # Un allergène du formulaire (Crustacés) écarte les crevettes
+    titles = [recipe['title'] for recipe in catalog.suggest(['crevettes', 'ail', 'citron'])]
+    assert "Crevettes à l'ail" in titles
+    titles = [recipe['title'] for recipe in catalog.suggest(['crevettes', 'ail', 'citron'], ['Crustacés'])]
+    assert "Crevettes à l'ail" not in titles
+
+
+def reference_search(data, ingredients, restrictions, limit=5):
+    """Parcours complet du catalogue, recette par recette"""
+    forbidden = {tag for restriction in restrictions for tag in data['restrictions'][restriction]}
+    scored = []
+    for index, recipe in enumerate(data['recipes']):
+        ids = {item['id'] for item in recipe['ingredients']}
+        if any(forbidden.intersection(data['ingredients'][i].get('tags', [])) for i in ids):
+            continue
+        count = len(ids.intersection(ingredients))
+        if count:
+            scored.append((count / len(ids), count, -index))
+    return [-neg_index for _, _, neg_index in sorted(scored, reverse=True)[:limit]]
+
+
+def test_search_matches_linear_scan(catalog):
+    """Même classement qu'un parcours complet du catalogue"""
+    with open(DEFAULT_CATALOG_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    for query, restrictions in [
+        (['apple', 'flour', 'butter', 'egg'], []),
+        (['tomato', 'onion', 'garlic'], []),
+        (['egg', 'milk', 'rice', 'carrot'], ['vegan']),
+        (['sugar', 'flour'], ['gluten-free', 'halal']),
+        (['beef', 'bacon', 'wine', 'onion', 'carrot', 'mushroom'], ['vegetarian'])
+    ]:
+        expected = reference_search(data, query, restrictions)
+        assert [index for index, _ in catalog.search(query, restrictions)] == expected
+
+
+def test_servings_scale_quantities(catalog):
+    smoothie = catalog.suggest(['banane'], servings=4)[0]
+    assert smoothie['servings'] == 4
+    assert '300 g fraises' in smoothie['ingredients']
+    assert normalize(' Crème  Fraîche ') == 'creme fraiche'
+
+
+def test_generate_recipes_endpoint(client):
+    response = client.post('/generate-recipes', json={
+        'ingredients': ['carottes', 'pommes de terre', 'oignon', 'courgette'],
+        'dietary_restrictions': ['vegan'],
+        'servings': 2
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is True
+    first = data['recipes'][0]
+    assert first['title'] == 'Soupe de légumes'
+    for field in ('ingredients', 'instructions', 'prep_time', 'cook_time', 'difficulty',
+                  'nutritional_info', 'tags', 'image'):
+        assert field in first
+    assert first['servings'] == 2
+
+    assert client.post('/generate-recipes', json={'ingredients': []}).status_code == 400
+    # Champs facultatifs à null : ignorés ; autre chose qu'une liste : refusé
+    response = client.post('/generate-recipes', json={'ingredients': ['riz'], 'dietary_restrictions': None,
+                                                      'allergens': None})
+    assert response.status_code == 200
+    assert client.post('/generate-recipes', json={'ingredients': ['riz'], 'allergens': 'gluten'}).status_code == 400
+
+
+def test_generate_recipe_unknown_ingredients_fall_back(client):
+    response = client.post('/generate_recipe', json={'food_type': 'other', 'ingredients': ['caviar']})
+    recipes = response.get_json()['recipes']
+    assert recipes[0]['title'] == 'Recette créative'
+    assert recipes[0]['ingredients'] == ['caviar']
+    for servings in ('4', -2, 0, True, 2.5):
+        response = client.post('/generate-recipes', json={'ingredients': ['riz'], 'servings': servings})
+        assert response.status_code == 400
+    response = client.post('/generate-recipes', json={'ingredients': ['banane'], 'servings': 4})
+    assert response.get_json()['recipes'][0]['servings'] == 4
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from record_store import RecordStore, decode_item_id, encode_item_id
+
+RECORD = np.dtype([('value', '<u8'), ('item_id', 'S24')])
+
+
+def record(value, item_id=''):
+    row = np.zeros(1, dtype=RECORD)
+    row['value'], row['item_id'] = value, encode_item_id(item_id)
+    return row
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_appends_are_kept_in_order(tmp_path, persistent):
+    store = RecordStore(RECORD, str(tmp_path / 'records.bin') if persistent else None)
+    for value in range(3000):
+        store.append(record(value))
+    assert len(store) == 3000 and np.array_equal(store.records['value'], np.arange(3000))
+
+
+def test_file_is_shared_and_partial_records_ignored(tmp_path):
+    path = str(tmp_path / 'records.bin')
+    writer, reader = RecordStore(RECORD, path), RecordStore(RECORD, path)
+    writer.append(record(1, 'annonce-1'))
+    # Enregistrement en cours d'écriture par un autre worker
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 5)
+    reader.refresh()
+    assert len(reader) == 1 and decode_item_id(reader.records['item_id'][0]) == 'annonce-1'
+
+
+def test_item_ids_are_never_cut_inside_a_character():
+    assert encode_item_id('é' * 12) == ('é' * 12).encode('utf-8')
+    with pytest.raises(ValueError):
+        encode_item_id('é' * 13)
+    assert decode_item_id(('x' + 'é' * 12).encode('utf-8')[:24]) == 'x' + 'é' * 11
@@ -0,0 +1,79 @@
+import os
+
+from result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    """Le cache évince l'entrée la moins récemment utilisée"""
+    cache = ResultCache(max_size=2, ttl=60)
+    cache.set('a', {'category': 'books'})
+    cache.set('b', {'category': 'toys'})
+    assert cache.get('a') == {'category': 'books'}
+
+    cache.set('c', {'category': 'home'})
+    assert cache.get('b') is None
+    assert cache.get('c') == {'category': 'home'}
+
+    stats = cache.stats()
+    assert stats['size'] == 2
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+
+
+def test_entries_expire_after_ttl():
+    """Les entrées expirent après le TTL"""
+    clock = FakeClock()
+    cache = ResultCache(max_size=10, ttl=30, clock=clock)
+    cache.set('a', {'category': 'books'})
+
+    clock.now += 29
+    assert cache.get('a') is not None
+    clock.now += 2
+    assert cache.get('a') is None
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    """Deux workers partageant le même répertoire profitent des résultats l'un de l'autre"""
+    first = ResultCache(max_size=10, ttl=60, disk_dir=str(tmp_path))
+    second = ResultCache(max_size=10, ttl=60, disk_dir=str(tmp_path))
+
+    key = first.make_key('object', b'image-bytes')
+    first.set(key, {'category': 'electronics', 'confidence': 0.7})
+
+    assert second.get(key) == {'category': 'electronics', 'confidence': 0.7}
+    assert second.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_is_pruned(tmp_path):
+    """Le niveau disque reste sous sa taille maximale ; les entrées expirées sont supprimées"""
+    clock = FakeClock()
+    cache = ResultCache(max_size=0, ttl=60, disk_dir=str(tmp_path), clock=clock, disk_max_bytes=2000)
+    value = {'category': 'books', 'tags': ['x' * 80]}
+    for index in range(50):
+        cache.set(cache.make_key('object', str(index).encode()), value)
+    files = [os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names]
+    assert sum(os.path.getsize(path) for path in files) <= 2000
+    assert cache.stats()['disk_evictions'] > 0
+    assert cache.get(cache.make_key('object', b'49')) == value
+
+    clock.now = max(os.path.getmtime(path) for path in files) + 61
+    cache._disk_budget.prune()
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names]
+
+
+def test_key_depends_on_content_kind_and_version():
+    """La clé change avec le contenu, le type d'analyse et la version du pipeline"""
+    cache = ResultCache(version='1')
+    key = cache.make_key('object', b'abc')
+    assert key == cache.make_key('object', b'abc')
+    assert key != cache.make_key('object', b'abd')
+    assert key != cache.make_key('food', b'abc')
+    assert key != ResultCache(version='2').make_key('object', b'abc')
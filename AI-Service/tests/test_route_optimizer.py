@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from route_optimizer import distance_matrix, optimize_route
+
+TUNIS = (36.8065, 10.1815)
+
+
+def haversine(point1, point2):
+    """Même calcul que calculateDistanceBetweenPoints (Backend/services/deliveryService.js), en km"""
+    phi1, phi2 = math.radians(point1[0]), math.radians(point2[0])
+    a = (math.sin(math.radians(point2[0] - point1[0]) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(point2[1] - point1[1]) / 2) ** 2)
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def random_deliveries(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(TUNIS, 0.08, (count, 2)), rng.normal(TUNIS, 0.08, (count, 2))
+
+
+def test_distance_matrix_matches_pairwise_haversine():
+    points, _ = random_deliveries(30)
+    matrix = distance_matrix(points[:, 0], points[:, 1])
+    expected = [[haversine(a, b) for b in points] for a in points]
+    assert np.allclose(matrix, expected, atol=1e-6)
+    assert matrix[0, 0] == 0 and np.allclose(matrix, matrix.T)
+
+
+@pytest.mark.parametrize('start', [None, TUNIS])
+def test_route_visits_pickup_before_dropoff_and_improves(start):
+    pickups, dropoffs = random_deliveries(60)
+    route = optimize_route(pickups, dropoffs, start, time_budget=5.0)
+    order = route['order']
+    assert sorted(order) == list(range(120))
+    position = {stop: index for index, stop in enumerate(order)}
+    assert all(position[2 * d] < position[2 * d + 1] for d in range(60))
+
+    assert route['converged'] and route['moves'] > 0
+    assert route['total_km'] < route['initial_km']
+    assert route['total_km'] == pytest.approx(sum(route['legs_km']))
+    points = np.empty((120, 2))
+    points[0::2], points[1::2] = pickups, dropoffs
+    stops = [tuple(start)] if start else []
+    stops += [tuple(points[stop]) for stop in order]
+    assert route['total_km'] == pytest.approx(sum(haversine(a, b) for a, b in zip(stops, stops[1:])))
+
+
+def test_route_along_a_street_is_straight():
+    # Livraisons qui se suivent sur un axe nord-sud, données dans le désordre
+    latitudes = TUNIS[0] + np.arange(10) * 0.01
+    shuffled = [7, 2, 9, 0, 4, 1, 8, 3, 6, 5]
+    pickups = [(latitudes[i], TUNIS[1]) for i in shuffled]
+    dropoffs = [(latitudes[i] + 0.005, TUNIS[1]) for i in shuffled]
+    route = optimize_route(pickups, dropoffs, start=(TUNIS[0] - 0.01, TUNIS[1]))
+    assert route['total_km'] == pytest.approx(haversine((TUNIS[0] - 0.01, TUNIS[1]), (latitudes[-1] + 0.005, TUNIS[1])))
+
+
+def test_optimize_route_endpoint(client):
+    pickups, dropoffs = random_deliveries(8)
+    deliveries = [
+        {'_id': {'$oid': f'livraison-{i}'}, 'pickupAddress': {'coordinates': {'lat': p[0], 'lng': p[1]}},
+         'deliveryAddress': {'coordinates': {'lat': d[0], 'lng': d[1]}}}
+        for i, (p, d) in enumerate(zip(pickups, dropoffs))
+    ]
+    deliveries[0] = {'id': 'colis', 'pickup': deliveries[0]['pickupAddress']['coordinates'],
+                     'dropoff': deliveries[0]['deliveryAddress']['coordinates']}
+    start = {'lat': TUNIS[0], 'lng': TUNIS[1]}
+    response = client.post('/optimize-route', json={'deliveries': deliveries, 'start': start})
+    data = response.get_json()
+    assert response.status_code == 200 and data['success']
+    assert len(data['stops']) == 16 and {stop['delivery_id'] for stop in data['stops']} >= {'colis', 'livraison-7'}
+    assert data['stops'][-1]['cumulative_km'] == pytest.approx(data['total_distance_km'], abs=1e-2)
+    assert data['total_distance_km'] <= data['initial_distance_km'] and data['optimization_ms'] >= 0
+    first = [stop['type'] for stop in data['stops'] if stop['delivery_id'] == 'colis']
+    assert first == ['pickup', 'dropoff']
+
+    assert client.post('/optimize-route', json={'deliveries': []}).status_code == 400
+    assert client.post('/optimize-route', json={'deliveries': [{'pickup': {'lat': 0, 'lng': 0}}]}).status_code == 400
+    assert client.post('/optimize-route', json={'deliveries': deliveries, 'start': {'lat': 'nord'}}).status_code == 400
+    for budget in ('nan', 'inf', float('nan'), 'rapide'):
+        response = client.post('/optimize-route', json={'deliveries': deliveries, 'time_budget_ms': budget})
+        assert response.status_code == 400
@@ -0,0 +1,179 @@
+import numpy as np
+
+from rules import analyze_palettes, classify_properties
+
+
+def legacy_analyze_dominant_colors(dominant_colors):
+    """Implémentation de référence (règles écrites à la main avant rules.py)"""
+    if not dominant_colors:
+        return {}
+
+    analysis = {
+        'has_metallic_colors': False,
+        'has_neutral_colors': False,
+        'has_vibrant_colors': False,
+        'has_wood_colors': False,
+        'has_bright_colors': False,
+        'has_sport_colors': False,
+        'has_beauty_colors': False,
+        'has_home_colors': False
+    }
+
+    for color_data in dominant_colors:
+        rgb = color_data.get('rgb', [0, 0, 0])
+        r, g, b = rgb
+
+        # Couleurs métalliques (gris, argent, or)
+        if 100 <= r <= 200 and 100 <= g <= 200 and 100 <= b <= 200:
+            analysis['has_metallic_colors'] = True
+
+        # Couleurs neutres (beiges, bruns, gris)
+        if (80 <= r <= 180 and 80 <= g <= 180 and 80 <= b <= 180) or \
+           (r > g + 20 and r > b + 20):  # Tons bruns
+            analysis['has_neutral_colors'] = True
+
+        # Couleurs vives (saturation élevée)
+        max_val = max(r, g, b)
+        min_val = min(r, g, b)
+        if max_val > 150 and (max_val - min_val) > 50:
+            analysis['has_vibrant_colors'] = True
+
+        # Couleurs bois (bruns, beiges)
+        if r > g + 10 and r > b + 10 and r > 100:
+            analysis['has_wood_colors'] = True
+
+        # Couleurs vives et saturées
+        if max(r, g, b) > 180 and min(r, g, b) < 100:
+            analysis['has_bright_colors'] = True
+
+        # Couleurs sport (rouge, bleu, vert vifs)
+        if (r > 150 and g < 100 and b < 100) or \
+           (b > 150 and r < 100 and g < 100) or \
+           (g > 150 and r < 100 and b < 100):
+            analysis['has_sport_colors'] = True
+
+        # Couleurs beauté (pastels, roses, violets)
+        if (r > 150 and g > 100 and b > 150) or \
+           (r > 150 and g < 100 and b > 150):
+            analysis['has_beauty_colors'] = True
+
+        # Couleurs maison (neutres, terre)
+        if 50 <= r <= 150 and 50 <= g <= 150 and 50 <= b <= 150:
+            analysis['has_home_colors'] = True
+
+    return analysis
+
+
+def legacy_classify_by_image_properties(image_analysis):
+    """Implémentation de référence (règles écrites à la main avant rules.py)"""
+    if not image_analysis:
+        return {'category': 'other', 'confidence': 0.5}
+
+    # Règles basées sur les propriétés
+    brightness = image_analysis.get('brightness', 128)
+    contrast = image_analysis.get('contrast', 50)
+    aspect_ratio = image_analysis.get('aspect_ratio', 1.0)
+    sharpness = image_analysis.get('sharpness', 0)
+    dominant_colors = image_analysis.get('dominant_colors', [])
+
+    # Analyser les couleurs dominantes
+    color_analysis = legacy_analyze_dominant_colors(dominant_colors)
+
+    # Classification améliorée basée sur plusieurs critères
+    category_scores = {}
+
+    # Électronique - objets sombres, couleurs métalliques
+    if brightness < 100 or color_analysis.get('has_metallic_colors', False):
+        category_scores['electronics'] = 0.7
+
+    # Livres - forme rectangulaire, couleurs neutres
+    if 0.6 <= aspect_ratio <= 1.4 and color_analysis.get('has_neutral_colors', False):
+        category_scores['books'] = 0.8
+
+    # Vêtements - fort contraste, couleurs vives
+    if contrast > 60 and color_analysis.get('has_vibrant_colors', False):
+        category_scores['clothing'] = 0.7
+
+    # Meubles - forme carrée/rectangulaire, couleurs bois
+    if 0.7 <= aspect_ratio <= 1.3 and color_analysis.get('has_wood_colors', False):
+        category_scores['furniture'] = 0.8
+
+    # Jouets - couleurs vives, formes variées
+    if color_analysis.get('has_bright_colors', False) and sharpness > 0.05:
+        category_scores['toys'] = 0.6
+
+    # Sports - couleurs vives, contraste élevé
+    if contrast > 80 and color_analysis.get('has_sport_colors', False):
+        category_scores['sports'] = 0.7
+
+    # Beauté - couleurs pastel ou vives, forme compacte
+    if color_analysis.get('has_beauty_colors', False) and aspect_ratio < 2:
+        category_scores['beauty'] = 0.6
+
+    # Maison - couleurs neutres, forme variée
+    if color_analysis.get('has_home_colors', False):
+        category_scores['home'] = 0.6
+
+    # Si aucune catégorie n'a un score suffisant, utiliser des règles de fallback
+    if not category_scores or max(category_scores.values()) < 0.5:
+        # Règles de fallback plus généreuses
+        if brightness < 120:
+            category_scores['electronics'] = 0.5
+        elif aspect_ratio > 1.5 or aspect_ratio < 0.7:
+            category_scores['books'] = 0.5
+        elif contrast > 40:
+            category_scores['clothing'] = 0.5
+        else:
+            category_scores['home'] = 0.5
+
+    # Retourner la catégorie avec le meilleur score
+    best_category = max(category_scores, key=category_scores.get)
+    confidence = category_scores[best_category]
+
+    return {'category': best_category, 'confidence': confidence}
+
+
+def random_palette(rng):
+    """Palette aléatoire : valeurs flottantes et entières, dont des valeurs pile sur les seuils"""
+    thresholds = np.array([50, 80, 100, 110, 120, 150, 160, 170, 180, 200, 130, 90, 70, 60])
+    colors = []
+    for _ in range(rng.integers(0, 6)):
+        if rng.random() < 0.5:
+            rgb = rng.choice(thresholds, size=3).astype(float) + rng.choice([0, 0, 10, 20, 50, -10], size=3)
+        else:
+            rgb = rng.uniform(0, 255, size=3)
+        colors.append({'rgb': [float(value) for value in rgb], 'frequency': int(rng.integers(1, 1000))})
+    return colors
+
+
+def random_analysis(rng):
+    if rng.random() < 0.05:
+        return {}
+    analysis = {
+        'brightness': float(rng.choice([100, 120, rng.uniform(0, 255)])),
+        'contrast': float(rng.choice([40, 60, 80, rng.uniform(0, 120)])),
+        'aspect_ratio': float(rng.choice([0.6, 0.7, 1.3, 1.4, 1.5, 2, rng.uniform(0.3, 3)])),
+        'sharpness': float(rng.choice([0.05, rng.uniform(0, 0.3)])),
+        'dominant_colors': random_palette(rng)
+    }
+    # Propriétés parfois absentes (valeurs par défaut des règles)
+    for name in ('brightness', 'contrast', 'aspect_ratio', 'sharpness', 'dominant_colors'):
+        if rng.random() < 0.1:
+            del analysis[name]
+    return analysis
+
+
+def test_color_families_match_reference_rules():
+    """Les masques NumPy donnent exactement les indicateurs des règles d'origine"""
+    rng = np.random.default_rng(0)
+    palettes = [random_palette(rng) for _ in range(2000)]
+    assert analyze_palettes(palettes) == [legacy_analyze_dominant_colors(p) for p in palettes]
+
+
+def test_property_classification_matches_reference_rules():
+    """Même catégorie et même confiance que les règles d'origine, sur un lot entier"""
+    rng = np.random.default_rng(1)
+    analyses = [random_analysis(rng) for _ in range(3000)]
+    expected = [legacy_classify_by_image_properties(a) for a in analyses]
+    assert classify_properties(analyses) == expected
+    assert {result['category'] for result in expected} >= {'electronics', 'books', 'home', 'clothing'}
@@ -0,0 +1,47 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from text_index import CategoryTextIndex
+
+DESCRIPTIONS = {
+    'electronics': 'appareil électronique téléphone ordinateur laptop computer phone screen',
+    'books': 'livre magazine cahier book magazine notebook reading paper pages',
+    'furniture': 'meuble chaise table chair table sofa desk furniture wood furniture home decor',
+    'home': 'maison cuisine house kitchen bathroom home decor'
+}
+
+QUERIES = [
+    'phone mobile smartphone',
+    'book magazine reading book',
+    'chair table furniture',
+    'objet inconnu',
+    '',
+    'kitchen home house decor decor',
+    'laptop computer notebook phone mobile smartphone laptop computer notebook'
+]
+
+
+def refit_similarities(query):
+    """Calcul historique : TfidfVectorizer réajusté sur [requête] + descriptions"""
+    matrix = TfidfVectorizer().fit_transform([query] + list(DESCRIPTIONS.values()))
+    return cosine_similarity(matrix[0:1], matrix[1:])[0]
+
+
+def test_scores_match_per_request_refit():
+    """Les scores de l'index sont ceux d'un TfidfVectorizer réajusté par requête"""
+    index = CategoryTextIndex(DESCRIPTIONS)
+    for query in QUERIES:
+        expected = refit_similarities(query)
+        scores = index.score([query])[0]
+        assert np.allclose(scores, expected, atol=1e-12)
+        assert np.argmax(scores) == np.argmax(expected)
+
+
+def test_batch_scores_match_single_scores():
+    """Un lot de requêtes est évalué en une seule multiplication creuse"""
+    index = CategoryTextIndex(DESCRIPTIONS)
+    batch = index.score(QUERIES)
+    assert batch.shape == (len(QUERIES), len(DESCRIPTIONS))
+    for row, query in enumerate(QUERIES):
+        assert np.allclose(batch[row], index.score([query])[0], atol=1e-12)
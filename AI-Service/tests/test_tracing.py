@@ -0,0 +1,82 @@
+import io
+import sys
+from types import SimpleNamespace
+
+import app as ai_app
+from tests.helpers import png_bytes
+from tracing import TraceExporter, memory_usage, read_trace_events, slowest_requests
+
+
+def test_batch_timing_includes_stages_of_every_image(client):
+    ai_app.result_cache.clear()
+    files = {'images': [(io.BytesIO(png_bytes(seed=30 + seed)), f'objet-{seed}.png') for seed in range(3)]}
+    response = client.post('/classify-object/batch?timing=1', data=files, content_type='multipart/form-data')
+    stages = [entry['stage'] for entry in response.get_json()['timing']['stages']]
+    assert stages.count('decode') == 3 and stages.count('calculate_quality_score') == 3
+
+
+def test_memory_fallback_uses_platform_units(monkeypatch):
+    import builtins
+    import resource
+
+    real_open = builtins.open
+
+    def without_proc(path, *args, **kwargs):
+        if path == '/proc/self/statm':
+            raise OSError(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, 'open', without_proc)
+    monkeypatch.setattr(resource, 'getrusage', lambda who: SimpleNamespace(ru_maxrss=1000))
+    monkeypatch.setattr(sys, 'platform', 'darwin')
+    assert memory_usage() == 1000
+    monkeypatch.setattr(sys, 'platform', 'linux')
+    assert memory_usage() == 1000 * 1024
+
+
+def test_timing_breakdown_is_opt_in(client):
+    ai_app.result_cache.clear()
+    image = png_bytes(seed=21)
+
+    plain = client.post('/classify-object?filename=chaise.png', data=image, content_type='image/png')
+    assert 'timing' not in plain.get_json()
+    assert 'Server-Timing' not in plain.headers
+
+    ai_app.result_cache.clear()
+    response = client.post('/classify-object?filename=chaise.png', data=image, content_type='image/png',
+                           headers={'X-Timing': '1'})
+    timing = response.get_json()['timing']
+    stages = [entry['stage'] for entry in timing['stages']]
+    assert stages[0] == 'decode'
+    assert {'analyze_image_properties', 'get_dominant_colors', 'calculate_quality_score',
+            'serialization'} <= set(stages)
+    assert timing['image_bytes'] == len(image)
+    assert timing['image_resolution'] == {'width': 320, 'height': 240}
+    assert timing['cache'] == 'miss'
+    assert 'memory_delta_bytes' in timing
+    assert all(entry['start_ms'] + entry['duration_ms'] <= timing['total_ms'] for entry in timing['stages'])
+    assert 'decode;dur=' in response.headers['Server-Timing']
+
+    cached = client.post('/classify-object?filename=chaise.png&timing=1', data=image, content_type='image/png')
+    assert cached.get_json()['timing']['cache'] == 'hit'
+
+
+def test_trace_export_and_offline_report(client, tmp_path, monkeypatch):
+    path = tmp_path / 'traces' / 'requests.json'
+    monkeypatch.setattr(ai_app, 'trace_exporter', TraceExporter(str(path)))
+    ai_app.result_cache.clear()
+
+    client.post('/classify-object?filename=chaise.png', data=png_bytes(seed=22), content_type='image/png')
+    client.get('/health')
+
+    events = read_trace_events(str(path))
+    requests = [event for event in events if event['cat'] == 'request']
+    assert [event['name'] for event in requests] == ['POST /classify-object', 'GET /health']
+    assert requests[0]['args']['status'] == 200
+
+    (slowest, stages), _ = slowest_requests(events, 2)
+    assert slowest['name'] == 'POST /classify-object'
+    assert 'get_dominant_colors' in {stage['name'] for stage in stages}
+
+    # Seuil : les requêtes plus rapides ne sont pas exportées
+    assert not TraceExporter(str(path), min_duration=60).export('GET /health', 0.0, 0.01)
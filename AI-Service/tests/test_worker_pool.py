@@ -0,0 +1,60 @@
+import operator
+import os
+import threading
+import time
+
+import pytest
+
+from worker_pool import AnalysisPool, PoolSaturatedError, PoolTimeoutError
+
+
+def test_run_executes_in_prestarted_worker_process():
+    """Les tâches s'exécutent dans des processus démarrés à l'avance"""
+    pool = AnalysisPool(size=2, queue_depth=2)
+    try:
+        worker_pids = pool.start()
+        assert len(worker_pids) >= 1
+        assert os.getpid() not in worker_pids
+        assert pool.run(operator.add, 2, 3) == 5
+        assert pool.run(os.getpid) in worker_pids
+    finally:
+        pool.shutdown()
+
+
+def test_full_queue_raises_saturation_with_retry_after():
+    """Au-delà de size + queue_depth tâches, le pool refuse au lieu d'attendre"""
+    pool = AnalysisPool(size=1, queue_depth=0, retry_after=3)
+    try:
+        pool.start()
+        busy = threading.Thread(target=pool.run, args=(time.sleep, 1.0))
+        busy.start()
+        time.sleep(0.2)
+
+        with pytest.raises(PoolSaturatedError) as error:
+            pool.run(operator.add, 1, 1)
+        assert error.value.retry_after == 3
+
+        busy.join()
+        assert pool.run(operator.add, 1, 1) == 2
+    finally:
+        pool.shutdown()
+
+
+def test_timeout_keeps_the_slot_until_the_task_ends():
+    """Une analyse trop longue échoue (504) mais sa place reste prise tant qu'elle s'exécute"""
+    pool = AnalysisPool(size=1, queue_depth=0, timeout=0.2)
+    try:
+        pool.start()
+        with pytest.raises(PoolTimeoutError) as error:
+            pool.run(time.sleep, 1.0)
+        assert error.value.status_code == 504
+        assert pool.stats()['in_flight'] == 1
+        with pytest.raises(PoolSaturatedError):
+            pool.run(operator.add, 1, 1)
+
+        deadline = time.monotonic() + 5
+        while pool.stats()['in_flight'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.run(operator.add, 1, 1) == 2
+    finally:
+        pool.shutdown()
@@ -0,0 +1,123 @@
+"""
+Index TF-IDF pré-calculé des descriptions de catégories
+"""
+
+import threading
+
+import numpy as np
+
+
+class CategoryTextIndex:
+    """Index creux des descriptions de catégories, ajusté une seule fois au premier score
+
+    Les scores sont identiques à ceux d'un TfidfVectorizer réajusté à chaque requête
+    sur le corpus [requête] + descriptions : la requête ne fait varier que l'IDF des
+    termes qu'elle contient, dont les deux valeurs possibles sont pré-calculées.
+    SciPy et scikit-learn (plus d'une seconde d'import) ne sont chargés qu'à ce moment.
+    """
+
+    def __init__(self, descriptions):
+        self.categories = list(descriptions.keys())
+        self._descriptions = list(descriptions.values())
+        self._lock = threading.Lock()
+        self._fitted = False
+
+    def fit(self):
+        """Ajuster l'index s'il ne l'est pas encore (appelé par score())"""
+        with self._lock:
+            if not self._fitted:
+                self._fit()
+                self._fitted = True
+        return self
+
+    def _fit(self):
+        from scipy import sparse
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        # Même analyseur que TfidfVectorizer (minuscules, mots de 2 caractères ou plus)
+        vectorizer = CountVectorizer()
+        counts = vectorizer.fit_transform(self._descriptions).astype(np.float64).tocsr()
+        self._analyzer = vectorizer.build_analyzer()
+        self._vocabulary = vectorizer.vocabulary_
+
+        n_documents = counts.shape[0] + 1  # descriptions + requête
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+
+        # IDF lissé d'un terme absent / présent dans la requête, ou inconnu des descriptions
+        idf_absent = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+        idf_present = np.log((1 + n_documents) / (2 + document_frequency)) + 1
+        self._idf_present_sq = idf_present ** 2
+        self._idf_query_only_sq = (np.log((1 + n_documents) / 2) + 1) ** 2
+
+        squared_counts = counts.multiply(counts).tocsr()
+        self._document_norm_base = squared_counts @ (idf_absent ** 2)
+        self._document_norm_delta = (
+            squared_counts @ sparse.diags(self._idf_present_sq - idf_absent ** 2)
+        ).T.tocsr()
+        self._weighted_counts = (counts @ sparse.diags(self._idf_present_sq)).T.tocsr()
+
+        # Copies denses (vocabulaire de quelques centaines de termes) pour une requête isolée
+        self._document_norm_delta_dense = self._document_norm_delta.toarray()
+        self._weighted_counts_dense = self._weighted_counts.toarray()
+
+    def _tokenize(self, text):
+        """Termes connus (colonne, occurrences) et poids des termes inconnus des descriptions"""
+        term_counts = {}
+        for token in self._analyzer(text):
+            term_counts[token] = term_counts.get(token, 0) + 1
+
+        columns, counts = [], []
+        query_only_sq = 0.0
+        for token, count in term_counts.items():
+            column = self._vocabulary.get(token)
+            if column is None:
+                query_only_sq += count * count * self._idf_query_only_sq
+            else:
+                columns.append(column)
+                counts.append(count)
+        return np.asarray(columns, dtype=np.intp), np.asarray(counts, dtype=np.float64), query_only_sq
+
+    def score(self, texts):
+        """Similarité cosinus de chaque texte avec chaque catégorie (n_textes x n_catégories)"""
+        if not self._fitted:
+            self.fit()
+        if len(texts) == 1:
+            return self._score_one(texts[0])[None, :]
+
+        from scipy import sparse
+
+        rows, columns, values = [], [], []
+        query_only_sq = np.zeros(len(texts))
+        for row, text in enumerate(texts):
+            text_columns, text_counts, query_only_sq[row] = self._tokenize(text)
+            rows.extend([row] * len(text_columns))
+            columns.extend(text_columns)
+            values.extend(text_counts)
+
+        queries = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float64), (rows, columns)),
+            shape=(len(texts), len(self._vocabulary))
+        )
+        present = queries.copy()
+        present.data[:] = 1.0
+
+        dot = np.asarray((queries @ self._weighted_counts).todense())
+        query_norm = np.sqrt(queries.multiply(queries) @ self._idf_present_sq + query_only_sq)
+        document_norm = np.sqrt(
+            self._document_norm_base + np.asarray((present @ self._document_norm_delta).todense())
+        )
+
+        denominator = query_norm[:, None] * document_norm
+        return np.divide(dot, denominator, out=np.zeros_like(dot), where=denominator > 0)
+
+    def _score_one(self, text):
+        columns, counts, query_only_sq = self._tokenize(text)
+
+        dot = counts @ self._weighted_counts_dense[columns]
+        query_norm = np.sqrt(counts * counts @ self._idf_present_sq[columns] + query_only_sq)
+        document_norm = np.sqrt(
+            self._document_norm_base + self._document_norm_delta_dense[columns].sum(axis=0)
+        )
+
+        denominator = query_norm * document_norm
+        return np.divide(dot, denominator, out=np.zeros_like(dot), where=denominator > 0)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Détail des requêtes : mémoire du processus et export des traces au format Chrome Trace Event
+
+Le fichier produit s'ouvre dans Perfetto (ui.perfetto.dev) ou chrome://tracing. Il est
+écrit en flux (tableau JSON jamais refermé, ce que le format autorise) et peut être
+alimenté par plusieurs workers à la fois.
+
+Usage hors ligne : python tracing.py traces.json [--slowest 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def memory_usage():
+    """Mémoire résidente du processus en octets (pic de mémoire résidente hors Linux)"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class TraceExporter:
+    """Écrit chaque requête et ses étapes comme événements complets ("ph": "X")
+
+    Les horodatages viennent de time.perf_counter() (horloge monotone commune à tous
+    les processus de l'hôte), en microsecondes. Les événements d'une requête sont
+    écrits en un seul appel système, en mode ajout.
+    """
+
+    def __init__(self, path, min_duration=0.0):
+        self.path = path
+        self.min_duration = min_duration
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        try:
+            # Un seul processus ouvre le tableau JSON
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'w') as f:
+                f.write('[\n')
+
+    def export(self, name, start, duration, stages=(), args=None):
+        """Exporter une requête (début et durée en secondes) si elle dure au moins min_duration"""
+        if duration < self.min_duration:
+            return False
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = [trace_event(name, 'request', start, duration, pid, tid, args or {})]
+        events.extend(
+            trace_event(stage, 'stage', stage_start, seconds, pid, tid)
+            for stage, stage_start, seconds in stages if stage_start is not None
+        )
+        data = ''.join(json.dumps(event, separators=(',', ':')) + ',\n' for event in events).encode('utf-8')
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        return True
+
+
+def trace_event(name, category, start, duration, pid, tid, args=None):
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': round(start * 1e6, 1),
+        'dur': round(duration * 1e6, 1),
+        'pid': pid,
+        'tid': tid
+    }
+    if args:
+        event['args'] = args
+    return event
+
+
+def read_trace_events(path):
+    """Événements d'un fichier de traces (tableau refermé ou non)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read().strip()
+    if not text.endswith(']'):
+        text = text.rstrip(',') + ']'
+    return json.loads(text)
+
+
+def slowest_requests(events, count=10):
+    """[(requête, [étapes triées par durée])] des requêtes les plus lentes"""
+    requests = sorted((e for e in events if e.get('cat') == 'request'), key=lambda e: e['dur'], reverse=True)
+    stages = [e for e in events if e.get('cat') == 'stage']
+    report = []
+    for request in requests[:count]:
+        end = request['ts'] + request['dur']
+        inner = [
+            stage for stage in stages
+            if (stage['pid'], stage['tid']) == (request['pid'], request['tid'])
+            and request['ts'] <= stage['ts'] <= end
+        ]
+        report.append((request, sorted(inner, key=lambda e: e['dur'], reverse=True)))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Requêtes les plus lentes d\'un fichier de traces')
+    parser.add_argument('path')
+    parser.add_argument('--slowest', type=int, default=10)
+    args = parser.parse_args()
+
+    for request, stages in slowest_requests(read_trace_events(args.path), args.slowest):
+        print(f"{request['dur'] / 1e3:9.1f} ms  {request['name']}  {json.dumps(request.get('args', {}))}")
+        for stage in stages:
+            print(f"{stage['dur'] / 1e3:13.1f} ms  {stage['name']}")
+
+
+if __name__ == '__main__':
+    main()
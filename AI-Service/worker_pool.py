@@ -0,0 +1,133 @@
+"""
+Pool de processus pour les étapes d'analyse d'image (calcul CPU hors du GIL des workers web)
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(Exception):
+    """File d'attente du pool pleine : la requête doit être refusée (HTTP 503)"""
+
+    status_code = 503
+    message = "File d'attente d'analyse pleine"
+
+    def __init__(self, retry_after):
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+
+class PoolTimeoutError(PoolSaturatedError):
+    """Analyse plus longue que le délai du pool : la requête échoue (HTTP 504), la tâche continue"""
+
+    status_code = 504
+    message = "Délai d'analyse dépassé"
+
+
+class AnalysisPool:
+    """Pool de processus pré-démarrés avec file d'attente bornée
+
+    Au plus size tâches s'exécutent et queue_depth attendent ; au-delà, run() lève
+    PoolSaturatedError au lieu de mettre la requête en attente. Les processus sont
+    créés paresseusement dans le processus qui les utilise, de sorte qu'un worker
+    gunicorn issu d'un fork (--preload) démarre son propre pool.
+    """
+
+    def __init__(self, size=0, queue_depth=0, initializer=None, retry_after=1,
+                 timeout=None, start_method='spawn'):
+        self.size = size
+        self.queue_depth = queue_depth
+        self.initializer = initializer
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(max(size + queue_depth, 1))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._owner_pid = None
+        self._pending = 0
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def start(self):
+        """Démarrer et préchauffer tous les processus du pool"""
+        executor = self._get_executor()
+        warmups = [executor.submit(os.getpid) for _ in range(self.size)]
+        return sorted({future.result() for future in warmups})
+
+    def run(self, function, *args):
+        """Exécuter function(*args) dans un processus du pool et attendre son résultat"""
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturatedError(self.retry_after)
+
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException as e:
+            self._release()
+            self._reset_if_broken(e)
+            raise
+        # La place est rendue à la fin de la tâche, pas au départ de l'appelant : une tâche
+        # abandonnée après le délai occupe toujours un processus
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            logger.error(f"Analyse plus longue que {self.timeout} s, requête abandonnée")
+            raise PoolTimeoutError(self.retry_after) from None
+        except BrokenProcessPool as e:
+            self._reset_if_broken(e)
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'size': self.size,
+                'queue_depth': self.queue_depth,
+                'in_flight': self._pending
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._owner_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=self.initializer
+                )
+                self._owner_pid = os.getpid()
+            return self._executor
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _reset_if_broken(self, error):
+        if isinstance(error, BrokenProcessPool):
+            # Un processus est mort (OOM, segfault OpenCV...) : le pool sera recréé
+            logger.error("Pool d'analyse interrompu, redémarrage")
+            self._reset()
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
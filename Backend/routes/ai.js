@@ -34,16 +34,13 @@ router.post('/classify-object', upload.single('image'), async (req, res) => {
       });
     }
 
-    // Convertir l'image en base64 pour l'envoi au service IA
-    const imageBase64 = req.file.buffer.toString('base64');
-    const imageDataUrl = `data:${req.file.mimetype};base64,${imageBase64}`;
-
-    // Appel au service IA pour la classification
-    const aiResponse = await axios.post(`${process.env.AI_SERVICE_URL || 'http://localhost:5001'}/classify-object`, {
-      image_url: imageDataUrl
-    }, {
+    // Envoi de l'image brute au service IA (pas d'inflation base64)
+    const aiResponse = await axios.post(`${process.env.AI_SERVICE_URL || 'http://localhost:5001'}/classify-object`, req.file.buffer, {
+      params: {
+        filename: req.file.originalname
+      },
       headers: {
-        'Content-Type': 'application/json'
+        'Content-Type': req.file.mimetype
       }
     });
 
@@ -88,16 +85,13 @@ router.post('/classify-food', auth, upload.single('image'), async (req, res) =>
       });
     }
 
-    // Convertir l'image en base64 pour l'envoi au service IA
-    const imageBase64 = req.file.buffer.toString('base64');
-    const imageDataUrl = `data:${req.file.mimetype};base64,${imageBase64}`;
-
-    // Appel au service IA pour la classification des aliments
-    const aiResponse = await axios.post(`${process.env.AI_SERVICE_URL || 'http://localhost:5001'}/classify-food`, {
-      image_url: imageDataUrl
-    }, {
+    // Envoi de l'image brute au service IA (pas d'inflation base64)
+    const aiResponse = await axios.post(`${process.env.AI_SERVICE_URL || 'http://localhost:5001'}/classify-food`, req.file.buffer, {
+      params: {
+        filename: req.file.originalname
+      },
       headers: {
-        'Content-Type': 'application/json'
+        'Content-Type': req.file.mimetype
       }
     });
 